@@ -1,41 +1,123 @@
-import plotly.graph_objects as go
 import pandas as pd
 
+from app.components.downsampling import (
+    DEFAULT_POINT_BUDGET,
+    downsample_series,
+    points_per_trace,
+)
+from src.monitoring.tracing import traced
 
+# Above this many points per trace, switch from SVG to WebGL rendering
+WEBGL_THRESHOLD = 1000
+
+
+def _line_trace(series: pd.Series, name: str, n_points: int):
+    """Build a line trace, using WebGL when the trace is dense."""
+    import plotly.graph_objects as go
+
+    trace_cls = go.Scattergl if n_points > WEBGL_THRESHOLD else go.Scatter
+    return trace_cls(x=series.index, y=series.to_numpy(), name=name, mode="lines")
+
+
+@traced("chart.price_and_strategy")
 def price_and_strategy_chart(
     df_price: pd.DataFrame,
     strategy_series: pd.Series | None = None,
     title: str = "Price and Strategy Chart",
+    max_points: int | None = DEFAULT_POINT_BUDGET,
+    x_range=None,
 ):
+    """
+    Plot the price and (optionally) the strategy equity curve.
+
+    Both series are downsampled with LTTB so that the figure holds at most
+    ``max_points`` points in total (``None`` disables downsampling).
+    ``x_range`` (start, end) restricts both to the visible window first.
+    """
+    # plotly is imported lazily: it is only needed once a chart is drawn
+    import plotly.graph_objects as go
 
     fig = go.Figure()
 
-    fig.add_trace(
-        go.Scatter(
-            x=df_price.index,
-            y=df_price["price"],
-            name="Price",
-            mode="lines",
-        )
-    )
+    n_traces = 1 if strategy_series is None else 2
+    n_out = points_per_trace(n_traces, max_points) if max_points else None
+
+    price = df_price["price"]
+    price_plot = downsample_series(price, n_out, x_range) if n_out else price
+    fig.add_trace(_line_trace(price_plot, "Price", len(price_plot)))
 
     if strategy_series is not None:
-        initial_price = df_price["price"].iloc[0]
+        initial_price = price.iloc[0]
+
+        # The strategy index is a subset of the price index: plot it on its
+        # own dates instead of reindexing it onto the price index.
+        strat_scaled = strategy_series * initial_price
+        strat_plot = downsample_series(strat_scaled, n_out, x_range) if n_out else strat_scaled
+        fig.add_trace(_line_trace(strat_plot, "Strategy (price scaled)", len(strat_plot)))
+
+    fig.update_layout(title=title, xaxis_title="Date", yaxis_title="Value")
+    return fig
+
+
+@traced("chart.multi_line")
+def multi_line_chart(
+    df: pd.DataFrame,
+    title: str | None = None,
+    yaxis_title: str = "Value",
+    max_points: int | None = DEFAULT_POINT_BUDGET,
+):
+    """
+    Plot one line per column, sharing the point budget between columns.
+
+    Replacement for ``st.line_chart`` on long histories.
+    """
+    import plotly.graph_objects as go
+
+    fig = go.Figure()
+
+    n_out = points_per_trace(len(df.columns), max_points) if max_points else None
+    for col in df.columns:
+        s = df[col]
+        s_plot = downsample_series(s, n_out) if n_out else s.dropna()
+        fig.add_trace(_line_trace(s_plot, str(col), len(s_plot)))
+
+    fig.update_layout(title=title, xaxis_title="Date", yaxis_title=yaxis_title)
+    return fig
 
-        strat_scaled = (
-            strategy_series
-            .reindex(df_price.index, method="ffill")
-            * initial_price
-        )
 
-        fig.add_trace(
-            go.Scatter(
-                x=df_price.index,
-                y=strat_scaled,
-                name="Strategy (price scaled)",
-                mode="lines",
-            )
+# Above this many assets, tick labels are hidden (they would overlap)
+HEATMAP_LABEL_LIMIT = 60
+
+
+@traced("chart.correlation_heatmap")
+def correlation_heatmap(corr_df: pd.DataFrame, title: str | None = None):
+    """
+    Render a (clustered) correlation matrix as a single heatmap trace.
+
+    Values are sent as int8 percentages: one byte per cell keeps the
+    payload small even for several hundred assets.
+    """
+    import numpy as np
+    import plotly.graph_objects as go
+
+    names = [str(c) for c in corr_df.columns]
+    z = np.rint(np.nan_to_num(corr_df.to_numpy(dtype=float)) * 100).astype(np.int8)
+
+    fig = go.Figure(
+        go.Heatmap(
+            z=z,
+            x=names,
+            y=names,
+            zmin=-100,
+            zmax=100,
+            colorscale="RdBu_r",
+            colorbar=dict(title="Corr (%)"),
+            hovertemplate="%{y} / %{x}: %{z}%<extra></extra>",
         )
+    )
 
-    fig.update_layout(title=title, xaxis_title="Date", yaxis_title="Value")
+    show_labels = len(names) <= HEATMAP_LABEL_LIMIT
+    fig.update_xaxes(showticklabels=show_labels)
+    fig.update_yaxes(showticklabels=show_labels, autorange="reversed")
+    fig.update_layout(title=title, height=max(400, min(900, 12 * len(names))))
     return fig
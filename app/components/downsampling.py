@@ -0,0 +1,93 @@
+import numpy as np
+import pandas as pd
+
+from src.data.cache import LRUCache, fingerprint
+from src.monitoring.tracing import traced
+
+# Total number of points sent to the browser for one figure. Around 40
+# bytes per point (timestamp + value) keeps the payload under ~100 KB.
+DEFAULT_POINT_BUDGET = 2500
+# Minimum points per trace, even when a figure holds many traces.
+MIN_POINTS_PER_TRACE = 50
+
+# Downsampled payloads, keyed on (series content, visible range, n_out)
+_DOWNSAMPLE_CACHE = LRUCache("chart_downsample", max_bytes=32 * 1024 * 1024)
+
+
+def lttb(x: np.ndarray, y: np.ndarray, n_out: int) -> np.ndarray:
+    """
+    Largest-Triangle-Three-Buckets downsampling.
+
+    Returns the integer positions of the ``n_out`` points that best keep
+    the visual shape of the (x, y) line. First and last points are always
+    kept. ``y`` must not contain NaN.
+    """
+    n = len(y)
+    if n_out >= n or n_out < 3:
+        return np.arange(n)
+
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+
+    # Bucket edges for the n - 2 inner points
+    edges = np.linspace(1, n - 1, n_out - 1).astype(np.int64)
+    selected = np.empty(n_out, dtype=np.int64)
+    selected[0] = 0
+    selected[-1] = n - 1
+
+    a = 0
+    for i in range(n_out - 2):
+        start, end = edges[i], max(edges[i + 1], edges[i] + 1)
+
+        # Average point of the next bucket (or the last point)
+        if i + 2 < len(edges):
+            next_start, next_end = edges[i + 1], max(edges[i + 2], edges[i + 1] + 1)
+            avg_x = x[next_start:next_end].mean()
+            avg_y = y[next_start:next_end].mean()
+        else:
+            avg_x, avg_y = x[-1], y[-1]
+
+        # Triangle area between the previous pick, each candidate and the average
+        area = np.abs(
+            (x[a] - avg_x) * (y[start:end] - y[a])
+            - (x[a] - x[start:end]) * (avg_y - y[a])
+        )
+        a = start + int(np.argmax(area))
+        selected[i + 1] = a
+
+    return selected
+
+
+def _x_as_float(index: pd.Index) -> np.ndarray:
+    if isinstance(index, pd.DatetimeIndex):
+        return index.asi8.astype(float)
+    return np.asarray(index, dtype=float)
+
+
+@traced("chart.downsample")
+def downsample_series(series: pd.Series, n_out: int, x_range=None) -> pd.Series:
+    """
+    Downsample a series to at most ``n_out`` points with LTTB.
+
+    ``x_range`` (start, end) restricts the series to the visible window
+    before downsampling, so zooming in gives back full detail.
+    Results are cached per (series content, range, n_out).
+    """
+    series = series.dropna()
+    key = (fingerprint(series), x_range, n_out)
+
+    def compute():
+        s = series
+        if x_range is not None:
+            s = s.loc[x_range[0]:x_range[1]]
+        if len(s) <= n_out:
+            return s
+        idx = lttb(_x_as_float(s.index), s.to_numpy(), n_out)
+        return s.iloc[idx]
+
+    return _DOWNSAMPLE_CACHE.get_or_compute(key, compute)
+
+
+def points_per_trace(n_traces: int, budget: int = DEFAULT_POINT_BUDGET) -> int:
+    """Split the figure point budget between its traces."""
+    return max(MIN_POINTS_PER_TRACE, budget // max(n_traces, 1))
@@ -1,23 +1,27 @@
 import streamlit as st
 
+from src.data.intervals import INTRADAY_INTERVALS, valid_periods
+
 
 def select_asset():
     return st.text_input("Ticker (ex: AAPL, MSFT, BTC-USD)", value="AAPL").upper()
 
 
 
-def select_period():
+def select_period(interval="1d"):
+    # Intraday bars are only served over recent periods
+    options = valid_periods(interval, ["1mo", "3mo", "6mo", "1y", "5y", "max"])
     return st.selectbox(
         "Period:",
-        ["1mo", "3mo", "6mo", "1y", "5y", "max"],
-        index=3,
+        options,
+        index=options.index("1y") if "1y" in options else len(options) - 1,
     )
 
 
 def select_interval():
     return st.selectbox(
         "Interval:",
-        ["1d", "1wk"],
+        ["1d", "1wk"] + INTRADAY_INTERVALS,
         index=0,
     )
 
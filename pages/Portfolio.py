@@ -1,4 +1,6 @@
 import sys
+import time
+from uuid import uuid4
 from pathlib import Path
 from datetime import datetime
 import pandas as pd
@@ -8,21 +10,52 @@ import streamlit as st
 ROOT = Path(__file__).resolve().parents[1]
 if str(ROOT) not in sys.path:
     sys.path.append(str(ROOT))
-from streamlit_autorefresh import st_autorefresh
 from src.data.fetch_yf import get_history
-from src.portfolio.weights import equal_weights, normalize_weights
-from src.portfolio.portfolio_engine import (
-    compute_portfolio_returns,
-    compute_cumulative_value,
-    portfolio_stats,
+from src.data.intervals import (
+    INTRADAY_INTERVALS,
+    is_intraday,
+    periods_per_year as bars_per_year,
+    universe_asset_type,
+    valid_periods,
 )
-from src.portfolio.correlations import compute_correlation_matrix
-
-
-def get_price_data_multi(tickers, period="1y", interval="1d"):
+from src.data.quotes import LIVE_REFRESH_SECONDS, refresh_intraday, refresh_quotes
+from src.monitoring.timings import timed
+from src.monitoring.tracing import init_tracing, set_session
+# Plotting helpers, the autorefresh component and the analytics modules
+# are imported inside the sections that use them, so that importing this
+# module stays cheap.
+
+# Allocation schemes computed from the returns (None: manual sliders), by
+# function name in src/portfolio/weights.py
+ALLOCATIONS = {
+    "Manual (sliders)": None,
+    "Inverse volatility": "inverse_volatility_weights",
+    "Risk parity (equal risk contribution)": "risk_parity_weights",
+    "Hierarchical risk parity": "hrp_weights",
+}
+
+# Engine runs on fewer return cells (rows x assets) than this run inline
+# (under ~0.1 s, less than shipping the returns to a worker process)
+JOB_MIN_CELLS = 1_000_000
+# Larger runs are background jobs: the page waits this long for one, then
+# shows its progress, polled every JOB_POLL_SECONDS
+JOB_INLINE_WAIT = 2.0
+JOB_POLL_SECONDS = 1.0
+
+
+def _allocator(name):
+    from src.portfolio import weights
+
+    return getattr(weights, name)
+
+
+def get_price_data_multi(tickers, period="1y", interval="1d", policy="ffill", max_gap=5):
     """
     Download price history for multiple tickers and build a price DataFrame.
 
+    The histories are aligned on their master calendar with ``policy``
+    ("inner", "ffill" or "per_asset", see src/data/alignment.py).
+
     Returns
     -------
     prices : pd.DataFrame
@@ -30,7 +63,9 @@ def get_price_data_multi(tickers, period="1y", interval="1d"):
     invalid_tickers : list
         List of tickers for which no data could be fetched.
     """
-    dfs = []
+    from src.data.alignment import align_prices
+
+    histories = {}
     invalid_tickers = []
 
     for t in tickers:
@@ -42,44 +77,45 @@ def get_price_data_multi(tickers, period="1y", interval="1d"):
                 invalid_tickers.append(t)
                 continue
 
-            # In get_history, the column is "price" -> rename to ticker symbol
-            df_t = df_t.rename(columns={"price": t})
-            dfs.append(df_t)
+            histories[str(t)] = df_t
 
         except Exception as e:
             invalid_tickers.append(t)
             st.warning(f"Could not download data for {t}: {e}")
 
-    if not dfs:
+    if not histories:
         # No valid ticker at all
         return pd.DataFrame(), invalid_tickers
 
-    prices = pd.concat(dfs, axis=1)
-    prices = prices.dropna(how="all")
-
-    # Ensure columns are simple strings (no MultiIndex)
-    if isinstance(prices.columns, pd.MultiIndex):
-        prices.columns = [
-            str(col[0]) if isinstance(col, tuple) else str(col)
-            for col in prices.columns
-        ]
-    else:
-        prices.columns = [str(c) for c in prices.columns]
-
+    prices = align_prices(histories, policy=policy, max_gap=max_gap, interval=interval)
+    # Histories without a single price are left out of the alignment
+    invalid_tickers += [t for t in histories if t not in prices.columns]
     return prices, invalid_tickers
 
 
 def compute_returns(price_df):
     """Compute simple returns from price DataFrame."""
-    # fill_method=None to avoid the FutureWarning
-    returns = price_df.pct_change(fill_method=None).dropna()
+    from src.data.precision import returns_from_prices
+
+    # In the dtype of the prices (float32 in compact mode), no temporaries
+    returns = returns_from_prices(price_df)
     return returns
 
 
 def run(config=None):
     """Main Streamlit page for the multi-asset portfolio (Quant B)."""
+    from streamlit_autorefresh import st_autorefresh
+    from app.components.charts import correlation_heatmap, multi_line_chart
+    from src.data.alignment import ALIGNMENT_POLICIES, load_alignment_settings
+    from src.data.cache import DERIVED_CACHE, cached_call, fingerprint
+    from src.data.quality import quality_report, quality_table
+
+    init_tracing()
+    set_session(st.session_state.setdefault("trace_session", uuid4().hex[:8]))
+
     st_autorefresh(interval=300000, key="data_refresher")
-    #refresh every 5 minutes
+    # Full refresh every 5 minutes (served from the history cache); the live
+    # metrics below refresh every LIVE_REFRESH_SECONDS through quotes only.
     st.toast(f"Data updated at {datetime.now().strftime('%H:%M:%S')}", icon="🔄")
     st.title("Multi-Asset Portfolio")
 
@@ -88,7 +124,8 @@ def run(config=None):
     default_period = "1y"
     default_interval = "1d"
     initial_value = 100.0
-    periods_per_year = 252
+    # Bars per year for annualization: derived from the interval below
+    periods_per_year = None
 
     if config is not None and "portfolio" in config:
         cfg = config["portfolio"]
@@ -113,18 +150,49 @@ def run(config=None):
     tickers = [t.strip().upper() for t in tickers_str.split(",") if t.strip()]
 
     col1, col2 = st.columns(2)
-    with col1:
-        period = st.selectbox(
-            "History period (yfinance period)",
-            ["3mo", "6mo", "1y", "2y", "5y", "10y"],
-            index=2,
-        )
+    # The interval is chosen first: intraday bars allow shorter periods only
     with col2:
         interval = st.selectbox(
             "Interval",
-            ["1d", "1wk", "1mo"],
+            ["1d", "1wk", "1mo"] + INTRADAY_INTERVALS,
             index=0,
         )
+    with col1:
+        period_options = valid_periods(interval, ["3mo", "6mo", "1y", "2y", "5y", "10y"])
+        period = st.selectbox(
+            "History period (yfinance period)",
+            period_options,
+            index=period_options.index("1y") if "1y" in period_options else len(period_options) - 1,
+        )
+
+    # How histories on different calendars (e.g. crypto and equities) are combined
+    alignment = load_alignment_settings()
+    policies = list(ALIGNMENT_POLICIES)
+    col_policy, col_gap = st.columns(2)
+    with col_policy:
+        policy = st.selectbox(
+            "Calendar alignment",
+            policies,
+            index=policies.index(alignment["policy"]),
+            format_func=ALIGNMENT_POLICIES.get,
+            help=(
+                "Common timestamps only: keep rows where every asset traded. "
+                "Forward-fill: carry prices over short gaps (weekends, holidays). "
+                "Per-asset calendars: each asset's returns follow its own calendar."
+            ),
+        )
+    with col_gap:
+        max_gap = st.number_input(
+            "Max forward-fill gap (bars)",
+            min_value=1,
+            value=alignment["max_gap"],
+            disabled=policy != "ffill",
+        )
+
+    # A configured periods_per_year applies to daily bars; otherwise bars
+    # are counted on the calendar of the aligned universe (24/7 with crypto)
+    if periods_per_year is None or interval != "1d":
+        periods_per_year = bars_per_year(interval, universe_asset_type(tickers, policy))
 
     if len(tickers) == 0:
         st.warning("Please add at least one ticker.")
@@ -132,8 +200,14 @@ def run(config=None):
 
     # Fetch market data immediately so we know which tickers are valid
     price_df, invalid_tickers = get_price_data_multi(
-        tickers, period=period, interval=interval
+        tickers, period=period, interval=interval, policy=policy, max_gap=max_gap
     )
+    # Intraday histories: append the bars formed since the last refresh
+    # (one batched request, bounded rolling windows)
+    if is_intraday(interval) and refresh_intraday(tickers, interval):
+        price_df, invalid_tickers = get_price_data_multi(
+            tickers, period=period, interval=interval, policy=policy, max_gap=max_gap
+        )
 
     if invalid_tickers:
         st.warning(
@@ -145,60 +219,129 @@ def run(config=None):
         st.error("No valid data fetched for any ticker. Please adjust the tickers.")
         return
 
-    valid_tickers = list(price_df.columns)
-
-    st.markdown("###  Live Market Data")
-    
-    # Calculate daily percentage change for visual indicators
-    if len(price_df) > 1:
-        prev_prices = price_df.iloc[-2]
-        last_prices = price_df.iloc[-1]
-        pct_change = ((last_prices - prev_prices) / prev_prices) * 100
-    else:
-        # Fallback if not enough data
-        pct_change = pd.Series(0, index=valid_tickers)
+    # Checked and cleaned when the histories were downloaded; only shown here
+    quality = quality_table({t: quality_report(t, period, interval) for t in price_df.columns})
+    flagged = quality[quality["status"] != "ok"] if not quality.empty else quality
+    if not flagged.empty:
+        with st.expander(f"⚠️ Data quality issues ({', '.join(flagged['ticker'])})"):
+            st.dataframe(flagged, hide_index=True)
 
-    cols = st.columns(len(valid_tickers))
-    for col, t in zip(cols, valid_tickers):
-        if t in price_df:
-            curr_price = price_df[t].iloc[-1]
-            delta_val = pct_change[t]
-            # Display price with green/red indicator
-            col.metric(
-                label=t, 
-                value=f"{curr_price:.2f}", 
-                delta=f"{delta_val:.2f} %"
-            )
-        else:
-            col.metric(t, "N/A")
+    # Live prices refresh on their own timer, without rerunning the page
+    live_market_data(price_df)
     st.divider()
 
-    # ---- 2) Portfolio allocation ----
-    st.subheader("2) Portfolio allocation")
+    # ---- 2) Market data ----
+    st.subheader("2) Market data")
 
-    cols = st.columns(len(valid_tickers))
-    raw_weights = []
-    for col, t in zip(cols, valid_tickers):
-        with col:
-            w = st.slider(
-                f"Weight {t}",
-                min_value=0.0,
-                max_value=1.0,
-                value=1.0 / len(valid_tickers),
-                step=0.05,
+    # Aligned prices already have one plain column per ticker
+    with timed("render", "market data chart"):
+        st.plotly_chart(
+            multi_line_chart(price_df, yaxis_title="Price"),
+            use_container_width=True,
+        )
+
+    # The price frame is hashed once per full rerun; every derived result
+    # below is memoized on this fingerprint.
+    price_fp = fingerprint(price_df)
+    returns_df = cached_call(DERIVED_CACHE, compute_returns, price_df, key=price_fp)
+
+    # Sections 3) to 6) only depend on the weights and the rebalancing mode:
+    # they live in a fragment so that moving a slider reruns only them.
+    portfolio_section(price_df, price_fp, returns_df, initial_value, periods_per_year, period, interval)
+
+    # ---- 7) Correlation matrix ----
+    st.subheader("7) Correlation between assets")
+    from src.portfolio.correlations import clustered_correlation, compute_correlation_matrix, top_correlated_pairs
+
+    with timed("compute", "correlations"):
+        # Already cached in process here: skip the result store layer
+        corr_df = cached_call(
+            DERIVED_CACHE, compute_correlation_matrix.uncached, returns_df, key=price_fp
+        )
+        # The clustered layout is cached per matrix (i.e. per price fingerprint)
+        corr_clustered = cached_call(
+            DERIVED_CACHE, clustered_correlation, corr_df, key=price_fp
+        )
+    with timed("render", "correlation heatmap"):
+        st.plotly_chart(
+            correlation_heatmap(corr_clustered, title="Clustered correlation matrix"),
+            use_container_width=True,
+        )
+
+    if len(corr_df) > 2:
+        n_pairs = min(10, len(corr_df) * (len(corr_df) - 1) // 2)
+        col1, col2 = st.columns(2)
+        with col1:
+            st.markdown("Most correlated pairs")
+            st.dataframe(
+                top_correlated_pairs(corr_df, k=n_pairs, largest=True),
+                hide_index=True,
+            )
+        with col2:
+            st.markdown("Least correlated pairs")
+            st.dataframe(
+                top_correlated_pairs(corr_df, k=n_pairs, largest=False),
+                hide_index=True,
             )
-            raw_weights.append(w)
 
-    if sum(raw_weights) == 0:
-        st.info("All weights are zero. Using equal weights on valid tickers.")
-        weights = equal_weights(valid_tickers)
+
+@st.fragment
+def portfolio_section(price_df, price_fp, returns_df, initial_value, periods_per_year, period, interval):
+    """Allocation, performance and diversification (re-executed on its own)."""
+    from app.components.charts import multi_line_chart
+    from src.data.cache import DERIVED_CACHE, cached_call, fingerprint
+    from src.portfolio.portfolio_engine import DEFAULT_BAND, compute_cumulative_value, portfolio_stats
+    from src.portfolio.weights import equal_weights, load_weight_schedule, normalize_weights
+
+    valid_tickers = list(price_df.columns)
+
+    # ---- 3) Portfolio allocation ----
+    st.subheader("3) Portfolio allocation")
+
+    allocation = st.selectbox("Allocation", list(ALLOCATIONS), index=0, key="allocation")
+    allocator = ALLOCATIONS[allocation]
+
+    if allocator is None:
+        cols = st.columns(len(valid_tickers))
+        raw_weights = []
+        for col, t in zip(cols, valid_tickers):
+            with col:
+                w = st.slider(
+                    f"Weight {t}",
+                    min_value=0.0,
+                    max_value=1.0,
+                    value=1.0 / len(valid_tickers),
+                    step=0.05,
+                    key=f"weight_{t}",
+                )
+                raw_weights.append(w)
+
+        if sum(raw_weights) == 0:
+            st.info("All weights are zero. Using equal weights on valid tickers.")
+            weights = equal_weights(valid_tickers)
+        else:
+            weights = normalize_weights(raw_weights, valid_tickers)
     else:
-        weights = normalize_weights(raw_weights, valid_tickers)
+        col_min, col_max = st.columns(2)
+        min_weight = col_min.number_input("Min weight", 0.0, 1.0, 0.0, step=0.01, key="min_weight")
+        max_weight = col_max.number_input("Max weight", 0.0, 1.0, 1.0, step=0.01, key="max_weight")
+        try:
+            weights = cached_call(
+                DERIVED_CACHE,
+                _allocator(allocator),
+                returns_df,
+                min_weight,
+                max_weight,
+                key=(price_fp, min_weight, max_weight),
+            )
+        except ValueError as e:
+            st.warning(f"{allocation} unavailable: {e} Using equal weights on valid tickers.")
+            weights = equal_weights(valid_tickers)
 
     st.write("Normalized weights (valid tickers only):", weights.round(3).to_dict())
 
-    # ---- 3) Strategy settings ----
-    st.subheader("3) Strategy settings")
+    # ---- 4) Strategy settings ----
+    st.subheader("4) Strategy settings")
 
     strategy_label = st.selectbox(
         "Rebalancing frequency",
@@ -206,6 +349,7 @@ def run(config=None):
             "Daily (constant weights)",
             "Monthly rebalancing",
             "Quarterly rebalancing",
+            "Band rebalancing (drift threshold)",
             "None (buy and hold)",
         ],
         index=0,
@@ -215,58 +359,71 @@ def run(config=None):
         "Daily (constant weights)": "daily",
         "Monthly rebalancing": "monthly",
         "Quarterly rebalancing": "quarterly",
+        "Band rebalancing (drift threshold)": "band",
         "None (buy and hold)": "none",
     }
     rebalancing_freq = strategy_map[strategy_label]
-
-    # ---- 4) Market data ----
-    st.subheader("4) Market data")
-
-    price_df_for_plot = price_df.copy()
-    if isinstance(price_df_for_plot.columns, pd.MultiIndex):
-        price_df_for_plot.columns = [
-            str(col[0]) if isinstance(col, tuple) else str(col)
-            for col in price_df_for_plot.columns
-        ]
-    else:
-        price_df_for_plot.columns = [str(c) for c in price_df_for_plot.columns]
-
-    st.line_chart(price_df_for_plot)
+    band = DEFAULT_BAND
+    if rebalancing_freq == "band":
+        band = st.slider(
+            "Band: rebalance when a weight drifts by more than (points)",
+            1, 20, int(DEFAULT_BAND * 100), key="rebalancing_band",
+        ) / 100
+
+    # Optional dated schedule: replaces the sliders, each new row is a rebalancing
+    schedule = None
+    schedule_file = st.file_uploader(
+        "Weight schedule (optional CSV: a date column, then one column per ticker)",
+        type="csv",
+        key="weight_schedule",
+    )
+    if schedule_file is not None:
+        try:
+            schedule = load_weight_schedule(schedule_file, valid_tickers)
+        except ValueError as e:
+            st.error(f"Invalid weight schedule: {e}")
+        else:
+            st.caption(
+                f"Schedule with {len(schedule)} dates "
+                f"({schedule.index[0].date()} → {schedule.index[-1].date()}); "
+                "the sliders are ignored."
+            )
+            # Diversification and the live value use the latest targets
+            weights = schedule.iloc[-1]
 
     # ---- 5) Portfolio performance ----
     st.subheader("5) Portfolio performance")
 
-    returns_df = compute_returns(price_df)
+    # Memo key: price fingerprint + weights (or schedule) + rebalancing mode
+    if schedule is None:
+        targets, weights_key = weights, tuple(weights.round(12).items())
+    else:
+        targets, weights_key = schedule, fingerprint(schedule)
+    run_key = (price_fp, weights_key, rebalancing_freq, band)
+    run_result = portfolio_run(returns_df, targets, rebalancing_freq, run_key, band)
+    if run_result is None:
+        # Still running in the background: job_progress reruns the page when done
+        return
 
-    # Try to use rebalancing parameter if backend supports it,
-    # otherwise fall back to the old signature.
-    try:
-        portfolio_returns = compute_portfolio_returns(
-            returns_df, weights, rebalancing=rebalancing_freq
-        )
-    except TypeError:
-        portfolio_returns = compute_portfolio_returns(returns_df, weights)
+    with timed("compute", f"portfolio stats ({rebalancing_freq})"):
+        portfolio_returns = run_result["returns"]
 
-    cum_value = compute_cumulative_value(portfolio_returns, initial_value=initial_value)
-    stats_df = portfolio_stats(portfolio_returns, periods_per_year=periods_per_year)
+        cum_value = compute_cumulative_value(portfolio_returns, initial_value=initial_value)
+        stats_df = cached_call(
+            DERIVED_CACHE,
+            portfolio_stats.uncached,
+            portfolio_returns,
+            periods_per_year=periods_per_year,
+            key=(run_key, periods_per_year),
+        ).copy()
 
-    curr_pf = cum_value.iloc[-1]
-    if len(cum_value) > 1:
-        prev_pf = cum_value.iloc[-2]
-        pf_delta = ((curr_pf - prev_pf) / prev_pf) * 100
-    else:
-        pf_delta = 0.0
+    live_portfolio_value(cum_value, weights, price_df)
 
-    st.metric(
-        label=" Portfolio Value (Current)", 
-        value=f"{curr_pf:.2f}", 
-        delta=f"{pf_delta:.2f} %"
-    )
     # --- Base 100 Comparison Chart (Portfolio vs Assets) ---
     st.markdown("####  Performance Comparison (Base 100)")
 
     # Normalize asset prices to start at 100 for comparison
-    normalized_assets = (price_df / price_df.iloc[0]) * 100
+    normalized_assets = cached_call(DERIVED_CACHE, _base_100, price_df, key=price_fp)
 
     # Normalize portfolio value to start at 100
     portfolio_normalized = (cum_value / cum_value.iloc[0]) * 100
@@ -275,7 +432,11 @@ def run(config=None):
     # Combine assets and portfolio into one DataFrame for plotting
     chart_data = pd.concat([normalized_assets, portfolio_df], axis=1)
 
-    st.line_chart(chart_data)
+    with timed("render", "base 100 chart"):
+        st.plotly_chart(
+            multi_line_chart(chart_data, yaxis_title="Base 100"),
+            use_container_width=True,
+        )
 
     # --- Calculate Max Drawdown ---
     rolling_max = cum_value.cummax()
@@ -299,8 +460,11 @@ def run(config=None):
     # ---- 6) Diversification effect ----
     st.subheader("6) Diversification effect")
 
-    # Annualized volatility of each asset
-    asset_vol_annual = returns_df.std() * (periods_per_year ** 0.5)
+    # Annualized volatility of each asset (depends on prices only)
+    asset_vol_annual = cached_call(
+        DERIVED_CACHE, _annual_vol, returns_df, periods_per_year,
+        key=(price_fp, periods_per_year),
+    )
 
     # Align weights with returns_df columns
     if isinstance(weights, pd.Series):
@@ -334,16 +498,302 @@ def run(config=None):
     with col3:
         st.metric("Vol reduction (%)", f"{vol_reduction_pct:.2f}")
 
-    # ---- 7) Correlation matrix ----
-    st.subheader("7) Correlation between assets")
+    # Trading implied by the rebalancing rule / schedule (one-way, annualized)
+    total_turnover = run_result["total_turnover"]
+    annual_turnover = float(total_turnover.sum()) * periods_per_year / max(len(total_turnover), 1)
+    col1, col2 = st.columns(2)
+    with col1:
+        st.metric("Annual turnover (%)", f"{annual_turnover * 100:.1f}")
+    with col2:
+        st.metric("Max drift from target (%)", f"{run_result['drift'].abs().to_numpy().max() * 100:.2f}")
+
+    with st.expander("Holdings, drift and turnover"):
+        st.markdown("Post-trade holdings (last rows)")
+        st.dataframe(run_result["holdings"].tail())
+        st.markdown("Drift from target weights before trading (last rows)")
+        st.dataframe(run_result["drift"].tail())
+        rebalances = total_turnover[total_turnover > 0]
+        st.markdown(f"Rebalancing dates: {len(rebalances)}")
+        st.dataframe(rebalances.to_frame().tail(10))
+
+    with st.expander("Risk decomposition (statistical factors)"):
+        from src.portfolio.factors import pca_factors, risk_attribution
+
+        # A slider needs min < max: a single asset has exactly one component
+        if len(valid_tickers) > 1:
+            n_factors = st.slider(
+                "Number of factors (principal components)",
+                min_value=1,
+                max_value=min(10, len(valid_tickers)),
+                value=min(3, len(valid_tickers)),
+                key="n_factors",
+            )
+        else:
+            n_factors = 1
+        with timed("compute", f"pca factors (k={n_factors})"):
+            model = cached_call(DERIVED_CACHE, pca_factors, returns_df, n_factors, key=(price_fp, n_factors))
+            attribution = risk_attribution(model, w_aligned, periods_per_year=periods_per_year)
+
+        factor_share = 100.0 - float(attribution["factors"].loc["Specific", "share (%)"])
+        col1, col2, col3 = st.columns(3)
+        with col1:
+            st.metric("Variance explained (%)", f"{model.explained_variance_ratio.sum() * 100:.1f}")
+        with col2:
+            st.metric("Factor risk (%)", f"{factor_share:.1f}")
+        with col3:
+            st.metric("Model vol (%)", f"{attribution['total_vol'] * 100:.2f}")
+
+        st.markdown("Portfolio variance by factor")
+        st.dataframe(
+            attribution["factors"].style.format(
+                {"exposure": "{:.3f}", "variance (ann.)": "{:.2e}", "share (%)": "{:.1f}"}, na_rep=""
+            )
+        )
+        st.markdown("Risk contribution of each asset (largest first)")
+        st.dataframe(
+            attribution["assets"].sort_values("risk share (%)", ascending=False).head(20).style.format(
+                {"weight": "{:.3f}", "risk share (%)": "{:.1f}", "marginal vol (ann.)": "{:.3f}"}
+            )
+        )
+        st.markdown("Loadings (first factors)")
+        st.dataframe(model.loadings.round(3).head(20))
+
+    with st.expander("Stress tests (historical crises and factor shocks)"):
+        from src.portfolio.scenarios import build_scenarios, stress_test
+
+        st.caption(
+            f"Daily returns over each window, {rebalancing_freq} rebalancing. "
+            "Assets without data in a window count as cash."
+        )
+        with timed("compute", "stress tests"):
+            scenarios = build_scenarios(valid_tickers)
+            candidates = {"Current": w_aligned, "Equal weight": equal_weights(valid_tickers)}
+            for name, allocator in ALLOCATIONS.items():
+                if allocator is not None:
+                    try:
+                        candidates[name] = cached_call(
+                            DERIVED_CACHE, _allocator(allocator), returns_df, 0.0, 1.0, key=(price_fp, 0.0, 1.0)
+                        )
+                    except ValueError:
+                        pass
+            stress = stress_test(scenarios, candidates, rebalancing=rebalancing_freq, band=band)
+
+        if not scenarios.names:
+            st.info("No scenario window overlaps the history of these assets.")
+        else:
+            st.markdown("Total return over the scenario (%)")
+            st.dataframe((stress["total_return"] * 100).style.format("{:.2f}"))
+            st.markdown("Max drawdown within the scenario (%)")
+            st.dataframe((stress["max_drawdown"] * 100).style.format("{:.2f}"))
+            partial = stress["coverage"]["Current"] < 1.0 - 1e-9
+            if partial.any():
+                st.caption(
+                    "Partial data (share of the current weights covered): "
+                    + ", ".join(f"{n} {v:.0%}" for n, v in stress["coverage"]["Current"][partial].items())
+                )
+
+    with st.expander("Relative to a benchmark"):
+        from src.evaluation.relative import (
+            get_benchmark_returns,
+            load_benchmark_settings,
+            relative_metrics,
+            rolling_relative,
+        )
 
-    corr_df = compute_correlation_matrix(returns_df)
-    st.dataframe(corr_df.style.background_gradient(cmap="coolwarm"))
+        bench_settings = load_benchmark_settings()
+        benchmark = st.text_input(
+            "Benchmark ticker", value=bench_settings["ticker"], key="portfolio_benchmark"
+        ).strip().upper()
+        with timed("compute", f"relative to {benchmark}"):
+            bench_returns = get_benchmark_returns(price_df.index, benchmark, period, interval)
+            relative_input = returns_df.assign(Portfolio=portfolio_returns)[["Portfolio", *returns_df.columns]]
+            relative = relative_metrics(relative_input, bench_returns, periods_per_year=periods_per_year)
+            window = min(bench_settings["rolling_window"], max(len(portfolio_returns) // 3, 2))
+            rolling = rolling_relative(portfolio_returns.rename("Portfolio"), bench_returns, window, periods_per_year)
+
+        if relative["observations"].max() < 2:
+            st.info(f"No benchmark data for {benchmark}.")
+        else:
+            st.dataframe(
+                relative.style.format(
+                    {
+                        "beta": "{:.2f}", "alpha": "{:.2%}", "correlation": "{:.2f}",
+                        "tracking_error": "{:.2%}", "information_ratio": "{:.2f}",
+                        "up_capture": "{:.2f}", "down_capture": "{:.2f}",
+                    },
+                    na_rep="",
+                )
+            )
+            chart = pd.DataFrame({
+                f"Rolling beta ({window} bars)": rolling["beta"]["Portfolio"],
+                f"Rolling correlation ({window} bars)": rolling["correlation"]["Portfolio"],
+            })
+            st.plotly_chart(multi_line_chart(chart, yaxis_title="vs " + benchmark), use_container_width=True)
 
     with st.expander("Show first portfolio daily returns"):
         st.dataframe(portfolio_returns.to_frame().head())
 
 
+def portfolio_run(returns_df, targets, rebalancing_freq, run_key, band):
+    """
+    Result of ``run_portfolio``, inline for small universes, otherwise as
+    a background job.
+
+    Sessions asking for the same run share one job. Short jobs are waited
+    for; longer ones show their progress (with a cancel button) and
+    return None until they finish. A failed job shows its error until the
+    inputs change (or it is retried).
+    """
+    from src.data.cache import DERIVED_CACHE, cached_call, fingerprint
+    from src.jobs.runner import JOB_MANAGER, job_result, submit_job
+    from src.portfolio.portfolio_engine import run_portfolio
+
+    if returns_df.size < JOB_MIN_CELLS:
+        with timed("compute", f"portfolio ({rebalancing_freq})"):
+            return cached_call(
+                DERIVED_CACHE, run_portfolio, returns_df, targets, rebalancing=rebalancing_freq, band=band, key=run_key
+            )
+
+    job_key = fingerprint("portfolio", run_key)
+    cancelled = st.session_state.setdefault("cancelled_jobs", set())
+    if job_key in cancelled:
+        st.info("Portfolio run cancelled.")
+        if not st.button("Run again", key=f"rerun_{job_key}"):
+            return None
+        cancelled.discard(job_key)
+
+    submit_job(
+        run_portfolio,
+        returns_df,
+        targets,
+        rebalancing=rebalancing_freq,
+        band=band,
+        key=job_key,
+        label=f"portfolio ({rebalancing_freq})",
+    )
+    with timed("compute", f"portfolio ({rebalancing_freq})"):
+        JOB_MANAGER.wait(job_key, timeout=JOB_INLINE_WAIT)
+    result = job_result(job_key)
+    if result is None:
+        job_progress(job_key)
+    return result
+
+
+@st.fragment(run_every=JOB_POLL_SECONDS)
+def job_progress(job_key):
+    """Progress of a background job; reruns the page once its result is ready."""
+    from src.jobs.runner import cancel_job, job_status, retry_job
+
+    info = job_status(job_key)
+    if info is None or info["status"] in ("done", "expired"):
+        st.rerun()
+    elif info["status"] == "failed":
+        # Kept until the inputs change, so a rerun does not submit it again
+        st.error(f"Portfolio run failed: {info['error']}")
+        if st.button("Retry", key=f"retry_{job_key}"):
+            retry_job(job_key)
+            st.rerun()
+    elif info["status"] == "cancelled":
+        st.info("Portfolio run cancelled.")
+    else:
+        label = info["message"] or info["status"]
+        st.progress(info["progress"], text=f"Computing {info['label']}: {label} ({info['elapsed_s']:.0f} s)")
+        if st.button("Cancel", key=f"cancel_{job_key}"):
+            cancel_job(job_key)
+            st.session_state.setdefault("cancelled_jobs", set()).add(job_key)
+            st.rerun()
+
+
+@st.fragment(run_every=LIVE_REFRESH_SECONDS)
+def live_market_data(price_df):
+    """Latest price and change of each asset, patched from live quotes."""
+    valid_tickers = list(price_df.columns)
+
+    st.markdown("###  Live Market Data")
+
+    # The first run of the page uses the history it just loaded; the timer
+    # runs fetch the latest quotes only (no history download) and patch
+    # the cached histories with them.
+    now = time.time()
+    last_refresh = st.session_state.get("quotes_refreshed_at")
+    quotes = st.session_state.get("live_quotes")
+    if last_refresh is None:
+        st.session_state["quotes_refreshed_at"] = now
+    elif now - last_refresh >= LIVE_REFRESH_SECONDS - 1:
+        try:
+            quotes = refresh_quotes(valid_tickers)
+            st.session_state["live_quotes"] = quotes
+        except Exception as e:
+            st.caption(f"Live quotes unavailable: {e}")
+        st.session_state["quotes_refreshed_at"] = now
+
+    # Calculate daily percentage change for visual indicators
+    if len(price_df) > 1:
+        prev_prices = price_df.iloc[-2]
+        last_prices = price_df.iloc[-1]
+        pct_change = ((last_prices - prev_prices) / prev_prices) * 100
+    else:
+        # Fallback if not enough data
+        pct_change = pd.Series(0, index=valid_tickers)
+
+    cols = st.columns(len(valid_tickers))
+    for col, t in zip(cols, valid_tickers):
+        if quotes is not None and t in quotes.index:
+            curr_price = quotes.at[t, "price"]
+            delta_val = quotes.at[t, "pct_change"]
+        elif t in price_df:
+            curr_price = price_df[t].iloc[-1]
+            delta_val = pct_change[t]
+        else:
+            col.metric(t, "N/A")
+            continue
+        # Display price with green/red indicator
+        col.metric(
+            label=t, 
+            value=f"{curr_price:.2f}", 
+            delta=f"{delta_val:.2f} %"
+        )
+
+
+@st.fragment(run_every=LIVE_REFRESH_SECONDS)
+def live_portfolio_value(cum_value, weights, price_df):
+    """
+    Current portfolio value, repriced with the latest quotes.
+
+    The value at the previous bar is moved by the weighted quote returns
+    of the assets (constant-weight approximation for the current bar).
+    """
+    curr_pf = cum_value.iloc[-1]
+    prev_pf = cum_value.iloc[-2] if len(cum_value) > 1 else None
+
+    quotes = st.session_state.get("live_quotes")
+    if quotes is not None and prev_pf is not None and len(price_df) > 1:
+        prev_prices = price_df.iloc[-2]
+        live_prices = quotes["price"].reindex(price_df.columns).fillna(price_df.iloc[-1])
+        asset_rets = live_prices / prev_prices - 1.0
+        w = weights.reindex(price_df.columns).fillna(0.0)
+        curr_pf = prev_pf * (1.0 + float((w * asset_rets).sum()))
+
+    if prev_pf is not None:
+        pf_delta = ((curr_pf - prev_pf) / prev_pf) * 100
+    else:
+        pf_delta = 0.0
+
+    st.metric(
+        label=" Portfolio Value (Current)", 
+        value=f"{curr_pf:.2f}", 
+        delta=f"{pf_delta:.2f} %"
+    )
+
+
+def _base_100(price_df):
+    return (price_df / price_df.iloc[0]) * 100
+
+
+def _annual_vol(returns_df, periods_per_year):
+    return returns_df.std() * (periods_per_year ** 0.5)
+
+
 if __name__ == "__main__":
     # Run with:  streamlit run pages/Portfolio.py
     run()
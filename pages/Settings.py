@@ -1,7 +1,13 @@
+import sys
 import streamlit as st
 import yaml
 from pathlib import Path
 
+# Allow imports like "from src.data.fetch_yf import get_history"
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.append(str(ROOT))
+
 st.set_page_config(
     page_title="Settings",
     page_icon="⚙️",
@@ -42,11 +48,12 @@ if config is None:
     st.error("Could not load configuration file. Please check that config.yaml exists.")
     st.stop()
 
-tab1, tab2, tab3, tab4 = st.tabs([
+tab1, tab2, tab3, tab4, tab5 = st.tabs([
     "📊 Report Assets", 
     "💼 Portfolio Assets", 
     "📈 Default Tickers",
-    "⚙️ Report Settings"
+    "⚙️ Report Settings",
+    "🚀 Cache & Performance"
 ])
 
 with tab1:
@@ -277,6 +284,198 @@ with tab4:
                     st.success(f"Interval updated to {selected_interval_label}")
                     st.rerun()
 
+with tab5:
+    import pandas as pd
+    from src.data.cache import CACHE_REGISTRY
+    from src.data.archive import archived_histories, load_archive_settings, remove_history
+    from src.data.fetch_yf import HISTORY_CACHE, data_backend, get_history
+    from src.monitoring.timings import recent_timings
+    from src.monitoring import tracing
+    # Imported so that their caches are registered even before first use
+    import app.components.downsampling  # noqa: F401
+    from src.data.result_store import get_result_store
+
+    get_result_store()
+
+    st.header("Cache & Performance")
+    st.markdown(
+        "Inspect and tune the in-process caches shared by all sessions, and the result store "
+        "shared by every process."
+    )
+
+    # ---- Cache overview ----
+    st.subheader("Caches")
+    caches = dict(CACHE_REGISTRY)
+    st.dataframe(
+        pd.DataFrame([c.stats() for c in caches.values()]).style.format(
+            {"size_mb": "{:.2f}", "max_mb": "{:.0f}", "hit_rate (%)": "{:.1f}"}
+        ),
+        hide_index=True,
+    )
+
+    for name, cache in caches.items():
+        with st.expander(f"Entries of {name} ({len(cache)})"):
+            entries = cache.entries()
+            if not entries:
+                st.info("Empty cache")
+                continue
+            st.dataframe(
+                pd.DataFrame(entries).style.format({"size_kb": "{:.1f}", "age_s": "{:.0f}"}),
+                hide_index=True,
+            )
+            keys = {str(k): k for k in cache.keys()}
+            selected = st.multiselect("Entries to invalidate", list(keys), key=f"invalidate_{name}")
+            col_sel, col_all = st.columns(2)
+            with col_sel:
+                if st.button("🗑️ Invalidate selected", key=f"invalidate_sel_{name}", disabled=not selected):
+                    for k in selected:
+                        cache.invalidate(keys[k])
+                    st.rerun()
+            with col_all:
+                if st.button("🧹 Clear cache", key=f"clear_{name}"):
+                    cache.invalidate()
+                    st.rerun()
+
+    # ---- Invalidate one ticker ----
+    st.subheader("Invalidate a ticker")
+    ticker_to_drop = st.text_input(
+        "Ticker Symbol",
+        key="invalidate_ticker",
+        placeholder="e.g., AAPL"
+    ).upper().strip()
+    if st.button("🔄 Drop cached history", key="invalidate_ticker_btn"):
+        dropped = [k for k in HISTORY_CACHE.keys() if k[0] == ticker_to_drop]
+        for k in dropped:
+            HISTORY_CACHE.invalidate(k)
+        archived = remove_history(ticker_to_drop, backend=data_backend())
+        if dropped or archived:
+            st.success(
+                f"Dropped {len(dropped)} cached and {archived} archived histories for {ticker_to_drop}"
+            )
+        else:
+            st.warning(f"No cached history for {ticker_to_drop}")
+
+    # ---- Price archive ----
+    st.subheader("Price archive")
+    archive_settings = load_archive_settings()
+    st.markdown(
+        f"Downloaded histories are stored in `{archive_settings['root']}` and memory-mapped "
+        "by every session and process, instead of being copied into each one."
+    )
+    archived = archived_histories(backend=data_backend())
+    if archived:
+        st.dataframe(
+            pd.DataFrame(archived).style.format({"size_kb": "{:.1f}", "age_s": "{:.0f}"}),
+            hide_index=True,
+        )
+    else:
+        st.info("The archive is empty" if archive_settings["enabled"] else "The archive is disabled")
+
+    # ---- Limits ----
+    st.subheader("Limits")
+    st.markdown("Byte budget and time-to-live of each cache (TTL 0 = no expiry).")
+    cache_settings = config.get('cache', {}) or {}
+    new_settings = {}
+    for name, cache in caches.items():
+        col_name, col_mb, col_ttl = st.columns([2, 1, 1])
+        with col_name:
+            st.text(name)
+        with col_mb:
+            max_mb = st.number_input(
+                "Max size (MB)", min_value=1, value=int(cache.max_bytes / 1024 / 1024),
+                key=f"max_mb_{name}",
+            )
+        with col_ttl:
+            ttl = st.number_input(
+                "TTL (s)", min_value=0, value=int(cache.ttl or 0), key=f"ttl_{name}",
+            )
+        new_settings[name] = {"max_mb": int(max_mb), "ttl_seconds": int(ttl)}
+
+    if st.button("💾 Apply & save limits", key="save_cache_limits"):
+        for name, values in new_settings.items():
+            caches[name].configure(
+                max_bytes=values["max_mb"] * 1024 * 1024, ttl=values["ttl_seconds"]
+            )
+        cache_settings.update(new_settings)
+        config['cache'] = cache_settings
+        if save_config(config):
+            st.success("Cache limits applied and saved")
+            st.rerun()
+
+    # ---- Prewarm ----
+    st.subheader("Prewarm")
+    prewarm_assets = list(dict.fromkeys(
+        config.get('report_assets', []) + config.get('portfolio_assets', [])
+    ))
+    prewarm_period = config.get('period', '3mo')
+    prewarm_interval = config.get('interval', '1d')
+    st.markdown(
+        f"Download the histories of the report and portfolio assets "
+        f"({', '.join(prewarm_assets) or 'none'}) with period `{prewarm_period}` "
+        f"and interval `{prewarm_interval}`."
+    )
+    if st.button("🔥 Prewarm caches", key="prewarm", disabled=not prewarm_assets):
+        progress = st.progress(0.0)
+        failed = []
+        for i, asset in enumerate(prewarm_assets):
+            try:
+                df = get_history(asset, period=prewarm_period, interval=prewarm_interval)
+                if df is None or df.empty:
+                    failed.append(asset)
+            except Exception:
+                failed.append(asset)
+            progress.progress((i + 1) / len(prewarm_assets))
+        if failed:
+            st.warning("Could not prewarm: " + ", ".join(failed))
+        else:
+            st.success(f"Prewarmed {len(prewarm_assets)} assets")
+
+    # ---- Background jobs ----
+    st.subheader("Background jobs")
+    from src.jobs.runner import JOB_MANAGER, cancel_job
+    jobs = JOB_MANAGER.jobs()
+    if jobs:
+        jobs_df = pd.DataFrame(jobs)[["label", "status", "progress", "elapsed_s", "error", "key"]]
+        st.dataframe(
+            jobs_df.style.format({"progress": "{:.0%}", "elapsed_s": "{:.1f}"}, na_rep=""),
+            hide_index=True,
+        )
+        active = [j["key"] for j in jobs if j["status"] in ("queued", "running")]
+        if active and st.button(f"Cancel {len(active)} active job(s)", key="cancel_jobs"):
+            for key in active:
+                cancel_job(key)
+            st.rerun()
+    else:
+        st.info(f"No job submitted yet in this process ({JOB_MANAGER.workers} worker processes)")
+
+    # ---- Timings ----
+    st.subheader("Recent timings")
+    timings = recent_timings()
+    if timings:
+        timings_df = pd.DataFrame(timings)
+        timings_df["time"] = pd.to_datetime(timings_df["time"], unit="s")
+        summary = timings_df.groupby("stage")["ms"].agg(["count", "mean", "median", "max"])
+        st.dataframe(summary.style.format("{:.1f}", subset=["mean", "median", "max"]))
+        st.dataframe(timings_df.head(100).style.format({"ms": "{:.1f}"}), hide_index=True)
+    else:
+        st.info("No timings recorded yet in this process")
+
+    # ---- Tracing ----
+    st.subheader("Span latency")
+    if not tracing.is_enabled():
+        st.info("Tracing is disabled. Set `tracing: enabled: true` in config.yaml (or PGLFF_TRACING=1) and restart the app.")
+    else:
+        session_options = ["All sessions"] + tracing.sessions()
+        selected_session = st.selectbox("Session", session_options, key="trace_session_select")
+        rows = tracing.latency_summary(None if selected_session == "All sessions" else selected_session)
+        if rows:
+            st.dataframe(
+                pd.DataFrame(rows).style.format("{:.2f}", subset=["p50_ms", "p95_ms", "p99_ms"]),
+                hide_index=True,
+            )
+        else:
+            st.info("No spans recorded yet")
+
 st.markdown("---")
 st.subheader("📄 Current Configuration")
 
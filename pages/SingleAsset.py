@@ -1,7 +1,8 @@
 import streamlit as st
-import pandas as pd
 from streamlit_autorefresh import st_autorefresh
-from datetime import datetime
+from datetime import datetime, timedelta
+import time
+from uuid import uuid4
 
 from app.components.widgets import (
     select_asset,
@@ -10,19 +11,18 @@ from app.components.widgets import (
     select_strategy,
     momentum_period_slider,
 )
-from app.components.charts import price_and_strategy_chart
 
-from src.data.fetch_yf import get_history
-from src.strategies.buy_and_hold import run_buy_and_hold
-from src.strategies.momentum import run_momentum
-from src.strategies.mean_reversion import run_mean_reversion
-from src.evaluation.backtesting import backtest
+# The data layer, strategies and charts are imported where they are first
+# needed, so that the page header and sidebar render before the heavy
+# dependencies (pandas, yfinance, plotly) are loaded.
 
 st.set_page_config(
     page_title="Analysis of a single asset (Quant A)",
     layout="wide",
 )
 
+# Full refresh every 5 minutes (served from the history cache); the live
+# price below refreshes every LIVE_REFRESH_SECONDS through quotes only.
 count = st_autorefresh(interval=300000, limit=None, key="single_asset_refresh")
 
 st.title("Analysis of a single asset (Quant A)")
@@ -32,13 +32,15 @@ st.toast(f"Data updated - {datetime.now().strftime('%H:%M:%S')}")
 with st.sidebar:
     st.header("Parameters")
     ticker = select_asset()
-    period = select_period()
     interval = select_interval()
+    period = select_period(interval)
     strategy_name = select_strategy()
 
     ma_period = None
     mr_period = None
     mr_threshold = None
+    mr_exit = None
+    stop_loss = None
 
     if strategy_name == "Momentum":
         ma_period = momentum_period_slider(default=20)
@@ -46,6 +48,56 @@ with st.sidebar:
     elif strategy_name == "Mean Reversion":
         mr_period = st.slider("MA Period (mean reversion)", 5, 60, 20)
         mr_threshold = st.slider("Threshold (%)", 1, 10, 2) / 100
+        if st.checkbox("Hold until the price is back to its average", value=False):
+            mr_exit = 0.0
+
+    if strategy_name != "Buy & Hold":
+        # 0 = no stop
+        stop_loss = st.slider("Trailing stop-loss (%)", 0, 30, 0) / 100 or None
+
+
+from src.data.fetch_yf import get_history
+from src.data.intervals import asset_type, bar_minutes, format_timestamp, is_intraday, periods_per_year
+from src.data.quality import quality_report
+from src.data.quotes import LIVE_REFRESH_SECONDS, refresh_intraday, refresh_quotes
+from src.evaluation.backtesting import backtest
+from src.monitoring.timings import timed
+from src.monitoring.tracing import init_tracing, set_session
+
+init_tracing()
+set_session(st.session_state.setdefault("trace_session", uuid4().hex[:8]))
+
+# Bars per year on the asset's calendar (crypto trades 24/7)
+ppy = periods_per_year(interval, asset_type(ticker))
+
+
+@st.fragment(run_every=LIVE_REFRESH_SECONDS)
+def live_price(ticker, df):
+    """Latest price of the asset, patched from live quotes."""
+    now = time.time()
+    state_key = f"live_quote_{ticker}"
+    last_refresh, quote = st.session_state.get(state_key, (None, None))
+
+    # The first run uses the loaded history; timer runs fetch the latest
+    # quote only and patch the cached history with it.
+    if last_refresh is None:
+        st.session_state[state_key] = (now, None)
+    elif now - last_refresh >= LIVE_REFRESH_SECONDS - 1:
+        try:
+            quotes = refresh_quotes([ticker])
+            if ticker in quotes.index:
+                quote = quotes.loc[ticker]
+        except Exception as e:
+            st.caption(f"Live quote unavailable: {e}")
+        st.session_state[state_key] = (now, quote)
+
+    if quote is not None:
+        price, delta = quote["price"], quote["pct_change"]
+    else:
+        price = df["price"].iloc[-1]
+        delta = (price / df["price"].iloc[-2] - 1) * 100 if len(df) > 1 else 0.0
+
+    st.metric(f"{ticker} (live)", f"{price:,.2f}", delta=f"{delta:.2f} %")
 
 
 try:
@@ -54,6 +106,9 @@ try:
         if df is None or df.empty:
             st.error(f"No data available for {ticker} with period '{period}' and interval '{interval}'.")
             st.stop()
+        # Intraday: append the bars formed since the last refresh (bounded window)
+        if is_intraday(interval) and refresh_intraday([ticker], interval):
+            df = get_history(ticker, period=period, interval=interval)
 except Exception as e:
     st.error(f"Error downloading data: {e}")
     st.stop()
@@ -63,18 +118,31 @@ st.subheader(f"History of {ticker}")
 col_top_left, col_top_right = st.columns(2)
 
 col_top_left.write(
-    f"Downloaded period: {df.index.min().date()} → {df.index.max().date()}"
+    f"Downloaded period: {format_timestamp(df.index.min(), interval)} → "
+    f"{format_timestamp(df.index.max(), interval)}"
 )
 col_top_right.write(f"Number of points: {len(df)}")
 
-if strategy_name == "Buy & Hold":
-    strategy_series = run_buy_and_hold(df)
-elif strategy_name == "Momentum":
-    strategy_series = run_momentum(df, period=ma_period)
-else:
-    strategy_series = run_mean_reversion(df, period=mr_period, threshold=mr_threshold)
+quality = quality_report(ticker, period, interval)
+if quality is not None and quality["issues"]:
+    st.warning(f"Data quality for {ticker}: " + "; ".join(quality["issues"]) + ".")
+
+live_price(ticker, df)
+
+with timed("compute", f"{ticker} {strategy_name}"):
+    if strategy_name == "Buy & Hold":
+        from src.strategies.buy_and_hold import run_buy_and_hold
+        strategy_series = run_buy_and_hold(df)
+    elif strategy_name == "Momentum":
+        from src.strategies.momentum import run_momentum
+        strategy_series = run_momentum(df, period=ma_period, stop_loss=stop_loss)
+    else:
+        from src.strategies.mean_reversion import run_mean_reversion
+        strategy_series = run_mean_reversion(
+            df, period=mr_period, threshold=mr_threshold, exit_threshold=mr_exit, stop_loss=stop_loss
+        )
 
-results = backtest(strategy_series)
+    results = backtest(strategy_series, periods_per_year=ppy)
 
 st.subheader("Performance Indicators")
 
@@ -97,10 +165,132 @@ m4.metric(
     f"{results['max_drawdown']*100:,.2f} %",
 )
 
+with st.expander("Drawdown episodes"):
+    from src.evaluation.metrics import drawdown_table
+
+    drawdowns = drawdown_table(strategy_series, top=10)
+    if drawdowns.empty:
+        st.write("No drawdown over this period.")
+    else:
+        drawdowns["depth"] = (drawdowns["depth"] * 100).round(2)
+        st.dataframe(drawdowns.rename(columns={"depth": "depth (%)", "length": "length (bars)"}))
+
+with st.expander("Execution simulation (sizing, costs, stops)"):
+    from src.execution.models import Sizing, load_execution_settings
+
+    exec_settings = load_execution_settings()
+    e1, e2, e3 = st.columns(3)
+    capital = e1.number_input("Capital", min_value=1000.0, value=exec_settings["initial_capital"], step=10000.0)
+    size_pct = e1.slider("Position size (% of equity)", 5, 100, int(min(exec_settings["sizing"].value, 1.0) * 100))
+    slippage_bps = e2.number_input("Slippage (bps)", min_value=0.0, value=exec_settings["costs"].slippage_bps)
+    per_unit = e2.number_input(
+        "Commission per share", min_value=0.0, value=exec_settings["costs"].commission_per_unit, format="%.4f"
+    )
+    exit_stop = e3.slider("Stop-loss from entry (%)", 0, 30, 0) / 100 or None
+    take_profit = e3.slider("Take-profit from entry (%)", 0, 50, 0) / 100 or None
+    run_exec = st.toggle("Simulate", value=False, key="simulate_execution")
+
+    if run_exec:
+        import pandas as pd
+        from src.execution.engine import run_execution
+
+        if strategy_name == "Buy & Hold":
+            exec_strategy, exec_params = "buy_and_hold", {}
+        elif strategy_name == "Momentum":
+            exec_strategy, exec_params = "momentum", {"period": ma_period, "stop_loss": stop_loss}
+        else:
+            exec_strategy, exec_params = "mean_reversion", {
+                "period": mr_period, "threshold": mr_threshold, "exit_threshold": mr_exit, "stop_loss": stop_loss,
+            }
+        with timed("compute", f"{ticker} {strategy_name} execution"):
+            execution = run_execution(
+                df,
+                exec_strategy,
+                exec_params,
+                interval=interval,
+                sizing=Sizing("fraction", size_pct / 100, exec_settings["sizing"].lot_size),
+                costs=exec_settings["costs"]._replace(slippage_bps=slippage_bps, commission_per_unit=per_unit),
+                initial_capital=capital,
+                asset_type=asset_type(ticker),
+                stop_loss=exit_stop,
+                take_profit=take_profit,
+            )
+        comparison = pd.DataFrame({"Strategy (no costs)": results, "Executed": execution.metrics}).T
+        st.dataframe(comparison.round(4))
+        stats = execution.stats
+        st.caption(
+            f"{stats['trades']} round trips, commissions {stats['commission']:,.2f}, "
+            f"slippage {stats['slippage']:,.2f}, final equity {stats['final_equity']:,.2f}"
+        )
+        if not execution.trades.empty:
+            st.dataframe(execution.trades.tail(50))
+
 st.subheader("Price and Strategy")
 
-fig = price_and_strategy_chart(df, strategy_series, title=f"{ticker} - {strategy_name}")
-st.plotly_chart(fig, use_container_width=True)
+import pandas as pd
+from app.components.charts import price_and_strategy_chart
+from app.components.downsampling import DEFAULT_POINT_BUDGET, points_per_trace
+
+# Long histories are downsampled to the point budget: narrowing the visible
+# range spends the same budget on fewer bars, which gives back full detail.
+x_range = None
+if len(df) > points_per_trace(2, DEFAULT_POINT_BUDGET):
+    first, last = df.index[0].tz_localize(None), df.index[-1].tz_localize(None)
+    visible = st.slider(
+        "Visible range",
+        min_value=first.to_pydatetime(),
+        max_value=last.to_pydatetime(),
+        value=(first.to_pydatetime(), last.to_pydatetime()),
+        step=timedelta(minutes=bar_minutes(interval)) if is_intraday(interval) else None,
+        key="chart_range",
+    )
+    if visible != (first.to_pydatetime(), last.to_pydatetime()):
+        x_range = tuple(
+            pd.Timestamp(v).tz_localize(df.index.tz, ambiguous=True, nonexistent="shift_forward") for v in visible
+        )
+
+with timed("render", "price_and_strategy_chart"):
+    fig = price_and_strategy_chart(df, strategy_series, title=f"{ticker} - {strategy_name}", x_range=x_range)
+    st.plotly_chart(fig, use_container_width=True)
+
+st.subheader("Relative to Benchmark")
+
+from src.evaluation.relative import (
+    get_benchmark_returns,
+    load_benchmark_settings,
+    relative_metrics,
+    rolling_relative,
+)
+
+bench_settings = load_benchmark_settings()
+benchmark = st.text_input("Benchmark ticker", value=bench_settings["ticker"], key="benchmark").strip().upper()
+
+with timed("compute", f"{ticker} vs {benchmark}"):
+    bench_returns = get_benchmark_returns(df.index, benchmark, period, interval)
+    asset_returns = pd.DataFrame(
+        {ticker: df["price"], strategy_name: strategy_series}
+    ).pct_change(fill_method=None)
+    relative = relative_metrics(asset_returns, bench_returns, periods_per_year=ppy)
+
+if relative["observations"].max() < 2:
+    st.info(f"No benchmark data for {benchmark} over this period and interval.")
+else:
+    r1, r2, r3, r4 = st.columns(4)
+    strat = relative.loc[strategy_name]
+    r1.metric("Beta (strategy)", f"{strat['beta']:.2f}")
+    r2.metric("Alpha (strategy, annual)", f"{strat['alpha']*100:,.2f} %")
+    r3.metric("Tracking error", f"{strat['tracking_error']*100:,.2f} %")
+    r4.metric("Information ratio", f"{strat['information_ratio']:.2f}")
+
+    with st.expander(f"Details vs {benchmark}"):
+        st.dataframe(relative.round(3))
+        window = min(bench_settings["rolling_window"], max(len(df) // 3, 2))
+        rolling = rolling_relative(asset_returns, bench_returns, window, ppy)
+        from app.components.charts import multi_line_chart
+        st.plotly_chart(
+            multi_line_chart(rolling["beta"], title=f"Rolling beta ({window} bars)", yaxis_title="Beta"),
+            use_container_width=True,
+        )
 
 with st.expander("View raw data"):
     st.dataframe(df.tail(20))
\ No newline at end of file
@@ -2,26 +2,14 @@ import sys
 from pathlib import Path
 from datetime import datetime
 import json
-import pandas as pd
 import yaml
 
 ROOT = Path(__file__).resolve().parents[1]
 if str(ROOT) not in sys.path:
     sys.path.append(str(ROOT))
 
-from src.data.fetch_yf import get_history
-from src.evaluation.metrics import (
-    annualized_volatility,
-    max_drawdown,
-    total_return,
-    daily_returns
-)
-from src.portfolio.portfolio_engine import (
-    compute_portfolio_returns,
-    compute_cumulative_value,
-    portfolio_stats
-)
-from src.portfolio.weights import equal_weights
+# The analytics stack (pandas, yfinance, src.*) is imported inside the
+# report functions, after the configuration has been read.
 
 
 def load_config():
@@ -51,6 +39,15 @@ def load_config():
 
 
 def generate_asset_report(ticker, period="3mo", interval="1d"):
+    from src.data.fetch_yf import get_history
+    from src.data.intervals import asset_type, periods_per_year
+    from src.data.quality import quality_report
+    from src.evaluation.metrics import (
+        annualized_volatility,
+        max_drawdown,
+        total_return,
+    )
+
     try:
         df = get_history(ticker, period=period, interval=interval)
         
@@ -65,7 +62,7 @@ def generate_asset_report(ticker, period="3mo", interval="1d"):
         first = df.iloc[0]
         
         price_series = df['price']
-        vol = annualized_volatility(price_series)
+        vol = annualized_volatility(price_series, freq=periods_per_year(interval, asset_type(ticker)))
         mdd = max_drawdown(price_series)
         tot_return = total_return(price_series)
         
@@ -83,7 +80,8 @@ def generate_asset_report(ticker, period="3mo", interval="1d"):
             "annualized_volatility": float(vol),
             "max_drawdown": float(mdd),
             "data_points": len(df),
-            "period": period
+            "period": period,
+            "data_quality": quality_report(ticker, period, interval),
         }
         
         return report
@@ -96,30 +94,60 @@ def generate_asset_report(ticker, period="3mo", interval="1d"):
         }
 
 
-def generate_portfolio_report(tickers, period="3mo", interval="1d"):
+def generate_portfolio_report(tickers, period="3mo", interval="1d", n_factors=3):
+    from src.data.alignment import align_prices, load_alignment_settings
+    from src.data.fetch_yf import get_history
+    from src.data.intervals import periods_per_year, universe_asset_type
+    from src.data.precision import returns_from_prices
+    from src.data.quality import quality_report
+    from src.evaluation.backtesting import backtest
+    from src.evaluation.relative import get_benchmark_returns, load_benchmark_settings, relative_metrics
+    from src.portfolio.factors import pca_factors, risk_attribution
+    from src.portfolio.scenarios import build_scenarios, stress_test
+    from src.portfolio.portfolio_engine import (
+        compute_portfolio_returns,
+        compute_cumulative_value,
+    )
+    from src.portfolio.weights import equal_weights
+
     try:
-        dfs = []
-        valid_tickers = []
+        histories = {}
         
         for ticker in tickers:
             df = get_history(ticker, period=period, interval=interval)
             if df is not None and not df.empty:
-                df = df.rename(columns={"price": ticker})
-                dfs.append(df)
-                valid_tickers.append(ticker)
+                histories[ticker] = df
+        valid_tickers = list(histories)
         
-        if not dfs:
+        if not histories:
             return {
                 "status": "error",
                 "error": "No valid data for any ticker"
             }
         
-        prices = pd.concat(dfs, axis=1, join="inner")
+        # Same calendar alignment as the Portfolio page (config.yaml "alignment")
+        alignment = load_alignment_settings()
+        prices = align_prices(
+            histories, policy=alignment["policy"], max_gap=alignment["max_gap"], interval=interval
+        )
         
         weights = equal_weights(valid_tickers)
-        portfolio_rets = compute_portfolio_returns(prices, weights)
+        returns_df = returns_from_prices(prices)
+        ppy = periods_per_year(interval, universe_asset_type(valid_tickers, alignment["policy"]))
+        portfolio_rets = compute_portfolio_returns(returns_df, weights)
         portfolio_value = compute_cumulative_value(portfolio_rets, initial_value=10000)
-        stats = portfolio_stats(portfolio_value)
+        stats = backtest(portfolio_value, periods_per_year=ppy)
+
+        # Where the risk comes from: statistical factors vs asset-specific
+        model = pca_factors(returns_df, k=n_factors)
+        attribution = risk_attribution(model, weights, periods_per_year=ppy)
+
+        benchmark = load_benchmark_settings()["ticker"]
+        bench_returns = get_benchmark_returns(returns_df.index, benchmark, period, interval)
+        relative = relative_metrics(portfolio_rets, bench_returns, periods_per_year=ppy).iloc[0]
+
+        # Historical crises and factor shocks, on the longest daily histories
+        stress = stress_test(build_scenarios(valid_tickers), weights)
         
         report = {
             "status": "success",
@@ -131,7 +159,29 @@ def generate_portfolio_report(tickers, period="3mo", interval="1d"):
             "max_drawdown": float(stats["max_drawdown"]),
             "initial_value": 10000.0,
             "final_value": float(portfolio_value.iloc[-1]),
-            "period": period
+            "period": period,
+            "relative": {
+                "benchmark": benchmark,
+                **{k: (float(v) if k != "observations" else int(v)) for k, v in relative.items()},
+            },
+            "risk_factors": {
+                "explained_variance": {f: float(v) for f, v in model.explained_variance_ratio.items()},
+                "variance_share_pct": {
+                    f: float(v) for f, v in attribution["factors"]["share (%)"].items()
+                },
+                "asset_risk_share_pct": {
+                    t: float(v) for t, v in attribution["assets"]["risk share (%)"].items()
+                },
+            },
+            "stress_tests": {
+                name: {
+                    "total_return": float(stress["total_return"].loc[name].iloc[0]),
+                    "max_drawdown": float(stress["max_drawdown"].loc[name].iloc[0]),
+                    "coverage": float(stress["coverage"].loc[name].iloc[0]),
+                }
+                for name in stress["total_return"].index
+            },
+            "data_quality": {t: quality_report(t, period, interval) for t in valid_tickers},
         }
         
         return report
@@ -186,6 +236,9 @@ def main():
         asset_reports.append(report)
         
         if report['status'] == 'success':
+            quality = report['data_quality']
+            if quality and quality['issues']:
+                print(f"  ! Data quality: {'; '.join(quality['issues'])}")
             print(f"  ✓ Close: ${report['close_price']:.2f}")
             print(f"  ✓ Daily Return: {report['daily_return']*100:.2f}%")
             print(f"  ✓ Volatility: {report['annualized_volatility']*100:.2f}%")
@@ -209,6 +262,14 @@ def main():
         print(f"  ✓ Sharpe Ratio: {portfolio_report['sharpe_ratio']:.2f}")
         print(f"  ✓ Volatility: {portfolio_report['annualized_volatility']*100:.2f}%")
         print(f"  ✓ Max Drawdown: {portfolio_report['max_drawdown']*100:.2f}%")
+        rel = portfolio_report['relative']
+        print(f"  ✓ vs {rel['benchmark']}: beta {rel['beta']:.2f}, tracking error {rel['tracking_error']*100:.2f}%")
+        shares = portfolio_report['risk_factors']['variance_share_pct']
+        print(f"  ✓ Risk: {', '.join(f'{f} {v:.1f}%' for f, v in shares.items())}")
+        stress = portfolio_report['stress_tests']
+        if stress:
+            worst = min(stress, key=lambda name: stress[name]['total_return'])
+            print(f"  ✓ Worst scenario: {worst} ({stress[worst]['total_return']*100:.2f}%)")
     else:
         print(f"  ✗ Error: {portfolio_report['error']}")
     
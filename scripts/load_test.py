@@ -0,0 +1,274 @@
+"""
+Concurrent-session load test for the Streamlit pages.
+
+Drives N simulated sessions against pages/SingleAsset.py and
+pages/Portfolio.py with Streamlit's AppTest, all in this process, so they
+share the data and derived-result caches exactly like sessions of one
+server. Prices come from the offline synthetic backend
+(PGLFF_DATA_BACKEND=synthetic): no network access is needed.
+
+Each session opens its page, then replays a random mix of interactions:
+  - ticker:  change the ticker(s)
+  - slider:  move a slider (portfolio weight / moving-average period)
+  - tick:    an autorefresh tick (full rerun, live quotes due)
+
+Reported: throughput (reruns / s), p50 / p99 rerun latency per page and
+action, data provider calls, cache hit rates and memory per session.
+
+Usage:
+    python scripts/load_test.py [--sessions 20] [--actions 10]
+        [--page both|SingleAsset|Portfolio] [--concurrency 8]
+        [--mix ticker=0.2,slider=0.5,tick=0.3] [--seed 0] [--json out.json]
+"""
+import argparse
+import json
+import os
+import random
+import resource
+import sys
+import time
+import warnings
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import numpy as np
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.append(str(ROOT))
+
+PAGES = {
+    "SingleAsset": ROOT / "pages" / "SingleAsset.py",
+    "Portfolio": ROOT / "pages" / "Portfolio.py",
+}
+
+DEFAULT_UNIVERSE = "AAPL,MSFT,GOOGL,AMZN,NVDA,META,TSLA,JPM,XOM,BTC-USD"
+DEFAULT_MIX = "ticker=0.2,slider=0.5,tick=0.3"
+
+# Seconds allowed for a single rerun before AppTest gives up
+RERUN_TIMEOUT = 120
+
+
+def rss_mb() -> float:
+    """Current resident memory of the process (MB)."""
+    try:
+        with open("/proc/self/statm") as f:
+            pages = int(f.read().split()[1])
+        return pages * os.sysconf("SC_PAGE_SIZE") / 1024 / 1024
+    except (OSError, ValueError):
+        # Peak instead of current outside Linux (KB on Linux, bytes on macOS)
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak / 1024 / 1024 if sys.platform == "darwin" else peak / 1024
+
+
+def parse_mix(text: str) -> dict:
+    mix = {}
+    for part in text.split(","):
+        name, _, weight = part.partition("=")
+        mix[name.strip()] = float(weight)
+    unknown = set(mix) - {"ticker", "slider", "tick"}
+    if unknown:
+        raise ValueError(f"Unknown actions in mix: {', '.join(sorted(unknown))}")
+    return mix
+
+
+# ---- Interactions: fn(at, rng, universe) -> element to rerun ----
+
+def _expire_live_quotes(at):
+    # Make the live quote widgets due, as after LIVE_REFRESH_SECONDS
+    if "quotes_refreshed_at" in at.session_state:
+        at.session_state["quotes_refreshed_at"] = 0.0
+    if at.sidebar.text_input:
+        key = f"live_quote_{at.sidebar.text_input[0].value.upper()}"
+        if key in at.session_state:
+            at.session_state[key] = (0.0, None)
+
+
+def single_ticker(at, rng, universe):
+    return at.sidebar.text_input[0].set_value(rng.choice(universe))
+
+
+def single_slider(at, rng, universe):
+    strategy = at.sidebar.radio[0]
+    if strategy.value != "Momentum":
+        return strategy.set_value("Momentum")
+    return at.sidebar.slider[0].set_value(rng.randint(3, 100))
+
+
+def portfolio_ticker(at, rng, universe):
+    picks = rng.sample(universe, rng.randint(2, min(6, len(universe))))
+    return at.text_input[0].set_value(", ".join(picks))
+
+
+def portfolio_slider(at, rng, universe):
+    weights = [s for s in at.slider if str(s.key).startswith("weight_")]
+    if not weights:
+        return at
+    return rng.choice(weights).set_value(round(rng.random(), 2))
+
+
+def autorefresh_tick(at, rng, universe):
+    _expire_live_quotes(at)
+    return at
+
+
+ACTIONS = {
+    "SingleAsset": {"ticker": single_ticker, "slider": single_slider, "tick": autorefresh_tick},
+    "Portfolio": {"ticker": portfolio_ticker, "slider": portfolio_slider, "tick": autorefresh_tick},
+}
+
+
+def run_session(page, n_actions, mix, universe, seed):
+    """One simulated user: open the page and replay ``n_actions`` interactions."""
+    from streamlit.testing.v1 import AppTest
+
+    rng = random.Random(seed)
+    records = []
+
+    def rerun(action, element):
+        start = time.perf_counter()
+        element.run(timeout=RERUN_TIMEOUT)
+        records.append((page, action, time.perf_counter() - start, len(at.exception) > 0))
+
+    at = AppTest.from_file(str(PAGES[page]), default_timeout=RERUN_TIMEOUT)
+    rerun("open", at)
+
+    names = list(mix)
+    weights = [mix[n] for n in names]
+    for _ in range(n_actions):
+        action = rng.choices(names, weights)[0]
+        rerun(action, ACTIONS[page][action](at, rng, universe))
+
+    return records, at
+
+
+def summarize(records):
+    by_key = defaultdict(list)
+    errors = defaultdict(int)
+    for page, action, seconds, failed in records:
+        by_key[(page, action)].append(seconds)
+        errors[(page, action)] += failed
+
+    rows = []
+    for (page, action), values in sorted(by_key.items()):
+        ms = np.asarray(values) * 1000.0
+        p50, p99 = np.percentile(ms, [50, 99])
+        rows.append({
+            "page": page,
+            "action": action,
+            "count": len(ms),
+            "p50_ms": float(p50),
+            "p99_ms": float(p99),
+            "max_ms": float(ms.max()),
+            "errors": errors[(page, action)],
+        })
+    return rows
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sessions", type=int, default=20, help="Simulated sessions")
+    parser.add_argument("--actions", type=int, default=10, help="Interactions per session")
+    parser.add_argument("--page", choices=["both"] + list(PAGES), default="both")
+    parser.add_argument("--concurrency", type=int, default=8, help="Sessions running at the same time")
+    parser.add_argument("--mix", default=DEFAULT_MIX, help="Relative weights of the interactions")
+    parser.add_argument("--universe", default=DEFAULT_UNIVERSE, help="Comma-separated tickers to pick from")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--json", help="Also write the report to this file")
+    args = parser.parse_args(argv)
+
+    try:
+        mix = parse_mix(args.mix)
+    except ValueError as e:
+        parser.error(str(e))
+    universe = [t.strip().upper() for t in args.universe.split(",") if t.strip()]
+    pages = list(PAGES) if args.page == "both" else [args.page]
+
+    os.environ["PGLFF_DATA_BACKEND"] = "synthetic"
+    warnings.simplefilter("ignore")
+
+    from src.data.cache import CACHE_REGISTRY
+    from src.data.fetch_yf import PROVIDER_CALLS
+
+    # Import the app dependencies once, so the first sessions are not
+    # charged for them and the memory baseline includes them
+    import plotly.graph_objects  # noqa: F401
+    import streamlit.testing.v1  # noqa: F401
+
+    rss_start = rss_mb()
+    provider_start = dict(PROVIDER_CALLS)
+
+    jobs = [(pages[i % len(pages)], args.seed * 100003 + i) for i in range(args.sessions)]
+    records = []
+    apps = []
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.concurrency) as pool:
+        futures = [
+            pool.submit(run_session, page, args.actions, mix, universe, seed)
+            for page, seed in jobs
+        ]
+        for future in futures:
+            session_records, at = future.result()
+            records.extend(session_records)
+            apps.append(at)
+    elapsed = time.perf_counter() - start
+    # Measured while every session (and its state) is still alive
+    rss_end = rss_mb()
+
+    rows = summarize(records)
+    provider_calls = {k: v - provider_start.get(k, 0) for k, v in PROVIDER_CALLS.items()}
+    caches = [cache.stats() for cache in CACHE_REGISTRY.values()]
+    all_ms = np.asarray([r[2] for r in records]) * 1000.0
+    report = {
+        "sessions": args.sessions,
+        "actions_per_session": args.actions,
+        "concurrency": args.concurrency,
+        "mix": mix,
+        "elapsed_s": elapsed,
+        "reruns": len(records),
+        "throughput_rps": len(records) / elapsed if elapsed > 0 else 0.0,
+        "p50_ms": float(np.percentile(all_ms, 50)),
+        "p99_ms": float(np.percentile(all_ms, 99)),
+        "errors": sum(r["errors"] for r in rows),
+        "provider_calls": provider_calls,
+        "rss_start_mb": rss_start,
+        "rss_end_mb": rss_end,
+        "mb_per_session": (rss_end - rss_start) / max(args.sessions, 1),
+        "latency": rows,
+        "caches": caches,
+    }
+
+    print(f"{'page':<12} {'action':<8} {'count':>6} {'p50 ms':>9} {'p99 ms':>9} {'max ms':>9} {'errors':>7}")
+    print("-" * 66)
+    for r in rows:
+        print(
+            f"{r['page']:<12} {r['action']:<8} {r['count']:>6} {r['p50_ms']:9.1f} "
+            f"{r['p99_ms']:9.1f} {r['max_ms']:9.1f} {r['errors']:>7}"
+        )
+    print()
+    print(
+        f"{report['reruns']} reruns in {elapsed:.1f}s: {report['throughput_rps']:.2f} reruns/s, "
+        f"p50 {report['p50_ms']:.0f} ms, p99 {report['p99_ms']:.0f} ms, {report['errors']} errors"
+    )
+    calls = ", ".join(f"{k}={v}" for k, v in sorted(provider_calls.items())) or "none"
+    print(f"Provider calls: {calls}")
+    for stats in caches:
+        print(
+            f"Cache {stats['cache']}: {stats['entries']} entries, "
+            f"{stats['size_mb']:.1f} MB, hit rate {stats['hit_rate (%)']:.0f}%"
+        )
+    print(
+        f"Memory: {rss_start:.0f} -> {rss_end:.0f} MB RSS, "
+        f"~{report['mb_per_session']:.1f} MB per session (shared caches included)"
+    )
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(report, f, indent=2, default=str)
+
+    return 1 if report["errors"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,126 @@
+"""
+Import-time profiler for the app entry points.
+
+For each entry point (Home.py, the pages, the report script) this collects
+the module-level imports, runs them in a fresh interpreter with
+``python -X importtime`` and parses the per-module timings. It prints the
+most expensive modules and exits with status 1 when an entry point exceeds
+its budget from ``import_budget_ms`` in config.yaml.
+
+Usage:
+    python scripts/profile_imports.py [--top 15] [--runs 3] [entry ...]
+"""
+import argparse
+import ast
+import re
+import subprocess
+import sys
+from pathlib import Path
+
+import yaml
+
+ROOT = Path(__file__).resolve().parents[1]
+
+# "import time: self [us] | cumulative | imported package"
+_LINE_RE = re.compile(r"^import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)")
+
+
+def load_budgets():
+    """Budgets (ms) per entry point, from ``import_budget_ms`` in config.yaml."""
+    with open(ROOT / "config.yaml", "r") as f:
+        config = yaml.safe_load(f) or {}
+    return dict(config.get("import_budget_ms", {}) or {})
+
+
+def module_level_imports(entry_path):
+    """Return the source of the import statements at module level only."""
+    tree = ast.parse(Path(entry_path).read_text(encoding="utf-8"))
+    stmts = [node for node in tree.body if isinstance(node, (ast.Import, ast.ImportFrom))]
+    return "\n".join(ast.unparse(node) for node in stmts)
+
+
+def parse_importtime(stderr):
+    """
+    Parse ``-X importtime`` output.
+
+    Returns a list of (module, self_ms, cumulative_ms, depth) tuples.
+    """
+    rows = []
+    for line in stderr.splitlines():
+        m = _LINE_RE.match(line)
+        if not m:
+            continue
+        self_us, cumul_us, indent, name = m.groups()
+        depth = len(indent) // 2
+        rows.append((name, int(self_us) / 1000.0, int(cumul_us) / 1000.0, depth))
+    return rows
+
+
+def profile_entry(entry, runs=3):
+    """
+    Profile the module-level imports of one entry point.
+
+    The best of ``runs`` cold interpreters is kept to reduce noise.
+    Returns (total_ms, rows).
+    """
+    code = (
+        f"import sys; sys.path.insert(0, {str(ROOT)!r})\n"
+        + module_level_imports(ROOT / entry)
+    )
+    best = None
+    for _ in range(runs):
+        proc = subprocess.run(
+            [sys.executable, "-X", "importtime", "-c", code],
+            cwd=ROOT,
+            capture_output=True,
+            text=True,
+        )
+        if proc.returncode != 0:
+            raise RuntimeError(f"Importing {entry} failed:\n{proc.stderr[-2000:]}")
+        rows = parse_importtime(proc.stderr)
+        # Top-level imports (depth 0) add up to the total import cost
+        total = sum(cumul for _, _, cumul, depth in rows if depth == 0)
+        if best is None or total < best[0]:
+            best = (total, rows)
+    return best
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("entries", nargs="*", help="Entry points relative to the project root")
+    parser.add_argument("--top", type=int, default=15, help="Number of modules to list per entry")
+    parser.add_argument("--runs", type=int, default=3, help="Cold runs per entry (best is kept)")
+    args = parser.parse_args(argv)
+
+    budgets = load_budgets()
+    entries = args.entries or list(budgets)
+
+    failures = []
+    for entry in entries:
+        total, rows = profile_entry(entry, runs=args.runs)
+        budget = budgets.get(entry)
+
+        status = "OK"
+        if budget is not None and total > budget:
+            status = "OVER BUDGET"
+            failures.append(entry)
+
+        budget_str = f"{budget} ms" if budget is not None else "none"
+        print("=" * 60)
+        print(f"{entry}: {total:.1f} ms (budget: {budget_str}) -> {status}")
+        print("-" * 60)
+        print(f"{'cumulative ms':>14} {'self ms':>9}  module")
+        top = sorted(rows, key=lambda r: r[2], reverse=True)[: args.top]
+        for name, self_ms, cumul_ms, _ in top:
+            print(f"{cumul_ms:14.1f} {self_ms:9.1f}  {name}")
+
+    print("=" * 60)
+    if failures:
+        print("Import budget exceeded for: " + ", ".join(failures))
+        return 1
+    print("All entry points within their import budget.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,400 @@
+"""
+Offline benchmark suite for the strategies, backtest, execution engine,
+portfolio engine and correlations.
+
+Every benchmark runs on seeded synthetic prices (src/data/synthetic.py), so
+no network access is needed and results are reproducible. For each
+(benchmark, scale) pair the best wall time and the peak traced memory are
+recorded and appended to benchmarks/history.jsonl.
+
+Regression gating: with a stored baseline (benchmarks/baseline.json, written
+by --save-baseline) the run fails when a benchmark is slower or uses more
+memory than the baseline by more than --tolerance.
+
+Golden outputs: the results on the golden scales are reduced to a few
+numbers and compared with benchmarks/golden.json (written by
+--update-golden), so optimized code paths must stay numerically equivalent.
+
+Kernels: the path-dependent features (band rebalancing, trailing stops,
+latched signals, drawdown episodes) run on every available kernel backend
+(src/kernels/jit.py), e.g. kernels.band_rebalance[numba] and
+kernels.band_rebalance[python]. Both are checked against the same golden
+values; JIT compilation happens in an untimed first call.
+
+Compact mode (--compact): the synthetic prices and returns are float32, as
+with ``compact: enabled`` in config.yaml. Outputs are checked against the
+float64 golden values within COMPACT_RTOL / COMPACT_ATOL
+(src/data/precision.py), and the data sizes are printed for both modes.
+
+Usage:
+    python scripts/run_benchmarks.py [--profile quick|default|full]
+        [--filter momentum] [--save-baseline] [--update-golden]
+        [--tolerance 0.25] [--compact]
+"""
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+import tracemalloc
+from datetime import datetime
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.append(str(ROOT))
+
+# Time the computations, not lookups of results stored by an earlier run
+os.environ["PGLFF_RESULT_STORE"] = "0"
+
+from src.data.precision import COMPACT_ATOL, COMPACT_RTOL, returns_from_prices
+from src.data.synthetic import synthetic_prices
+from src.evaluation.backtesting import backtest
+from src.evaluation.metrics import drawdown_table
+from src.evaluation.relative import relative_metrics, rolling_relative
+from src.execution.engine import run_execution
+from src.execution.models import Costs, Sizing
+from src.kernels.jit import available_backends, using_backend
+from src.portfolio.correlations import compute_correlation_matrix
+from src.portfolio.factors import pca_factors
+from src.portfolio.portfolio_engine import compute_portfolio_returns
+from src.portfolio.scenarios import scenarios_from_returns, stress_test
+from src.portfolio.weights import equal_weights, hrp_weights, inverse_volatility_weights, risk_parity_weights
+from src.strategies.buy_and_hold import run_buy_and_hold
+from src.strategies.mean_reversion import run_mean_reversion
+from src.strategies.momentum import run_momentum
+
+BENCH_DIR = ROOT / "benchmarks"
+HISTORY_PATH = BENCH_DIR / "history.jsonl"
+BASELINE_PATH = BENCH_DIR / "baseline.json"
+GOLDEN_PATH = BENCH_DIR / "golden.json"
+
+# name -> synthetic data parameters (assets x history)
+SCALES = {
+    "1x1y": dict(n_assets=1, n_periods=252, interval="1d"),
+    "10x5y": dict(n_assets=10, n_periods=5 * 252, interval="1d"),
+    "100x10y": dict(n_assets=100, n_periods=10 * 252, interval="1d"),
+    "200x15y": dict(n_assets=200, n_periods=15 * 252, interval="1d"),
+    "1000x20y": dict(n_assets=1000, n_periods=20 * 252, interval="1d"),
+    "1x1y_1m": dict(n_assets=1, n_periods=252 * 390, interval="1m"),
+    "20x1mo_1m": dict(n_assets=20, n_periods=21 * 390, interval="1m"),
+}
+
+PROFILES = {
+    "quick": ["1x1y", "10x5y", "20x1mo_1m"],
+    "default": ["1x1y", "10x5y", "100x10y", "200x15y", "20x1mo_1m"],
+    "full": list(SCALES),
+}
+
+# Scales whose outputs are checked against benchmarks/golden.json
+GOLDEN_SCALES = ["10x5y", "20x1mo_1m"]
+
+# Stop repeating a benchmark once it has used this much time
+REPEAT_BUDGET_S = 2.0
+MAX_REPEATS = 5
+
+
+# ---- Benchmarks: name -> fn(prices, returns) ----
+
+def _single(prices):
+    return prices.iloc[:, [0]].set_axis(["price"], axis=1)
+
+
+def _monthly_schedule(rets):
+    # Seeded random targets re-decided at every month end
+    dates = rets.index.to_series().groupby(rets.index.to_period("M")).last()
+    rng = np.random.default_rng(7)
+    return pd.DataFrame(rng.random((len(dates), rets.shape[1])), index=dates.values, columns=rets.columns)
+
+
+def _stress_grid(rets):
+    # Six windows spread over the synthetic history (it has no real crises)
+    # x the factor shocks, applied to 50 seeded random portfolios
+    n = len(rets)
+    windows = {
+        f"window {i}": (rets.index[n * i // 7], rets.index[min(n * i // 7 + n // 10, n - 1)])
+        for i in range(1, 7)
+    }
+    rng = np.random.default_rng(11)
+    portfolios = pd.DataFrame(rng.random((50, rets.shape[1])), columns=rets.columns)
+    return stress_test(scenarios_from_returns(rets, historical=windows), portfolios, "monthly")["total_return"]
+
+
+# Execution models of the execution benchmarks (independent of config.yaml)
+EXECUTION = dict(
+    sizing=Sizing("fraction", 1.0, 0.0),
+    costs=Costs(slippage_bps=1.0, commission_bps=0.5),
+    initial_capital=100_000,
+    fill="next",
+)
+
+
+BENCHMARKS = {
+    "strategy.buy_and_hold": lambda prices, rets: run_buy_and_hold(_single(prices)),
+    "strategy.momentum": lambda prices, rets: run_momentum(_single(prices), period=20),
+    "strategy.mean_reversion": lambda prices, rets: run_mean_reversion(_single(prices), period=20, threshold=0.02),
+    "evaluation.backtest": lambda prices, rets: backtest(run_buy_and_hold(_single(prices))),
+    "execution.momentum": lambda prices, rets: run_execution(
+        _single(prices), "momentum", {"period": 20}, stop_loss=0.02, take_profit=0.04, **EXECUTION
+    ).value,
+    "execution.mean_reversion": lambda prices, rets: run_execution(
+        _single(prices), "mean_reversion", {"period": 20, "threshold": 0.005, "exit_threshold": 0.0}, **EXECUTION
+    ).value,
+    "engine.daily": lambda prices, rets: compute_portfolio_returns(rets, equal_weights(list(rets.columns)), "daily"),
+    "engine.monthly": lambda prices, rets: compute_portfolio_returns(rets, equal_weights(list(rets.columns)), "monthly"),
+    "engine.none": lambda prices, rets: compute_portfolio_returns(rets, equal_weights(list(rets.columns)), "none"),
+    "engine.schedule_monthly": lambda prices, rets: compute_portfolio_returns(rets, _monthly_schedule(rets), "none"),
+    "correlation.matrix": lambda prices, rets: compute_correlation_matrix(rets),
+    "weights.inverse_vol": lambda prices, rets: inverse_volatility_weights(rets),
+    "weights.risk_parity": lambda prices, rets: risk_parity_weights(rets),
+    "weights.hrp": lambda prices, rets: hrp_weights(rets),
+    "factors.pca": lambda prices, rets: pca_factors(rets, k=5).explained_variance_ratio,
+    "scenarios.stress_test": lambda prices, rets: _stress_grid(rets),
+    # Every column against the first one as the benchmark
+    "relative.metrics": lambda prices, rets: relative_metrics(rets, rets.iloc[:, 0]),
+    "relative.rolling": lambda prices, rets: rolling_relative(rets, rets.iloc[:, 0])["beta"],
+}
+
+# Path-dependent features: registered once per kernel backend
+KERNEL_BENCHMARKS = {
+    "kernels.band_rebalance": lambda prices, rets: compute_portfolio_returns(
+        rets, equal_weights(list(rets.columns)), "band", band=0.02
+    ),
+    "kernels.trailing_stop": lambda prices, rets: run_momentum(_single(prices), period=20, stop_loss=0.05),
+    "kernels.latch": lambda prices, rets: run_mean_reversion(
+        _single(prices), period=20, threshold=0.02, exit_threshold=0.0
+    ),
+    "kernels.drawdowns": lambda prices, rets: drawdown_table(run_buy_and_hold(_single(prices)))[["depth", "length"]],
+}
+
+
+def _on_backend(fn, backend):
+    def run(prices, rets):
+        with using_backend(backend):
+            return fn(prices, rets)
+    return run
+
+
+for _name, _fn in KERNEL_BENCHMARKS.items():
+    for _backend in available_backends():
+        BENCHMARKS[f"{_name}[{_backend}]"] = _on_backend(_fn, _backend)
+
+
+def golden_key(name, scale):
+    # Every backend of a kernel benchmark shares its golden values
+    return f"{name.split('[')[0]}@{scale}"
+
+
+def make_data(scale, compact=False):
+    prices = synthetic_prices(seed=42, **SCALES[scale])
+    if compact:
+        prices = prices.astype(np.float32)
+    return prices, returns_from_prices(prices)
+
+
+def data_mb(*frames):
+    return sum(f.memory_usage(index=True).sum() for f in frames) / 1024 / 1024
+
+
+def measure(fn, prices, rets):
+    """Best wall time over a few repeats, then peak memory in a traced run."""
+    times = []
+    spent = 0.0
+    result = None
+    while len(times) < MAX_REPEATS and (spent < REPEAT_BUDGET_S or not times):
+        start = time.perf_counter()
+        result = fn(prices, rets)
+        elapsed = time.perf_counter() - start
+        times.append(elapsed)
+        spent += elapsed
+
+    tracemalloc.start()
+    fn(prices, rets)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return min(times), peak / 1024 / 1024, result
+
+
+def digest(result):
+    """Reduce a benchmark output to a few numbers for the golden check."""
+    if isinstance(result, dict):
+        return [float(result[k]) for k in sorted(result)]
+    values = np.asarray(result, dtype=float)
+    finite = values[np.isfinite(values)]
+    return [
+        float(values.size),
+        float(finite.sum()),
+        float(np.abs(finite).sum()),
+        float(values.ravel()[-1]),
+    ]
+
+
+def check_golden(golden, key, values, rtol=1e-9, atol=1e-12):
+    expected = golden.get(key)
+    if expected is None:
+        return None
+    return bool(np.allclose(values, expected, rtol=rtol, atol=atol, equal_nan=True))
+
+
+def git_commit():
+    try:
+        out = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True, text=True
+        )
+        return out.stdout.strip() or None
+    except OSError:
+        return None
+
+
+def load_json(path):
+    if path.exists():
+        with open(path, "r") as f:
+            return json.load(f)
+    return {}
+
+
+def save_json(path, data):
+    BENCH_DIR.mkdir(exist_ok=True)
+    with open(path, "w") as f:
+        json.dump(data, f, indent=2, sort_keys=True)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--profile", choices=list(PROFILES), default="default")
+    parser.add_argument("--scales", help="Comma-separated scales (overrides --profile)")
+    parser.add_argument("--filter", default="", help="Only run benchmarks whose name contains this")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="Allowed relative regression")
+    parser.add_argument("--min-delta-ms", type=float, default=2.0, help="Ignore time regressions below this")
+    parser.add_argument("--save-baseline", action="store_true", help="Store this run as the baseline")
+    parser.add_argument("--update-golden", action="store_true", help="Store the outputs as golden values")
+    parser.add_argument("--no-history", action="store_true", help="Do not append to history.jsonl")
+    parser.add_argument("--compact", action="store_true", help="float32 data (compact mode)")
+    args = parser.parse_args(argv)
+    if args.compact and args.update_golden:
+        parser.error("Golden values are float64 outputs: --update-golden cannot be used with --compact")
+
+    scales = args.scales.split(",") if args.scales else PROFILES[args.profile]
+    for scale in list(scales):
+        if scale not in SCALES:
+            parser.error(f"Unknown scale: {scale}")
+    if args.update_golden:
+        scales = list(dict.fromkeys(scales + GOLDEN_SCALES))
+
+    baseline = load_json(BASELINE_PATH)
+    golden = load_json(GOLDEN_PATH)
+    new_golden = dict(golden)
+
+    results = []
+    regressions = []
+    golden_failures = []
+    data_sizes = {}
+    # Compact runs have their own baseline entries
+    suffix = "+compact" if args.compact else ""
+
+    print(f"{'benchmark':<32} {'scale':<10} {'time ms':>10} {'peak MB':>9} {'vs base':>8}  golden")
+    print("-" * 82)
+    for scale in scales:
+        prices, rets = make_data(scale, compact=args.compact)
+        data_sizes[scale] = data_mb(prices, rets)
+        for name, fn in BENCHMARKS.items():
+            if args.filter not in name:
+                continue
+            if name.endswith("[numba]"):
+                fn(prices, rets)  # JIT compilation (per argument types): not timed
+            seconds, peak_mb, output = measure(fn, prices, rets)
+            key = f"{name}@{scale}"
+            row = {"benchmark": name, "scale": scale, "time_s": seconds, "peak_mb": peak_mb}
+            if args.compact:
+                row["compact"] = True
+            results.append(row)
+
+            # Regression against the stored baseline
+            vs_base = ""
+            base = baseline.get(key + suffix)
+            if base is not None:
+                ratio = seconds / base["time_s"] if base["time_s"] > 0 else 1.0
+                vs_base = f"{ratio:7.2f}x"
+                slower = (
+                    seconds > base["time_s"] * (1 + args.tolerance)
+                    and (seconds - base["time_s"]) * 1000 > args.min_delta_ms
+                )
+                heavier = peak_mb > base["peak_mb"] * (1 + args.tolerance) and peak_mb - base["peak_mb"] > 1.0
+                if slower or heavier:
+                    regressions.append((key, base, row))
+                    vs_base += " !"
+
+            # Numerical equivalence against the golden outputs
+            golden_status = ""
+            if scale in GOLDEN_SCALES:
+                values = digest(output)
+                gkey = golden_key(name, scale)
+                if args.update_golden:
+                    new_golden[gkey] = values
+                    golden_status = "updated"
+                elif args.compact:
+                    ok = check_golden(golden, gkey, values, rtol=COMPACT_RTOL, atol=COMPACT_ATOL)
+                    golden_status = {None: "-", True: "ok", False: "MISMATCH"}[ok]
+                    if ok is False:
+                        golden_failures.append(key)
+                else:
+                    ok = check_golden(golden, gkey, values)
+                    golden_status = {None: "-", True: "ok", False: "MISMATCH"}[ok]
+                    if ok is False:
+                        golden_failures.append(key)
+
+            print(f"{name:<32} {scale:<10} {seconds * 1000:10.2f} {peak_mb:9.1f} {vs_base:>8}  {golden_status}")
+
+    print("\nData (prices + returns): " + ", ".join(f"{s} {mb:.1f} MB" for s, mb in data_sizes.items()))
+
+    if not args.no_history:
+        BENCH_DIR.mkdir(exist_ok=True)
+        entry = {
+            "timestamp": datetime.now().isoformat(timespec="seconds"),
+            "commit": git_commit(),
+            "python": platform.python_version(),
+            "numpy": np.__version__,
+            "pandas": pd.__version__,
+            "machine": platform.machine(),
+            "results": results,
+        }
+        with open(HISTORY_PATH, "a") as f:
+            f.write(json.dumps(entry) + "\n")
+
+    if args.save_baseline:
+        baseline.update({
+            f"{r['benchmark']}@{r['scale']}{suffix}": {"time_s": r["time_s"], "peak_mb": r["peak_mb"]}
+            for r in results
+        })
+        save_json(BASELINE_PATH, baseline)
+        print(f"\nBaseline saved to {BASELINE_PATH}")
+
+    if args.update_golden:
+        save_json(GOLDEN_PATH, new_golden)
+        print(f"Golden outputs saved to {GOLDEN_PATH}")
+
+    status = 0
+    if regressions:
+        print(f"\nRegressions beyond {args.tolerance:.0%}:")
+        for key, base, row in regressions:
+            print(
+                f"  {key}: {base['time_s'] * 1000:.2f} -> {row['time_s'] * 1000:.2f} ms, "
+                f"{base['peak_mb']:.1f} -> {row['peak_mb']:.1f} MB"
+            )
+        status = 1
+    if golden_failures:
+        print("\nGolden output mismatch: " + ", ".join(golden_failures))
+        status = 1
+    if status == 0:
+        print("\nNo regression.")
+    return status
+
+
+if __name__ == "__main__":
+    sys.exit(main())
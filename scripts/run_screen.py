@@ -0,0 +1,114 @@
+"""
+Nightly universe screen: backtest metrics and strategy signals of every
+ticker, ranked, on local worker processes and / or remote workers.
+
+The universe comes from --tickers, a file (--universe, one ticker per
+line), --synthetic N (N synthetic tickers, offline) or the
+``screening: universe`` list of config.yaml (the report assets by
+default). Worker counts, remotes, shard size, retries and the ranking
+column default to the ``screening`` section of config.yaml. The ranked
+table is saved as CSV under reports/.
+
+Usage:
+    python scripts/run_screen.py [--synthetic 5000] [--workers 4]
+        [--remote host1:9500 --remote host2:9500] [--shard-size 100]
+        [--retries 2] [--rank-by sharpe] [--top 20]
+"""
+import argparse
+import logging
+import os
+import sys
+from datetime import datetime
+from pathlib import Path
+
+import yaml
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.append(str(ROOT))
+
+from src.screening.dispatch import load_screening_settings, run_screen  # noqa: E402
+from src.screening.screen import DEFAULT_PARAMS  # noqa: E402
+
+
+def load_universe(args) -> list:
+    if args.tickers:
+        return [t for t in args.tickers.split(",") if t.strip()]
+    if args.universe:
+        with open(args.universe, "r") as f:
+            return [line.split("#")[0].strip() for line in f if line.split("#")[0].strip()]
+    if args.synthetic:
+        return [f"SYN{i:05d}" for i in range(args.synthetic)]
+    with open(ROOT / "config.yaml", "r") as f:
+        config = yaml.safe_load(f) or {}
+    return list((config.get("screening") or {}).get("universe") or config.get("report_assets") or [])
+
+
+def main(argv=None):
+    settings = load_screening_settings()
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    universe = parser.add_mutually_exclusive_group()
+    universe.add_argument("--tickers", help="Comma-separated tickers")
+    universe.add_argument("--universe", help="File with one ticker per line")
+    universe.add_argument("--synthetic", type=int, help="Screen N synthetic tickers (offline data)")
+    parser.add_argument("--workers", type=int, default=settings["workers"], help="Local worker processes")
+    parser.add_argument("--remote", action="append", default=None, help="host:port of a remote worker")
+    parser.add_argument("--shard-size", type=int, default=settings["shard_size"])
+    parser.add_argument("--retries", type=int, default=settings["retries"])
+    parser.add_argument("--timeout", type=float, default=settings["timeout"], help="Seconds per shard")
+    parser.add_argument("--rank-by", default=settings["rank_by"])
+    parser.add_argument("--ascending", action="store_true", help="Rank the smallest values first")
+    parser.add_argument("--period", default=DEFAULT_PARAMS["period"])
+    parser.add_argument("--interval", default=DEFAULT_PARAMS["interval"])
+    parser.add_argument("--window", type=int, default=DEFAULT_PARAMS["window"])
+    parser.add_argument("--threshold", type=float, default=DEFAULT_PARAMS["threshold"])
+    parser.add_argument("--top", type=int, default=20, help="Rows printed")
+    parser.add_argument("--output", help="CSV path (default: reports/screen_<timestamp>.csv)")
+    args = parser.parse_args(argv)
+
+    if args.synthetic:
+        # Inherited by the local worker processes
+        os.environ["PGLFF_DATA_BACKEND"] = "synthetic"
+    logging.basicConfig(level=logging.WARNING, format="%(asctime)s %(levelname)s %(message)s")
+
+    tickers = load_universe(args)
+    remotes = settings["remotes"] if args.remote is None else args.remote
+    print(f"Screening {len(tickers)} tickers: {args.workers} local workers, {len(remotes)} remote workers")
+
+    params = {"period": args.period, "interval": args.interval, "window": args.window, "threshold": args.threshold}
+    result = run_screen(
+        tickers,
+        params,
+        workers=args.workers,
+        remotes=remotes,
+        shard_size=args.shard_size,
+        retries=args.retries,
+        timeout=args.timeout,
+        rank_by=args.rank_by,
+        ascending=args.ascending,
+    )
+    stats = result.stats
+
+    print(
+        f"{stats['tickers']} tickers in {stats['elapsed_s']:.1f} s ({stats['tickers_per_s']:.0f} tickers/s), "
+        f"{stats['shards']} shards, {stats['retries']} retries, {stats['failed_shards']} failed"
+    )
+    for name, count in stats["workers"].items():
+        print(f"  {name:<24} {count} shards")
+    for error in stats["errors"]:
+        print(f"  ✗ {error}")
+
+    print()
+    print(result.table.head(args.top).to_string())
+
+    output = Path(args.output) if args.output else (
+        ROOT / "reports" / f"screen_{datetime.now().strftime('%Y%m%d_%H%M%S')}.csv"
+    )
+    output.parent.mkdir(parents=True, exist_ok=True)
+    result.table.to_csv(output)
+    print(f"\nScreen saved to: {output}")
+    return 1 if result.failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
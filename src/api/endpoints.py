@@ -0,0 +1,369 @@
+"""
+Analytics endpoints of the local HTTP API (src/api/server.py).
+
+Each endpoint takes the request parameters as plain strings and returns
+``(frame, meta)``: a DataFrame (the table served as JSON or Arrow) and a
+JSON-serializable dict (summary numbers and the normalized inputs).
+Endpoints are module-level functions so that the server can run them in
+worker processes; histories come from ``get_history`` in the worker,
+i.e. from its cache or the memory-mapped price archive.
+"""
+import json
+
+import numpy as np
+import pandas as pd
+
+from src.data.alignment import ALIGNMENT_POLICIES, align_prices, load_alignment_settings
+from src.data.fetch_yf import get_history
+from src.data.intervals import asset_type, periods_per_year, universe_asset_type
+from src.data.precision import returns_from_prices
+from src.evaluation.backtesting import backtest
+from src.evaluation.relative import get_benchmark_returns, load_benchmark_settings, relative_metrics
+from src.portfolio.correlations import compute_correlation_matrix
+from src.portfolio.portfolio_engine import (
+    DEFAULT_BAND,
+    compute_cumulative_value,
+    compute_portfolio_returns,
+    portfolio_stats,
+)
+from src.portfolio.weights import (
+    equal_weights,
+    hrp_weights,
+    inverse_volatility_weights,
+    normalize_weights,
+    risk_parity_weights,
+)
+
+STRATEGIES = ("buy_and_hold", "momentum", "mean_reversion")
+REBALANCING = ("daily", "monthly", "quarterly", "band", "none")
+ALLOCATIONS = {
+    "inverse_vol": inverse_volatility_weights,
+    "risk_parity": risk_parity_weights,
+    "hrp": hrp_weights,
+}
+FORMATS = {"json": "application/json", "arrow": "application/vnd.apache.arrow.stream"}
+
+
+class BadRequest(ValueError):
+    """Invalid request parameters (HTTP 400)."""
+
+
+class NotFound(LookupError):
+    """No data for the requested ticker(s) (HTTP 404)."""
+
+
+# ---- Parameter parsing ----
+
+def _text(params, name, default=None):
+    value = params.get(name, default)
+    if value is None or str(value).strip() == "":
+        raise BadRequest(f"Missing parameter: {name}")
+    return str(value).strip()
+
+
+def _number(params, name, default, cast=float):
+    try:
+        return cast(params.get(name, default))
+    except (TypeError, ValueError):
+        raise BadRequest(f"Parameter {name} must be a number.") from None
+
+
+def _tickers(params):
+    tickers = [t.strip().upper() for t in _text(params, "tickers").split(",") if t.strip()]
+    if not tickers:
+        raise BadRequest("Missing parameter: tickers")
+    return list(dict.fromkeys(tickers))
+
+
+def _history(ticker, period, interval):
+    df = get_history(ticker, period=period, interval=interval)
+    if df is None or df.empty:
+        raise NotFound(f"No data for {ticker} ({period}, {interval}).")
+    return df
+
+
+def _prices(tickers, period, interval, policy, max_gap):
+    histories = {t: _history(t, period, interval) for t in tickers}
+    prices = align_prices(histories, policy=policy, max_gap=max_gap, interval=interval)
+    if len(prices) < 2:
+        raise NotFound("Not enough common history for these tickers.")
+    return prices
+
+
+def _alignment(params):
+    settings = load_alignment_settings()
+    policy = params.get("policy", settings["policy"])
+    if policy not in ALIGNMENT_POLICIES:
+        raise BadRequest(f"policy must be one of {', '.join(ALIGNMENT_POLICIES)}.")
+    return policy, _number(params, "max_gap", settings["max_gap"], int)
+
+
+def _periods_per_year(interval, tickers, policy="ffill"):
+    try:
+        return periods_per_year(interval, universe_asset_type(tickers, policy))
+    except ValueError as e:
+        raise BadRequest(str(e)) from None
+
+
+# ---- Endpoints ----
+
+def history(params):
+    """Price history of one ticker (``ticker``, ``period``, ``interval``)."""
+    ticker = _text(params, "ticker").upper()
+    period, interval = _text(params, "period", "1y"), _text(params, "interval", "1d")
+    df = _history(ticker, period, interval)
+    meta = {"ticker": ticker, "period": period, "interval": interval, "rows": len(df)}
+    return df, meta
+
+
+def _strategy(params):
+    # (strategy, normalized inputs, strategy function keywords) of a request
+    strategy = _text(params, "strategy", "buy_and_hold")
+    window = _number(params, "window", 20, int)
+    threshold = _number(params, "threshold", 0.02)
+    stop_loss = _number(params, "stop_loss", 0.0) or None
+    exit_threshold = params.get("exit_threshold")
+    exit_threshold = None if exit_threshold in (None, "") else _number(params, "exit_threshold", None)
+    if strategy not in STRATEGIES:
+        raise BadRequest(f"strategy must be one of {', '.join(STRATEGIES)}.")
+    if window < 1:
+        raise BadRequest("window must be at least 1.")
+    if stop_loss is not None and not 0 < stop_loss < 1:
+        raise BadRequest("stop_loss must be between 0 and 1.")
+    inputs = {"window": window, "threshold": threshold, "stop_loss": stop_loss, "exit_threshold": exit_threshold}
+    if strategy == "buy_and_hold":
+        return strategy, inputs, {}
+    if strategy == "momentum":
+        return strategy, inputs, {"period": window, "stop_loss": stop_loss}
+    return strategy, inputs, {
+        "period": window, "threshold": threshold, "exit_threshold": exit_threshold, "stop_loss": stop_loss,
+    }
+
+
+def strategy_backtest(params):
+    """
+    Backtest of a single-asset strategy: ``ticker``, ``strategy``
+    (buy_and_hold, momentum, mean_reversion), ``window`` and ``threshold``,
+    with an optional trailing ``stop_loss`` and, for mean reversion, an
+    ``exit_threshold`` (hold until the price is back within it of its
+    average).
+    """
+    ticker = _text(params, "ticker").upper()
+    period, interval = _text(params, "period", "1y"), _text(params, "interval", "1d")
+    strategy, inputs, kwargs = _strategy(params)
+    ppy = _periods_per_year(interval, [ticker])
+
+    df = _history(ticker, period, interval)
+    if strategy == "buy_and_hold":
+        from src.strategies.buy_and_hold import run_buy_and_hold
+        value = run_buy_and_hold(df)
+    elif strategy == "momentum":
+        from src.strategies.momentum import run_momentum
+        value = run_momentum(df, **kwargs)
+    else:
+        from src.strategies.mean_reversion import run_mean_reversion
+        value = run_mean_reversion(df, **kwargs)
+    if value.empty:
+        raise NotFound("History too short for this strategy.")
+
+    meta = {
+        "ticker": ticker, "period": period, "interval": interval, "strategy": strategy, **inputs,
+        "metrics": backtest(value, periods_per_year=ppy),
+    }
+    return value.rename("strategy_value").to_frame(), meta
+
+
+def execution(params):
+    """
+    Event-driven execution of a single-asset strategy (parameters of
+    ``/backtest``) with sizing, costs and exit levels: ``capital``,
+    ``fill`` (next, close), ``sizing`` (fraction, cash, units, volatility),
+    ``size``, ``lot_size``, ``slippage_bps``, ``volatility_slippage``,
+    ``commission_bps``, ``commission_per_unit``, ``commission_min``,
+    ``stop`` and ``take_profit`` (fractions of the entry price),
+    ``trailing`` (1: the stop follows the best price). Defaults come from
+    the ``execution`` section of config.yaml. Returns the trade log.
+    """
+    from src.execution.engine import run_execution
+    from src.execution.models import Costs, Sizing, load_execution_settings
+
+    ticker = _text(params, "ticker").upper()
+    period, interval = _text(params, "period", "1y"), _text(params, "interval", "1d")
+    strategy, inputs, kwargs = _strategy(params)
+    _periods_per_year(interval, [ticker])
+    settings = load_execution_settings()
+    sizing, costs = settings["sizing"], settings["costs"]
+    sizing = Sizing(
+        _text(params, "sizing", sizing.method),
+        _number(params, "size", sizing.value),
+        _number(params, "lot_size", sizing.lot_size),
+    )
+    costs = Costs(*(_number(params, name, default) for name, default in costs._asdict().items()))
+    options = {
+        "sizing": sizing,
+        "costs": costs,
+        "initial_capital": _number(params, "capital", settings["initial_capital"]),
+        "fill": _text(params, "fill", settings["fill"]),
+        "stop_loss": _number(params, "stop", 0.0) or None,
+        "take_profit": _number(params, "take_profit", 0.0) or None,
+        "trailing": bool(_number(params, "trailing", 0, int)),
+        "asset_type": asset_type(ticker),
+    }
+
+    df = _history(ticker, period, interval)
+    try:
+        result = run_execution(df, strategy, kwargs, interval=interval, **options)
+    except ValueError as e:
+        raise BadRequest(str(e)) from None
+    stats = {k: v for k, v in result.stats.items() if k not in ("elapsed_s", "events_per_s")}
+    meta = {
+        "ticker": ticker, "period": period, "interval": interval, "strategy": strategy, **inputs,
+        "sizing": sizing._asdict(), "costs": costs._asdict(),
+        **{k: v for k, v in options.items() if k not in ("sizing", "costs")},
+        "metrics": result.metrics,
+        "stats": stats,
+    }
+    return result.trades, meta
+
+
+def portfolio(params):
+    """
+    Portfolio returns and stats: ``tickers``, ``weights`` (comma-separated,
+    equal by default) or an ``allocation`` scheme (inverse_vol, risk_parity,
+    hrp, within ``min_weight`` / ``max_weight``), ``rebalancing`` (with a
+    drift ``band`` for "band") and the alignment ``policy`` / ``max_gap``.
+    """
+    tickers = _tickers(params)
+    period, interval = _text(params, "period", "1y"), _text(params, "interval", "1d")
+    rebalancing = _text(params, "rebalancing", "daily").lower()
+    if rebalancing not in REBALANCING:
+        raise BadRequest(f"rebalancing must be one of {', '.join(REBALANCING)}.")
+    band = _number(params, "band", DEFAULT_BAND)
+    if band < 0:
+        raise BadRequest("band must be positive.")
+    policy, max_gap = _alignment(params)
+    ppy = _periods_per_year(interval, tickers, policy)
+
+    allocation = params.get("allocation")
+    if allocation is not None and allocation not in ALLOCATIONS:
+        raise BadRequest(f"allocation must be one of {', '.join(ALLOCATIONS)}.")
+
+    prices = _prices(tickers, period, interval, policy, max_gap)
+    returns_df = returns_from_prices(prices)
+
+    if allocation is not None:
+        bounds = _number(params, "min_weight", 0.0), _number(params, "max_weight", 1.0)
+        try:
+            weights = ALLOCATIONS[allocation](returns_df, *bounds)
+        except ValueError as e:
+            raise BadRequest(f"Invalid allocation: {e}") from None
+    elif params.get("weights"):
+        try:
+            raw = [float(w) for w in str(params["weights"]).split(",")]
+            weights = normalize_weights(raw, tickers)
+        except ValueError as e:
+            raise BadRequest(f"Invalid weights: {e}") from None
+    else:
+        weights = equal_weights(tickers)
+
+    port_returns = compute_portfolio_returns(returns_df, weights, rebalancing=rebalancing, band=band)
+    value = compute_cumulative_value(port_returns, initial_value=_number(params, "initial_value", 100.0))
+    stats = portfolio_stats(port_returns, periods_per_year=ppy).iloc[0].to_dict()
+
+    frame = pd.DataFrame({"returns": port_returns, "portfolio_value": value})
+    meta = {
+        "tickers": tickers, "weights": weights.round(12).to_dict(), "period": period,
+        "interval": interval, "rebalancing": rebalancing, "band": band, "policy": policy, "allocation": allocation,
+        "stats": {k: float(v) for k, v in stats.items()},
+    }
+    return frame, meta
+
+
+def correlation(params):
+    """Correlation matrix of the returns of ``tickers``."""
+    tickers = _tickers(params)
+    period, interval = _text(params, "period", "1y"), _text(params, "interval", "1d")
+    policy, max_gap = _alignment(params)
+    prices = _prices(tickers, period, interval, policy, max_gap)
+    corr = compute_correlation_matrix(returns_from_prices(prices))
+    corr.index.name = "ticker"
+    meta = {"tickers": list(corr.columns), "period": period, "interval": interval, "rows": len(prices)}
+    return corr, meta
+
+
+def relative(params):
+    """
+    Benchmark-relative metrics of ``tickers`` against ``benchmark`` (config
+    default): beta, alpha, correlation, tracking error, information ratio
+    and up / down capture, one row per ticker.
+    """
+    tickers = _tickers(params)
+    period, interval = _text(params, "period", "1y"), _text(params, "interval", "1d")
+    benchmark = _text(params, "benchmark", load_benchmark_settings()["ticker"]).upper()
+    policy, max_gap = _alignment(params)
+    ppy = _periods_per_year(interval, tickers, policy)
+
+    prices = _prices(tickers, period, interval, policy, max_gap)
+    bench_returns = get_benchmark_returns(prices.index, benchmark, period, interval)
+    if bench_returns.notna().sum() < 2:
+        raise NotFound(f"No data for benchmark {benchmark} ({period}, {interval}).")
+    table = relative_metrics(prices.pct_change(fill_method=None), bench_returns, periods_per_year=ppy)
+    table.index.name = "ticker"
+    meta = {"tickers": list(table.index), "benchmark": benchmark, "period": period, "interval": interval}
+    return table, meta
+
+
+ENDPOINTS = {
+    "history": history,
+    "backtest": strategy_backtest,
+    "execution": execution,
+    "portfolio": portfolio,
+    "correlation": correlation,
+    "relative": relative,
+}
+
+
+# ---- Encoding ----
+
+def _plain(value):
+    # JSON-ready copy of ``meta``: NumPy scalars unwrapped, NaN / inf -> null
+    if isinstance(value, dict):
+        return {str(k): _plain(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_plain(v) for v in value]
+    if isinstance(value, (np.floating, np.integer)):
+        value = value.item()
+    if isinstance(value, float) and not np.isfinite(value):
+        return None
+    if isinstance(value, pd.Timestamp):
+        return value.isoformat()
+    return value
+
+
+def encode(frame, meta, fmt):
+    """
+    Serialize an endpoint result.
+
+    JSON: ``{"meta": ..., "data": {"index", "columns", "data"}}`` (pandas
+    "split" orient, ISO dates). Arrow: an IPC stream of the frame with its
+    index as the first column and ``meta`` in the schema metadata.
+    """
+    meta_json = json.dumps(_plain(meta), allow_nan=False)
+    if fmt == "json":
+        data_json = frame.to_json(orient="split", date_format="iso", date_unit="s")
+        return f'{{"meta":{meta_json},"data":{data_json}}}'.encode()
+
+    import pyarrow as pa  # optional: only needed for the Arrow format
+
+    table = pa.Table.from_pandas(frame.reset_index(), preserve_index=False)
+    table = table.replace_schema_metadata({**(table.schema.metadata or {}), b"meta": meta_json.encode()})
+    sink = pa.BufferOutputStream()
+    with pa.ipc.new_stream(sink, table.schema) as writer:
+        writer.write_table(table)
+    return sink.getvalue().to_pybytes()
+
+
+def run_endpoint(name, params, fmt):
+    """Run an endpoint and serialize its result (the unit of work of a worker)."""
+    frame, meta = ENDPOINTS[name](params)
+    return encode(frame, meta, fmt)
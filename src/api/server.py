@@ -0,0 +1,252 @@
+"""
+Local HTTP analytics API.
+
+Serves the analytics of the dashboard to other programs, as JSON or
+Arrow (``format=arrow`` or an ``Accept: application/vnd.apache.arrow.stream``
+header):
+
+    GET /history?ticker=AAPL&period=1y&interval=1d
+    GET /backtest?ticker=AAPL&strategy=momentum&window=20
+    GET /portfolio?tickers=AAPL,MSFT,GLD&weights=0.5,0.3,0.2&rebalancing=monthly
+    GET /correlation?tickers=AAPL,MSFT,GLD
+    GET /relative?tickers=AAPL,MSFT,GLD&benchmark=SPY
+    GET /health, GET /stats
+
+Parameters can also be sent as a JSON object in a POST body. Histories
+are served from the process cache; the CPU-bound endpoints run in a pool
+of worker processes. Responses are cached on their inputs
+(``api_responses`` cache), and identical requests that arrive while one
+is being computed wait for that result instead of computing it again.
+
+Run with:
+    python -m src.api.server [--host 127.0.0.1] [--port 8000] [--workers 4]
+"""
+import argparse
+import json
+import logging
+import multiprocessing
+import os
+import threading
+import time
+from collections import Counter
+from concurrent.futures import Future, ProcessPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qsl, urlsplit
+
+from src.api.endpoints import ENDPOINTS, FORMATS, BadRequest, NotFound, run_endpoint
+from src.data.cache import CACHE_REGISTRY, LRUCache, read_config
+from src.monitoring.timings import record_timing
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_PORT = 8000
+# Endpoints run in the server process (cheap, and they use its history cache)
+IN_PROCESS = {"history"}
+# Seconds a request may wait for a worker before failing
+REQUEST_TIMEOUT = 120
+
+# Encoded responses, keyed on (endpoint, parameters, format)
+RESPONSE_CACHE = LRUCache("api_responses", max_bytes=128 * 1024 * 1024, ttl=300)
+
+# Requests served by this process: "requests", "cache_hits", "coalesced", "errors"
+API_CALLS = Counter()
+
+
+def load_api_settings() -> dict:
+    """
+    Read the ``api`` section of config.yaml.
+
+    api:
+      host: 127.0.0.1
+      port: 8000
+      workers: 2              # worker processes (0: compute in the server)
+    """
+    cfg = read_config().get("api", {}) or {}
+    return {
+        "host": cfg.get("host", "127.0.0.1"),
+        "port": int(cfg.get("port", DEFAULT_PORT)),
+        "workers": int(cfg.get("workers", min(4, os.cpu_count() or 1))),
+    }
+
+
+class AnalyticsService:
+    """Response cache, request coalescing and the worker pool, without HTTP."""
+
+    def __init__(self, workers: int = 2):
+        self.pool = None
+        if workers > 0:
+            # "spawn": the server is multi-threaded, forking it is unsafe
+            self.pool = ProcessPoolExecutor(workers, mp_context=multiprocessing.get_context("spawn"))
+        self._inflight = {}
+        self._lock = threading.Lock()
+
+    def warm_up(self):
+        """Start the worker processes now rather than on the first request."""
+        if self.pool is not None:
+            for f in [self.pool.submit(time.sleep, 0) for _ in range(self.pool._max_workers)]:
+                f.result()
+
+    def shutdown(self):
+        if self.pool is not None:
+            self.pool.shutdown(cancel_futures=True)
+
+    def handle(self, endpoint: str, params: dict, fmt: str = "json") -> bytes:
+        """Encoded result of ``endpoint`` for ``params``: cached, coalesced or computed."""
+        if endpoint not in ENDPOINTS:
+            raise NotFound(f"Unknown endpoint: {endpoint}")
+        if fmt not in FORMATS:
+            raise BadRequest(f"format must be one of {', '.join(FORMATS)}.")
+        key = (endpoint, tuple(sorted((k, str(v)) for k, v in params.items())), fmt)
+
+        body = RESPONSE_CACHE.get(key)
+        if body is not None:
+            API_CALLS["cache_hits"] += 1
+            return body
+
+        with self._lock:
+            # Checked again: the result may have landed since the lookup above
+            body = RESPONSE_CACHE.get(key)
+            if body is not None:
+                API_CALLS["cache_hits"] += 1
+                return body
+            pending = self._inflight.get(key)
+            if pending is None:
+                pending = self._inflight[key] = Future()
+                leader = True
+            else:
+                leader = False
+
+        if not leader:
+            API_CALLS["coalesced"] += 1
+            return pending.result(timeout=REQUEST_TIMEOUT)
+
+        try:
+            body = self._compute(endpoint, params, fmt)
+        except BaseException as e:
+            pending.set_exception(e)
+            raise
+        else:
+            RESPONSE_CACHE.set(key, body, size=len(body))
+            pending.set_result(body)
+            return body
+        finally:
+            with self._lock:
+                self._inflight.pop(key, None)
+
+    def _compute(self, endpoint, params, fmt):
+        start = time.perf_counter()
+        if self.pool is None or endpoint in IN_PROCESS:
+            body = run_endpoint(endpoint, params, fmt)
+        else:
+            body = self.pool.submit(run_endpoint, endpoint, params, fmt).result(timeout=REQUEST_TIMEOUT)
+        record_timing("api", endpoint, time.perf_counter() - start)
+        return body
+
+    def stats(self) -> dict:
+        return {
+            "calls": dict(API_CALLS),
+            "inflight": len(self._inflight),
+            "workers": self.pool._max_workers if self.pool is not None else 0,
+            "caches": [c.stats() for c in CACHE_REGISTRY.values()],
+        }
+
+
+class ApiHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep-alive: clients reuse connections
+    # Headers and body are separate writes: do not let them wait on ACKs
+    disable_nagle_algorithm = True
+    service: AnalyticsService = None
+
+    def do_GET(self):
+        url = urlsplit(self.path)
+        self._dispatch(url.path, dict(parse_qsl(url.query)))
+
+    def do_POST(self):
+        url = urlsplit(self.path)
+        params = dict(parse_qsl(url.query))
+        length = int(self.headers.get("Content-Length") or 0)
+        if length:
+            try:
+                body = json.loads(self.rfile.read(length))
+            except ValueError:
+                return self._send_error(400, "Body must be a JSON object.")
+            if not isinstance(body, dict):
+                return self._send_error(400, "Body must be a JSON object.")
+            # Lists (tickers, weights) are accepted as JSON arrays
+            params.update({
+                k: ",".join(map(str, v)) if isinstance(v, list) else v for k, v in body.items()
+            })
+        self._dispatch(url.path, params)
+
+    def _dispatch(self, path, params):
+        endpoint = path.strip("/")
+        API_CALLS["requests"] += 1
+        if endpoint == "health":
+            return self._send(200, b'{"status":"ok"}', FORMATS["json"])
+        if endpoint == "stats":
+            return self._send(200, json.dumps(self.service.stats()).encode(), FORMATS["json"])
+
+        fmt = params.pop("format", None)
+        if fmt is None:
+            fmt = "arrow" if FORMATS["arrow"] in self.headers.get("Accept", "") else "json"
+        try:
+            body = self.service.handle(endpoint, params, fmt)
+        except BadRequest as e:
+            return self._send_error(400, str(e))
+        except NotFound as e:
+            return self._send_error(404, str(e))
+        except ImportError:
+            return self._send_error(501, "The Arrow format needs pyarrow.")
+        except Exception as e:
+            logger.exception("API request %s failed", self.path)
+            return self._send_error(500, f"{type(e).__name__}: {e}")
+        self._send(200, body, FORMATS[fmt])
+
+    def _send(self, status, body, content_type):
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _send_error(self, status, message):
+        API_CALLS["errors"] += 1
+        self._send(status, json.dumps({"error": message}).encode(), FORMATS["json"])
+
+    def log_message(self, format, *args):
+        logger.debug("%s - %s", self.address_string(), format % args)
+
+
+def make_server(host="127.0.0.1", port=DEFAULT_PORT, workers=2):
+    """Build the HTTP server and its service (call ``serve_forever`` to run it)."""
+    service = AnalyticsService(workers)
+    handler = type("Handler", (ApiHandler,), {"service": service})
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    server.service = service
+    return server
+
+
+def main(argv=None):
+    settings = load_api_settings()
+    parser = argparse.ArgumentParser(description="Local HTTP analytics API")
+    parser.add_argument("--host", default=settings["host"])
+    parser.add_argument("--port", type=int, default=settings["port"])
+    parser.add_argument("--workers", type=int, default=settings["workers"])
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
+    server = make_server(args.host, args.port, args.workers)
+    server.service.warm_up()
+    logger.info("Analytics API on http://%s:%d (%d workers)", args.host, args.port, args.workers)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        server.service.shutdown()
+
+
+if __name__ == "__main__":
+    main()
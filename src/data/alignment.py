@@ -0,0 +1,185 @@
+"""
+Alignment of price histories that trade on different calendars.
+
+Mixing 24/7 assets (crypto) with exchange-traded ones means their
+timestamps differ: weekends, holidays, different session hours. Rather
+than outer-joining frames on every rerun, the histories of a universe are
+mapped once onto a master calendar (the union of their timestamps). For
+every asset and every calendar row, integer indexers give the position of
+the last observation at or before that row, and how many rows ago it was.
+The indexers are cached (keyed on a content hash of each index), so
+aligning prices is a NumPy gather.
+
+Policies
+--------
+inner
+    Keep the rows where every asset has an observation.
+ffill
+    Carry the last price forward for up to ``max_gap`` calendar rows;
+    rows with a longer gap for any asset are dropped.
+per_asset
+    Carry prices forward without limit, so each asset's returns follow
+    its own calendar: an asset that is closed has a zero return, and its
+    next return covers the whole closure.
+"""
+import logging
+from typing import NamedTuple
+
+import numpy as np
+import pandas as pd
+
+from src.data.cache import LRUCache, fingerprint, read_config
+from src.data.precision import working_dtype
+
+logger = logging.getLogger(__name__)
+
+ALIGNMENT_POLICIES = {
+    "inner": "Common timestamps only",
+    "ffill": "Forward-fill (max gap)",
+    "per_asset": "Per-asset calendars",
+}
+DEFAULT_POLICY = "ffill"
+# Calendar rows a price can be carried forward with the "ffill" policy
+DEFAULT_MAX_GAP = 5
+
+# Indexers per universe, keyed on the interval, the tickers and their index contents
+ALIGNMENT_CACHE = LRUCache("alignment", max_bytes=64 * 1024 * 1024)
+
+
+class Alignment(NamedTuple):
+    calendar: pd.DatetimeIndex
+    # (rows, assets): position of the last observation at or before each
+    # calendar row, -1 before the first observation
+    positions: np.ndarray
+    # (rows, assets): calendar rows since that observation (0 = observed
+    # at this row), -1 before the first observation
+    staleness: np.ndarray
+
+
+def load_alignment_settings() -> dict:
+    """
+    Read the ``alignment`` section of config.yaml.
+
+    alignment:
+      policy: ffill        # inner | ffill | per_asset
+      max_gap: 5           # calendar rows, for ffill
+    """
+    cfg = read_config().get("alignment", {}) or {}
+    policy = cfg.get("policy", DEFAULT_POLICY)
+    if policy not in ALIGNMENT_POLICIES:
+        policy = DEFAULT_POLICY
+    return {"policy": policy, "max_gap": int(cfg.get("max_gap", DEFAULT_MAX_GAP))}
+
+
+def _signature(index: pd.DatetimeIndex) -> str:
+    # Every timestamp counts: a re-fetch can fill a gap between the same
+    # endpoints, and another interval can share the first and last bars
+    return fingerprint(pd.DatetimeIndex(index).as_unit("ns").asi8)
+
+
+def build_alignment(indexes) -> Alignment:
+    """
+    Map sorted, duplicate-free DatetimeIndexes onto their master calendar.
+    """
+    stamps = [pd.DatetimeIndex(idx).as_unit("ns").asi8 for idx in indexes]
+    calendar = np.unique(np.concatenate(stamps)) if stamps else np.array([], dtype=np.int64)
+    n_rows = len(calendar)
+    rows = np.arange(n_rows, dtype=np.int32)
+
+    positions = np.empty((n_rows, len(stamps)), dtype=np.int32)
+    staleness = np.empty((n_rows, len(stamps)), dtype=np.int32)
+    for j, s in enumerate(stamps):
+        pos = np.searchsorted(s, calendar, side="right") - 1
+        # Calendar row of each observation (exact: the calendar is the union)
+        obs_rows = np.searchsorted(calendar, s)
+        observed = pos >= 0
+        last_row = obs_rows[np.where(observed, pos, 0)]
+        positions[:, j] = pos
+        staleness[:, j] = np.where(observed, rows - last_row, -1)
+
+    return Alignment(
+        pd.DatetimeIndex(calendar.view("datetime64[ns]"), name="Date"), positions, staleness
+    )
+
+
+def get_alignment(tickers, indexes, interval=None) -> Alignment:
+    """Cached ``build_alignment`` for a universe (``interval`` of its bars, when known)."""
+    key = (interval, *((t, _signature(idx)) for t, idx in zip(tickers, indexes)))
+    return ALIGNMENT_CACHE.get_or_compute(key, lambda: build_alignment(indexes))
+
+
+def _price_arrays(history):
+    # (index, float64 values) of a price history: sorted, no NaN, no duplicates
+    s = history["price"] if isinstance(history, pd.DataFrame) else history
+    index, values = s.index, s.to_numpy(dtype=np.float64)
+    missing = np.isnan(values)
+    if missing.any():
+        index, values = index[~missing], values[~missing]
+    if not index.is_monotonic_increasing or index.has_duplicates:
+        s = pd.Series(values, index=index).sort_index(kind="stable")
+        s = s[~s.index.duplicated(keep="last")]
+        index, values = s.index, s.to_numpy()
+    return index, values
+
+
+def align_prices(
+    histories: dict,
+    policy: str = DEFAULT_POLICY,
+    max_gap: int | None = DEFAULT_MAX_GAP,
+    dtype=None,
+    interval: str | None = None,
+) -> pd.DataFrame:
+    """
+    Align price histories on their master calendar.
+
+    Parameters
+    ----------
+    histories : dict
+        ticker -> price history (Series, or frame with a ``price`` column).
+    policy : str
+        "inner", "ffill" or "per_asset" (see the module docstring).
+    max_gap : int or None
+        Longest forward-fill, in calendar rows, for the "ffill" policy.
+    dtype : NumPy dtype, optional
+        Of the aligned prices; float32 in compact mode, float64 otherwise
+        (see src/data/precision.py).
+    interval : str, optional
+        Bar interval of the histories, part of the cache key of the indexers.
+
+    Returns
+    -------
+    pd.DataFrame
+        One column per ticker with prices, no missing values. Tickers
+        without any price are dropped (with a warning).
+    """
+    if policy not in ALIGNMENT_POLICIES:
+        raise ValueError(f"Unknown alignment policy: {policy}")
+    tickers = list(histories)
+    if not tickers:
+        return pd.DataFrame()
+
+    arrays = [_price_arrays(histories[t]) for t in tickers]
+    empty = [t for t, (index, _) in zip(tickers, arrays) if len(index) == 0]
+    if empty:
+        logger.warning("No prices for %s: aligning the other tickers only.", ", ".join(map(str, empty)))
+        arrays = [a for t, a in zip(tickers, arrays) if t not in empty]
+        tickers = [t for t in tickers if t not in empty]
+        if not tickers:
+            return pd.DataFrame()
+    al = get_alignment(tickers, [index for index, _ in arrays], interval)
+
+    values = np.empty(al.positions.shape, dtype=dtype or working_dtype())
+    for j, (_, prices) in enumerate(arrays):
+        values[:, j] = prices[al.positions[:, j]]
+
+    if policy == "inner":
+        valid = al.staleness == 0
+    elif policy == "ffill" and max_gap is not None:
+        valid = (al.staleness >= 0) & (al.staleness <= max_gap)
+    else:
+        valid = al.staleness >= 0
+    keep = valid.all(axis=1)
+
+    if not keep.all():
+        values = values[keep]
+    return pd.DataFrame(values, index=al.calendar[keep], columns=tickers, copy=False)
@@ -0,0 +1,237 @@
+"""
+On-disk price archive that can be memory-mapped.
+
+Each history (asset, period, interval) is stored in its own directory:
+
+    <root>/<backend>/<asset>__<period>__<interval>/
+        manifest.json          columns, rows, index unit / tz, write time,
+                               metadata (e.g. the data quality report)
+        index.<gen>.npy        int64 timestamps
+        <column>.<gen>.npy     one float64 file per column
+
+Files are opened with ``np.load(mmap_mode=...)``: pages, the report
+script and worker processes get NumPy views or pandas frames on the OS
+page cache, without deserializing or copying. So the memory used by a
+history does not grow with the number of sessions or processes.
+
+Writers save new data files under a fresh generation suffix, then
+atomically replace the manifest. Readers never see a partial write.
+"""
+import json
+import os
+import shutil
+import tempfile
+import time
+from pathlib import Path
+from urllib.parse import quote
+
+import numpy as np
+import pandas as pd
+
+from src.data.cache import CONFIG_PATH, read_config
+
+DEFAULT_ROOT = CONFIG_PATH.parent / "data" / "archive"
+# Same lifetime as the in-process history cache
+DEFAULT_MAX_AGE = 12 * 3600
+MANIFEST = "manifest.json"
+FORMAT_VERSION = 2
+
+
+def load_archive_settings() -> dict:
+    """
+    Read the ``archive`` section of config.yaml.
+
+    archive:
+      enabled: true
+      path: data/archive         # relative to the project root
+      max_age_seconds: 43200     # older entries are downloaded again
+    """
+    # Read on every history lookup: parsed once per change of the file
+    cfg = read_config().get("archive", {}) or {}
+    root = Path(cfg.get("path") or DEFAULT_ROOT)
+    if not root.is_absolute():
+        root = CONFIG_PATH.parent / root
+    return {
+        "enabled": bool(cfg.get("enabled", True)),
+        "root": root,
+        "max_age": cfg.get("max_age_seconds", DEFAULT_MAX_AGE),
+    }
+
+
+def _backend_root(backend: str) -> Path:
+    # Offline synthetic prices must never be served as provider data
+    return load_archive_settings()["root"] / backend
+
+
+def entry_dir(asset: str, period: str, interval: str, backend: str = "yfinance") -> Path:
+    name = "__".join(quote(part, safe="") for part in (asset, period, interval))
+    return _backend_root(backend) / name
+
+
+def read_manifest(path: Path) -> dict | None:
+    try:
+        with open(path / MANIFEST, "r") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def open_arrays(asset: str, period: str, interval: str, backend: str = "yfinance", max_age=None):
+    """
+    Map an archived history as read-only NumPy arrays.
+
+    Returns
+    -------
+    tuple or None
+        (manifest, int64 index, {column: float64 array}), or None when the
+        entry is missing or older than ``max_age`` seconds.
+    """
+    return _open(entry_dir(asset, period, interval, backend), max_age, mmap_mode="r")
+
+
+def _open(path: Path, max_age, mmap_mode):
+    manifest = read_manifest(path)
+    if manifest is None or manifest.get("version") != FORMAT_VERSION:
+        return None
+    if max_age and time.time() - manifest["written_at"] > max_age:
+        return None
+    gen = manifest["generation"]
+    try:
+        index = np.load(path / f"index.{gen}.npy", mmap_mode=mmap_mode)
+        columns = {
+            col: np.load(path / f"{quote(col, safe='')}.{gen}.npy", mmap_mode=mmap_mode)
+            for col in manifest["columns"]
+        }
+    except (OSError, ValueError):
+        # Replaced by a concurrent writer between the manifest and the files
+        return None
+    return manifest, index, columns
+
+
+def _to_frame(manifest, index, columns) -> pd.DataFrame:
+    idx = pd.DatetimeIndex(
+        index.view(f"datetime64[{manifest['index_unit']}]"), name=manifest["index_name"], copy=False
+    )
+    if manifest.get("tz"):
+        idx = idx.tz_localize("UTC").tz_convert(manifest["tz"])
+    return pd.DataFrame(columns, index=idx, copy=False)
+
+
+def read_history(asset: str, period: str, interval: str, backend: str = "yfinance", max_age=None):
+    """
+    Open an archived history as a DataFrame backed by the mapped files.
+
+    The arrays are mapped copy-on-write: in-place updates (e.g. the live
+    quote patch of the last bar) stay private to this process and are
+    never written back to the archive.
+    """
+    opened = _open(entry_dir(asset, period, interval, backend), max_age, mmap_mode="c")
+    if opened is None:
+        return None
+    return _to_frame(*opened)
+
+
+def write_history(
+    asset: str, period: str, interval: str, df: pd.DataFrame, backend: str = "yfinance", metadata=None
+):
+    """
+    Store ``df`` (DatetimeIndex, numeric columns) in the archive, with an
+    optional JSON-serializable ``metadata`` dict.
+
+    Returns the archived history, mapped from disk, so that callers keep
+    the shared copy rather than the one they downloaded.
+    """
+    path = entry_dir(asset, period, interval, backend)
+    path.mkdir(parents=True, exist_ok=True)
+
+    index = df.index
+    if not isinstance(index, pd.DatetimeIndex):
+        index = pd.DatetimeIndex(index)
+    tz = str(index.tz) if index.tz is not None else None
+    if tz is not None:
+        index = index.tz_convert("UTC").tz_localize(None)
+
+    gen = f"{time.time_ns():x}"
+    columns = [str(c) for c in df.columns]
+    np.save(path / f"index.{gen}.npy", np.ascontiguousarray(index.asi8, dtype=np.int64))
+    for col, name in zip(df.columns, columns):
+        values = np.ascontiguousarray(df[col].to_numpy(dtype=np.float64, na_value=np.nan))
+        np.save(path / f"{quote(name, safe='')}.{gen}.npy", values)
+
+    manifest = {
+        "version": FORMAT_VERSION,
+        "asset": asset,
+        "period": period,
+        "interval": interval,
+        "generation": gen,
+        "columns": columns,
+        "rows": len(df),
+        "index_name": index.name,
+        "index_unit": index.unit,
+        "tz": tz,
+        "written_at": time.time(),
+        "metadata": metadata or {},
+    }
+    fd, tmp = tempfile.mkstemp(dir=path, suffix=".json.tmp")
+    with os.fdopen(fd, "w") as f:
+        json.dump(manifest, f)
+    os.replace(tmp, path / MANIFEST)
+
+    _remove_old_generations(path, gen)
+    return _to_frame(*_open(path, None, mmap_mode="c"))
+
+
+def read_metadata(asset: str, period: str, interval: str, backend: str = "yfinance") -> dict:
+    """Metadata stored with an archived history (empty when missing)."""
+    manifest = read_manifest(entry_dir(asset, period, interval, backend))
+    return (manifest or {}).get("metadata", {})
+
+
+def _remove_old_generations(path: Path, gen: str):
+    for file in path.glob("*.npy"):
+        file_gen = file.name.rsplit(".", 2)[-2]
+        # Generations are fixed-width hex timestamps: keep newer concurrent writes
+        if len(file_gen) == len(gen) and file_gen < gen:
+            try:
+                # Processes that still map the old files keep their pages
+                file.unlink()
+            except OSError:
+                pass
+
+
+def archived_histories(backend: str = "yfinance") -> list:
+    """Describe the archived histories: asset, period, interval, rows, size and age."""
+    root = _backend_root(backend)
+    if not root.exists():
+        return []
+    rows = []
+    now = time.time()
+    for path in sorted(root.iterdir()):
+        manifest = read_manifest(path)
+        if manifest is None:
+            continue
+        size = sum(f.stat().st_size for f in path.glob(f"*.{manifest['generation']}.npy"))
+        rows.append({
+            "asset": manifest["asset"],
+            "period": manifest["period"],
+            "interval": manifest["interval"],
+            "rows": manifest["rows"],
+            "size_kb": size / 1024,
+            "age_s": now - manifest["written_at"],
+        })
+    return rows
+
+
+def remove_history(asset: str, backend: str = "yfinance") -> int:
+    """Delete every archived history of ``asset``. Returns the number removed."""
+    root = _backend_root(backend)
+    if not root.exists():
+        return 0
+    prefix = quote(asset, safe="") + "__"
+    removed = 0
+    for path in root.iterdir():
+        manifest = read_manifest(path) if path.name.startswith(prefix) else None
+        if manifest is not None and manifest["asset"] == asset:
+            shutil.rmtree(path, ignore_errors=True)
+            removed += 1
+    return removed
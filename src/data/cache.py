@@ -0,0 +1,264 @@
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import yaml
+
+CONFIG_PATH = Path(__file__).resolve().parents[2] / "config.yaml"
+
+# Every cache created in this process, by name (for the Settings page)
+CACHE_REGISTRY = {}
+
+
+def fingerprint(*objs) -> str:
+    """
+    Build a fast content hash for pandas / numpy objects and plain values.
+
+    Arrays are hashed on their raw bytes (no copy when contiguous), so
+    two frames with the same index, columns and values always get the
+    same key, whatever object identity they have.
+    """
+    h = hashlib.blake2b(digest_size=16)
+    for obj in objs:
+        _update_hash(h, obj)
+    return h.hexdigest()
+
+
+def _update_hash(h, obj):
+    if isinstance(obj, pd.DataFrame):
+        h.update(b"frame")
+        _update_hash(h, obj.index)
+        h.update(repr(list(obj.columns)).encode())
+        _update_hash(h, obj.to_numpy())
+    elif isinstance(obj, pd.Series):
+        h.update(b"series")
+        _update_hash(h, obj.index)
+        h.update(repr(obj.name).encode())
+        _update_hash(h, obj.to_numpy())
+    elif isinstance(obj, pd.Index):
+        h.update(b"index")
+        if isinstance(obj, pd.DatetimeIndex):
+            _update_hash(h, obj.asi8)
+        else:
+            h.update(repr(obj.tolist()).encode())
+    elif isinstance(obj, np.ndarray):
+        if obj.dtype == object:
+            h.update(repr(obj.tolist()).encode())
+        else:
+            h.update(str(obj.dtype).encode())
+            h.update(str(obj.shape).encode())
+            if obj.flags.f_contiguous and not obj.flags.c_contiguous:
+                # Column-major (e.g. the values of a frame): hashed as laid out, no copy
+                h.update(b"F")
+                obj = obj.T
+            h.update(memoryview(np.ascontiguousarray(obj)).cast("B"))
+    elif isinstance(obj, (list, tuple)):
+        # Item by item: the repr of a nested array or frame is truncated
+        h.update(f"{type(obj).__name__}[{len(obj)}]".encode())
+        for item in obj:
+            _update_hash(h, item)
+    elif isinstance(obj, dict):
+        h.update(f"dict[{len(obj)}]".encode())
+        for k, v in obj.items():
+            _update_hash(h, k)
+            _update_hash(h, v)
+    else:
+        h.update(repr(obj).encode())
+
+
+def estimate_size(value) -> int:
+    """Approximate memory footprint (bytes) of a cached value."""
+    if isinstance(value, pd.DataFrame):
+        return int(value.memory_usage(deep=False, index=True).sum())
+    if isinstance(value, pd.Series):
+        return int(value.memory_usage(deep=False, index=True))
+    if isinstance(value, np.ndarray):
+        return int(value.nbytes)
+    if isinstance(value, (list, tuple)):
+        return sum(estimate_size(v) for v in value) + 64
+    if isinstance(value, dict):
+        return sum(estimate_size(v) for v in value.values()) + 64
+    if isinstance(value, (bytes, str)):
+        return len(value)
+    return 64
+
+
+class LRUCache:
+    """
+    Thread-safe in-process cache with a byte budget, optional TTL and stats.
+
+    Entries are evicted least-recently-used first once ``max_bytes`` is
+    exceeded. The cache lives at module level, so it is shared by every
+    Streamlit session running in the same process. ``max_bytes`` and
+    ``ttl`` can be overridden per cache name in the ``cache`` section of
+    config.yaml.
+    """
+
+    def __init__(self, name, max_bytes=64 * 1024 * 1024, ttl=None):
+        self.name = name
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        settings = load_cache_settings().get(name, {})
+        if "max_mb" in settings:
+            self.max_bytes = int(settings["max_mb"] * 1024 * 1024)
+        if "ttl_seconds" in settings:
+            self.ttl = settings["ttl_seconds"] or None
+        self._data = OrderedDict()  # key -> (value, size, created_at)
+        self._lock = threading.RLock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.current_bytes = 0
+        CACHE_REGISTRY[name] = self
+
+    def get(self, key, default=None):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                self.misses += 1
+                return default
+            value, size, created_at = entry
+            if self.ttl is not None and time.time() - created_at > self.ttl:
+                self._remove(key)
+                self.misses += 1
+                return default
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key, value, size=None):
+        if size is None:
+            size = estimate_size(value)
+        with self._lock:
+            if key in self._data:
+                self._remove(key)
+            self._data[key] = (value, size, time.time())
+            self.current_bytes += size
+            self._evict()
+
+    def get_or_compute(self, key, compute):
+        """Return the cached value for ``key`` or compute and store it."""
+        value = self.get(key, _MISSING)
+        if value is _MISSING:
+            value = compute()
+            self.set(key, value)
+        return value
+
+    def invalidate(self, key=None):
+        """Drop one key, or everything when ``key`` is None."""
+        with self._lock:
+            if key is None:
+                self._data.clear()
+                self.current_bytes = 0
+            elif key in self._data:
+                self._remove(key)
+
+    def _remove(self, key):
+        _, size, _ = self._data.pop(key)
+        self.current_bytes -= size
+
+    def _evict(self):
+        while self.current_bytes > self.max_bytes and len(self._data) > 1:
+            oldest = next(iter(self._data))
+            self._remove(oldest)
+            self.evictions += 1
+
+    def keys(self):
+        with self._lock:
+            return list(self._data)
+
+    def configure(self, max_bytes=None, ttl=None):
+        """Change the byte budget and / or TTL (``ttl=0`` disables it)."""
+        with self._lock:
+            if max_bytes is not None:
+                self.max_bytes = max_bytes
+                self._evict()
+            if ttl is not None:
+                self.ttl = ttl or None
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "cache": self.name,
+            "entries": len(self._data),
+            "size_mb": self.current_bytes / 1024 / 1024,
+            "max_mb": self.max_bytes / 1024 / 1024,
+            "ttl_s": self.ttl,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate (%)": 100.0 * self.hits / lookups if lookups else 0.0,
+            "evictions": self.evictions,
+        }
+
+    def entries(self) -> list:
+        """Describe each entry: key, size and age (seconds)."""
+        now = time.time()
+        with self._lock:
+            return [
+                {"key": str(key), "size_kb": size / 1024, "age_s": now - created_at}
+                for key, (_, size, created_at) in self._data.items()
+            ]
+
+    def __contains__(self, key):
+        return key in self._data
+
+    def __len__(self):
+        return len(self._data)
+
+
+_MISSING = object()
+
+# Parsed config.yaml and the (mtime, size) it was parsed at
+_CONFIG = (None, {})
+_CONFIG_LOCK = threading.Lock()
+
+
+def read_config() -> dict:
+    """
+    Parsed config.yaml, re-read only when the file changes.
+
+    For settings looked up on hot paths (e.g. once per history fetch):
+    parsing the YAML costs milliseconds. Callers must not mutate it.
+    """
+    global _CONFIG
+    try:
+        st = CONFIG_PATH.stat()
+    except OSError:
+        return {}
+    stamp = (st.st_mtime_ns, st.st_size)
+    with _CONFIG_LOCK:
+        if _CONFIG[0] != stamp:
+            try:
+                with open(CONFIG_PATH, "r") as f:
+                    _CONFIG = (stamp, yaml.safe_load(f) or {})
+            except OSError:
+                return {}
+        return _CONFIG[1]
+
+
+def load_cache_settings() -> dict:
+    """Read the per-cache overrides from the ``cache`` section of config.yaml."""
+    return read_config().get("cache", {}) or {}
+
+
+# Derived analytics (returns, portfolio runs, stats, correlations). Defined
+# here rather than in the pages: Streamlit re-executes page scripts on every
+# rerun, while imported modules (and so this cache) persist in the process.
+DERIVED_CACHE = LRUCache("derived_results", max_bytes=128 * 1024 * 1024)
+
+
+def cached_call(cache, fn, *args, key=None, **kwargs):
+    """
+    Memoize ``fn(*args, **kwargs)`` in ``cache`` on a content hash.
+
+    ``key`` can be given to skip hashing large inputs whose fingerprint is
+    already known (e.g. a price frame hashed once per rerun).
+    """
+    if key is None:
+        key = fingerprint(*args, sorted(kwargs.items()))
+    full_key = (fn.__module__, fn.__qualname__, key)
+    return cache.get_or_compute(full_key, lambda: fn(*args, **kwargs))
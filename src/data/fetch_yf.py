@@ -1,12 +1,111 @@
-import yfinance as yf
+import logging
+import os
+from collections import Counter
+
 import pandas as pd
 
+from src.data.archive import load_archive_settings, read_history, read_metadata, write_history
+from src.data.cache import LRUCache
+from src.data.quality import clean_history, record_quality
+from src.monitoring.timings import timed
+from src.monitoring.tracing import traced
+
+logger = logging.getLogger(__name__)
+
+# Downloaded histories, keyed on (asset, period, interval). Frames are
+# shared between sessions: treat them as read-only. The live quote path
+# (src.data.quotes) patches the last bar of these frames in place. Frames
+# come from the price archive (src.data.archive) whenever possible, so
+# their values are memory-mapped and shared with the other processes.
+HISTORY_CACHE = LRUCache("price_history", max_bytes=256 * 1024 * 1024, ttl=12 * 3600)
+
+# Requests sent to the data provider by this process ("history", "quotes")
+PROVIDER_CALLS = Counter()
+
+
+def data_backend() -> str:
+    """
+    Data provider in use: "yfinance" (default) or "synthetic".
+
+    The synthetic backend (PGLFF_DATA_BACKEND=synthetic) serves seeded
+    offline prices, for the benchmarks and load tests.
+    """
+    return os.environ.get("PGLFF_DATA_BACKEND", "yfinance").lower()
+
+
+@traced("data.get_history")
 def get_history(asset: str, period="1y", interval="1d") -> pd.DataFrame:
+    key = (asset, period, interval)
+    df = HISTORY_CACHE.get(key)
+    if df is not None:
+        # Never re-set on a hit: that would restart the entry's TTL
+        return df
+    df = load_archived(asset, period, interval)
+    if df is None:
+        with timed("fetch", asset):
+            df = download_history(asset, period=period, interval=interval)
+        if df is not None and not df.empty:
+            # Validated and cleaned once here, never on the read path
+            df, report = clean_history(df, interval)
+            record_quality(key, report)
+            df = archive_history(asset, period, interval, df, metadata={"quality": report})
+    if df is not None and not df.empty:
+        HISTORY_CACHE.set(key, df)
+    return df
+
+
+def load_archived(asset: str, period="1y", interval="1d"):
+    """Open a fresh archived history (memory-mapped), or None."""
+    settings = load_archive_settings()
+    if not settings["enabled"]:
+        return None
+    backend = data_backend()
+    df = read_history(asset, period, interval, backend=backend, max_age=settings["max_age"])
+    if df is not None:
+        # Cleaned before it was archived: only its quality report is loaded
+        record_quality((asset, period, interval), read_metadata(asset, period, interval, backend).get("quality"))
+    return df
+
+
+def archive_history(asset: str, period: str, interval: str, df: pd.DataFrame, metadata=None) -> pd.DataFrame:
+    """
+    Store a downloaded history in the price archive and return the mapped copy.
+
+    Falls back to ``df`` itself when the archive is disabled or not writable.
+    """
+    if not load_archive_settings()["enabled"]:
+        return df
+    try:
+        return write_history(asset, period, interval, df, backend=data_backend(), metadata=metadata)
+    except (OSError, ValueError, TypeError) as e:
+        logger.warning(f"Could not archive {asset} ({period}, {interval}): {e}")
+        return df
+
+
+@traced("data.download_history")
+def download_history(asset: str, period="1y", interval="1d") -> pd.DataFrame:
+    PROVIDER_CALLS["history"] += 1
+    if data_backend() == "synthetic":
+        from src.data.synthetic import synthetic_history
+        return synthetic_history(asset, period=period, interval=interval)
+
+    # yfinance is slow to import: load it only when we actually download
+    import yfinance as yf
+
     df = yf.download(asset, period=period, interval=interval)
     if isinstance(df.columns, pd.MultiIndex):
         df.columns = [c[0] for c in df.columns]
     df = df.reset_index()
-    df.rename(columns={"Close": "price"}, inplace=True)
+    # Daily bars come with a "Date" column, intraday bars with "Datetime"
+    df.rename(columns={df.columns[0]: "Date", "Close": "price"}, inplace=True)
     df = df[["Date", "price"]]
     df["Date"] = pd.to_datetime(df["Date"])
+    if df["Date"].dt.tz is not None:
+        # Intraday timestamps are tz-aware: keep the exchange-local time
+        df["Date"] = df["Date"].dt.tz_localize(None)
     return df.set_index("Date")
+
+
+def cached_history_keys(asset: str) -> list:
+    """Return the (asset, period, interval) cache keys held for ``asset``."""
+    return [key for key in HISTORY_CACHE.keys() if key[0] == asset]
@@ -0,0 +1,115 @@
+# Kept free of heavy imports: the page widgets use it before pandas is loaded.
+import math
+
+# Regular trading session (minutes) and trading days per year, used to
+# annualize metrics computed on any bar size
+MINUTES_PER_SESSION = 390
+TRADING_DAYS = 252
+
+# Trading calendar of each asset type: (minutes per session, sessions per year).
+# Crypto pairs trade around the clock, every day of the year.
+CALENDARS = {
+    "equity": (MINUTES_PER_SESSION, TRADING_DAYS),
+    "crypto": (24 * 60, 365),
+}
+
+# Quote currencies of the Yahoo crypto pairs ("BTC-USD", "ETH-EUR", "SOL-BTC")
+CRYPTO_QUOTES = ("USD", "USDT", "USDC", "EUR", "GBP", "JPY", "CAD", "AUD", "CHF", "BTC", "ETH")
+
+# Intraday intervals offered by the pages
+INTRADAY_INTERVALS = ["1m", "5m", "15m", "1h"]
+
+# Longest history the provider serves for each intraday interval
+# (yfinance: 1m bars over the last 7 days, <1h bars over 60 days, 1h over 730 days)
+INTRADAY_PERIODS = {
+    "1m": ["1d", "5d"],
+    "2m": ["1d", "5d", "1mo"],
+    "5m": ["1d", "5d", "1mo"],
+    "15m": ["1d", "5d", "1mo"],
+    "30m": ["1d", "5d", "1mo"],
+    "60m": ["5d", "1mo", "3mo", "6mo", "1y"],
+    "90m": ["5d", "1mo"],
+    "1h": ["5d", "1mo", "3mo", "6mo", "1y"],
+}
+
+
+def is_intraday(interval: str) -> bool:
+    return (interval.endswith("m") and not interval.endswith("mo")) or interval.endswith("h")
+
+
+def bar_minutes(interval: str) -> int:
+    """Length of an intraday bar in minutes ("5m" -> 5, "1h" -> 60)."""
+    return int(interval[:-1]) * (60 if interval.endswith("h") else 1)
+
+
+def bar_freq(interval: str) -> str:
+    """pandas frequency of an intraday bar, to floor timestamps onto bars."""
+    return f"{bar_minutes(interval)}min"
+
+
+def asset_type(ticker: str) -> str:
+    """"crypto" for a crypto pair ("BTC-USD"), "equity" for anything traded in sessions."""
+    base, sep, quote = str(ticker).upper().rpartition("-")
+    return "crypto" if sep and base and quote in CRYPTO_QUOTES else "equity"
+
+
+def universe_asset_type(tickers, policy: str = "ffill") -> str:
+    """
+    Asset type whose calendar an aligned universe follows.
+
+    Aligned prices keep the union of the calendars ("ffill", "per_asset"),
+    so one crypto pair puts the universe on the 24/7 calendar; "inner"
+    keeps the common timestamps, which are 24/7 only when every asset is.
+    """
+    types = {asset_type(t) for t in tickers}
+    if "crypto" in types and (policy != "inner" or types == {"crypto"}):
+        return "crypto"
+    return "equity"
+
+
+def bars_per_session(interval: str, asset_type: str = "equity") -> int:
+    """Intraday bars in one session; the last one is partial when the bar does not divide it."""
+    return math.ceil(_calendar(asset_type)[0] / bar_minutes(interval))
+
+
+def _calendar(asset_type):
+    try:
+        return CALENDARS[asset_type]
+    except KeyError:
+        raise ValueError(f"Unknown asset type: {asset_type} (expected {', '.join(CALENDARS)}).") from None
+
+
+def periods_per_year(interval: str, asset_type: str = "equity") -> float:
+    """
+    Number of bars in a trading year, to annualize returns and volatility.
+
+    Bars are counted over the sessions of the asset type's calendar
+    (``CALENDARS``): regular 390-minute sessions, 252 per year, for
+    equities; 24-hour sessions, 365 per year, for crypto.
+    """
+    sessions = _calendar(asset_type)[1]
+    if is_intraday(interval):
+        return sessions * bars_per_session(interval, asset_type)
+    if interval == "1d":
+        return sessions
+    if interval == "5d":
+        return sessions / 5
+    if interval == "1wk":
+        return 52
+    if interval == "1mo":
+        return 12
+    if interval == "3mo":
+        return 4
+    raise ValueError(f"Unsupported interval: {interval}")
+
+
+def valid_periods(interval: str, periods: list) -> list:
+    """Periods to offer for ``interval``: ``periods``, or the provider limits for intraday bars."""
+    if not is_intraday(interval):
+        return list(periods)
+    return INTRADAY_PERIODS.get(interval, ["1d", "5d"])
+
+
+def format_timestamp(ts, interval: str) -> str:
+    """Date for daily bars and longer, date and time for intraday bars."""
+    return ts.strftime("%Y-%m-%d %H:%M") if is_intraday(interval) else str(ts.date())
@@ -0,0 +1,65 @@
+"""
+Working precision of price and return arrays (compact mode).
+
+By default prices and returns are float64. With
+
+    compact:
+      enabled: true
+
+in config.yaml, aligned price frames, returns and the engine's working
+arrays (positions, holdings, drift, turnover) are float32 and share their
+date index, which halves the memory of a large universe. Sums, compounding
+and moments still accumulate in float64 (the engine works on float64
+blocks of bounded size), so compact results match float64 runs within
+COMPACT_RTOL, as checked by ``scripts/run_benchmarks.py --compact``
+against the golden outputs.
+"""
+import numpy as np
+import pandas as pd
+
+from src.data.cache import read_config
+
+# Relative tolerance of compact (float32) results against float64 ones
+COMPACT_RTOL = 1e-4
+# Absolute tolerance, for values close to zero (e.g. returns, alphas)
+COMPACT_ATOL = 1e-6
+
+
+def load_precision_settings() -> dict:
+    """
+    Read the ``compact`` section of config.yaml.
+
+    compact:
+      enabled: false     # float32 prices / returns / engine arrays
+    """
+    cfg = read_config().get("compact", {}) or {}
+    return {"enabled": bool(cfg.get("enabled", False))}
+
+
+def working_dtype():
+    """float32 in compact mode, float64 otherwise."""
+    return np.float32 if load_precision_settings()["enabled"] else np.float64
+
+
+def float_dtype(frame) -> np.dtype:
+    """float32 when every column of ``frame`` is float32, float64 otherwise."""
+    dtypes = frame.dtypes if isinstance(frame, pd.DataFrame) else [frame.dtype]
+    return np.dtype(np.float32) if len(dtypes) and all(d == np.float32 for d in dtypes) else np.dtype(np.float64)
+
+
+def returns_from_prices(prices: pd.DataFrame) -> pd.DataFrame:
+    """
+    Simple returns of a price frame, rows with a missing return dropped.
+
+    Same values as ``prices.pct_change(fill_method=None).dropna()``, computed
+    into one array of the prices' dtype (no shifted copy or temporaries).
+    """
+    P = prices.to_numpy(dtype=float_dtype(prices))
+    out = np.empty((max(len(P) - 1, 0), P.shape[1]), dtype=P.dtype)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        np.divide(P[1:], P[:-1], out=out)
+    out -= 1.0
+    keep = ~np.isnan(out).any(axis=1)
+    if not keep.all():
+        out = out[keep]
+    return pd.DataFrame(out, index=prices.index[1:][keep], columns=prices.columns, copy=False)
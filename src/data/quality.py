@@ -0,0 +1,199 @@
+"""
+Validation and cleaning of downloaded price histories.
+
+Runs once per download, before the history is cached and archived, so
+reruns and readers of the archive get clean data without checking it
+again. Every check is vectorized over the whole history.
+
+Fixed:
+    duplicated timestamps (last kept), missing and non-positive prices
+    (dropped), one-bar spikes that revert on the next bar (replaced by the
+    previous price).
+Flagged only:
+    gaps in the bar sequence, stale prints (runs of identical prices) and
+    split candidates: lasting jumps by a split ratio. The provider's closes
+    are already split-adjusted, and a genuine -50% or +100% move has the
+    same shape, so prices are never rescaled on the ratio alone.
+"""
+import threading
+
+import numpy as np
+import pandas as pd
+
+from src.data.intervals import bar_minutes, is_intraday
+
+# One-bar log return beyond which a move is a spike or split candidate
+JUMP_LOG_RETURN = np.log(1.8)
+# A spike reverts: the next return cancels it to within this fraction
+SPIKE_REVERSION = 0.25
+# Split ratios recognised (n-for-1 splits and 1-for-n reverse splits)
+SPLIT_RATIOS = np.array([2, 3, 4, 5, 8, 10, 15, 20, 25, 30, 40, 50], dtype=np.float64)
+SPLIT_TOLERANCE = 0.04
+# Identical consecutive prices flagged as a stale run
+STALE_RUN_BARS = {"daily": 5, "intraday": 30}
+# Gaps: missing business days (daily) / bars within a session (intraday)
+MAX_MISSING_DAYS = 3
+MAX_MISSING_BARS = 5
+
+# Latest quality report per (asset, period, interval), for the pages and report
+_REPORTS = {}
+_LOCK = threading.Lock()
+
+
+def record_quality(key, report: dict | None):
+    with _LOCK:
+        if report is None:
+            _REPORTS.pop(key, None)
+        else:
+            _REPORTS[key] = report
+
+
+def quality_report(asset: str, period: str, interval: str) -> dict | None:
+    """Quality report of the cached history of ``asset``, if it was checked."""
+    with _LOCK:
+        return _REPORTS.get((asset, period, interval))
+
+
+def _split_factors(log_rets):
+    # Ratio n (or 1/n) of each jump that matches a split, else 1
+    ratio = np.exp(-log_rets)  # > 1 when the price drops (n-for-1 split)
+    n = np.where(ratio >= 1, ratio, 1 / ratio)
+    nearest = SPLIT_RATIOS[np.abs(n[:, None] - SPLIT_RATIOS[None, :]).argmin(axis=1)]
+    is_split = np.abs(n / nearest - 1) < SPLIT_TOLERANCE
+    return np.where(is_split, np.where(ratio >= 1, nearest, 1 / nearest), 1.0)
+
+
+def _run_lengths(same):
+    # Lengths of the runs of True in a boolean array
+    padded = np.concatenate(([False], same, [False]))
+    edges = np.flatnonzero(padded[1:] != padded[:-1])
+    return edges[1::2] - edges[::2]
+
+
+def _gap_mask(index: pd.DatetimeIndex, interval: str) -> np.ndarray:
+    stamps = index.as_unit("ns").asi8
+    if len(stamps) < 2:
+        return np.zeros(0, dtype=bool)
+    days = index.values.astype("datetime64[D]")
+    if interval == "1d":
+        return np.busday_count(days[:-1], days[1:]) > MAX_MISSING_DAYS + 1
+    if is_intraday(interval):
+        # Overnight and weekend breaks are not gaps
+        bar_ns = bar_minutes(interval) * 60 * 10**9
+        return (days[1:] == days[:-1]) & (np.diff(stamps) > (MAX_MISSING_BARS + 1) * bar_ns)
+    nominal_days = {"1wk": 7, "1mo": 31, "3mo": 92, "5d": 7}.get(interval, 7)
+    return np.diff(stamps) > 2 * nominal_days * 86400 * 10**9
+
+
+def clean_history(df: pd.DataFrame, interval: str = "1d"):
+    """
+    Validate and clean a ``price`` history.
+
+    Returns
+    -------
+    tuple
+        (cleaned frame, quality report dict). The report counts every
+        fix and flag, lists them as readable ``issues`` and gives an
+        overall ``status``: "ok", "warning" or "error" (unusable).
+    """
+    report = {
+        "rows_in": int(len(df)),
+        "duplicates": 0,
+        "missing": 0,
+        "non_positive": 0,
+        "spikes": 0,
+        "splits": 0,
+        "gaps": 0,
+        "largest_gap": None,
+        "stale_bars": 0,
+    }
+
+    index = df.index
+    prices = df["price"].to_numpy(dtype=np.float64)
+
+    if not index.is_monotonic_increasing:
+        order = np.argsort(index.asi8, kind="stable")
+        index, prices = index[order], prices[order]
+    dup = index.duplicated(keep="last")
+    report["duplicates"] = int(dup.sum())
+
+    missing = np.isnan(prices)
+    non_positive = ~missing & (prices <= 0)
+    report["missing"] = int(missing.sum())
+    report["non_positive"] = int(non_positive.sum())
+
+    keep = ~(dup | missing | non_positive)
+    if not keep.all():
+        index, prices = index[keep], prices[keep]
+    else:
+        prices = prices.copy()
+
+    if len(prices) > 2:
+        log_rets = np.diff(np.log(prices))
+        big = np.abs(log_rets) > JUMP_LOG_RETURN
+
+        # Spikes: a jump immediately undone by the next bar
+        nxt = np.append(log_rets[1:], 0.0)
+        spike = big & (np.abs(log_rets + nxt) < SPIKE_REVERSION * np.abs(log_rets))
+        spike_bars = np.flatnonzero(spike) + 1
+        report["spikes"] = int(len(spike_bars))
+        if len(spike_bars):
+            prices[spike_bars] = prices[spike_bars - 1]
+            log_rets = np.diff(np.log(prices))
+            big = np.abs(log_rets) > JUMP_LOG_RETURN
+
+        # Split candidates: a lasting jump by a split ratio (flagged only)
+        report["splits"] = int((_split_factors(log_rets[big]) != 1).sum())
+
+    gaps = _gap_mask(index, interval)
+    report["gaps"] = int(gaps.sum())
+    if report["gaps"]:
+        widest = int(np.argmax(np.where(gaps, np.diff(index.as_unit("ns").asi8), 0)))
+        report["largest_gap"] = f"{index[widest]} → {index[widest + 1]}"
+
+    stale_min = STALE_RUN_BARS["intraday" if is_intraday(interval) else "daily"]
+    runs = _run_lengths(prices[1:] == prices[:-1]) + 1 if len(prices) > 1 else np.zeros(0)
+    report["stale_bars"] = int(runs[runs >= stale_min].sum())
+
+    report["rows"] = int(len(prices))
+    report["issues"] = _describe(report)
+    if report["rows"] < 2:
+        report["status"] = "error"
+    else:
+        report["status"] = "warning" if report["issues"] else "ok"
+
+    cleaned = pd.DataFrame({"price": prices}, index=index.rename(df.index.name))
+    return cleaned, report
+
+
+def _describe(report) -> list:
+    labels = [
+        ("duplicates", "duplicated timestamps dropped"),
+        ("missing", "missing prices dropped"),
+        ("non_positive", "zero or negative prices dropped"),
+        ("spikes", "one-bar spikes replaced"),
+        ("splits", "jumps matching a split ratio (not adjusted)"),
+        ("gaps", "gaps in the bar sequence"),
+        ("stale_bars", "bars in stale runs (unchanged price)"),
+    ]
+    return [f"{report[k]} {text}" for k, text in labels if report[k]]
+
+
+def quality_table(reports: dict) -> pd.DataFrame:
+    """One row per ticker: status, row count and the count of each issue."""
+    rows = []
+    for ticker, report in reports.items():
+        if report is None:
+            continue
+        rows.append({
+            "ticker": ticker,
+            "status": report["status"],
+            "rows": report["rows"],
+            "duplicates": report["duplicates"],
+            "dropped": report["missing"] + report["non_positive"],
+            "spikes": report["spikes"],
+            "splits": report["splits"],
+            "gaps": report["gaps"],
+            "stale_bars": report["stale_bars"],
+        })
+    return pd.DataFrame(rows)
@@ -0,0 +1,271 @@
+import threading
+import time
+
+import pandas as pd
+
+from src.data.fetch_yf import HISTORY_CACHE, PROVIDER_CALLS, cached_history_keys, data_backend
+from src.data.intervals import bar_freq, is_intraday
+from src.data.rolling import RollingWindow
+from src.monitoring.tracing import traced
+
+# Refresh period of the live quote widgets on the pages (seconds)
+LIVE_REFRESH_SECONDS = 60
+
+# Rolling windows of the cached intraday histories, by cache key:
+# key -> (window, frame last stored in HISTORY_CACHE, time of last ingestion)
+_WINDOWS = {}
+_WINDOWS_LOCK = threading.Lock()
+
+
+def _bar_freq(interval):
+    # pandas frequency used to find the bar a quote belongs to
+    if is_intraday(interval):
+        return bar_freq(interval)
+    return "1D" if interval == "1d" else None
+
+
+def _to_naive(index: pd.DatetimeIndex) -> pd.DatetimeIndex:
+    # History indexes are naive exchange-local timestamps
+    return index.tz_localize(None) if index.tz is not None else index
+
+
+@traced("data.fetch_latest_quotes")
+def fetch_latest_quotes(tickers) -> dict:
+    """
+    Fetch the latest 1-minute bar for several tickers in a single request.
+
+    Returns
+    -------
+    dict
+        ticker -> (timestamp, price) for every ticker with a quote.
+    """
+    tickers = list(tickers)
+    if not tickers:
+        return {}
+
+    PROVIDER_CALLS["quotes"] += 1
+    if data_backend() == "synthetic":
+        from src.data.synthetic import synthetic_quote
+        return {t: synthetic_quote(t) for t in tickers}
+
+    # yfinance is slow to import: load it only when we actually download
+    import yfinance as yf
+
+    data = yf.download(tickers, period="1d", interval="1m", progress=False)
+    if data is None or data.empty:
+        return {}
+
+    close = data["Close"]
+    if isinstance(close, pd.Series):
+        close = close.to_frame(name=tickers[0])
+
+    quotes = {}
+    for t in tickers:
+        if t not in close:
+            continue
+        s = close[t].dropna()
+        if s.empty:
+            continue
+        # Same rule as the history quality checks: no zero / negative prints
+        price = float(s.iloc[-1])
+        if price <= 0:
+            continue
+        ts = s.index[-1]
+        if ts.tzinfo is not None:
+            # History indexes are naive exchange-local timestamps
+            ts = ts.tz_localize(None)
+        quotes[t] = (ts, price)
+    return quotes
+
+
+@traced("data.fetch_recent_bars")
+def fetch_recent_bars(tickers, interval: str, period="1d") -> dict:
+    """
+    Fetch the latest ``interval`` bars of several tickers in a single request.
+
+    Returns
+    -------
+    dict
+        ticker -> close price Series (naive timestamps) for every ticker with bars.
+    """
+    tickers = list(tickers)
+    if not tickers:
+        return {}
+
+    PROVIDER_CALLS["bars"] += 1
+    if data_backend() == "synthetic":
+        from src.data.synthetic import synthetic_history
+        return {t: synthetic_history(t, period=period, interval=interval)["price"] for t in tickers}
+
+    # yfinance is slow to import: load it only when we actually download
+    import yfinance as yf
+
+    data = yf.download(tickers, period=period, interval=interval, progress=False)
+    if data is None or data.empty:
+        return {}
+
+    close = data["Close"]
+    if isinstance(close, pd.Series):
+        close = close.to_frame(name=tickers[0])
+    close.index = _to_naive(pd.DatetimeIndex(close.index))
+
+    return {t: close[t].dropna() for t in tickers if t in close and close[t].notna().any()}
+
+
+def patch_history(df: pd.DataFrame, ts, price: float, interval="1d") -> pd.DataFrame:
+    """
+    Apply a live quote to a price history.
+
+    If the quote falls in the last bar, that bar is updated in place;
+    if it starts a new bar, a row is appended (and a new frame returned).
+    Quotes older than the last bar are ignored.
+    """
+    if df is None or df.empty:
+        return df
+
+    last_ts = df.index[-1]
+    freq = _bar_freq(interval)
+    bar_ts = ts.floor(freq) if freq is not None else last_ts
+
+    if bar_ts < last_ts:
+        return df
+    if bar_ts == last_ts or freq is None:
+        df.iloc[-1, df.columns.get_loc("price")] = price
+        return df
+
+    new_row = pd.DataFrame({"price": [price]}, index=pd.DatetimeIndex([bar_ts], name=df.index.name))
+    return pd.concat([df, new_row])
+
+
+def _window_for(key, df):
+    """Rolling window of a cached intraday history, seeded from ``df`` when needed."""
+    entry = _WINDOWS.get(key)
+    if entry is None or entry[1] is not df:
+        # First ingestion, or the cached history was reloaded since
+        entry = (RollingWindow.from_frame(df), df, 0.0)
+        _WINDOWS[key] = entry
+    return entry[0]
+
+
+def ingest_bars(key, timestamps, prices, full_refresh=False) -> pd.DataFrame | None:
+    """
+    Ingest new bars into the cached intraday history ``key``.
+
+    The history is kept as a bounded rolling window (its length when it
+    was loaded): new bars push out the oldest ones, so memory stays
+    constant during a trading session. ``full_refresh`` marks the history
+    as up to date (all recent bars ingested, not just a quote). Returns
+    the updated history.
+    """
+    with _WINDOWS_LOCK:
+        df = HISTORY_CACHE.get(key)
+        if df is None or df.empty:
+            _WINDOWS.pop(key, None)
+            return None
+        window = _window_for(key, df)
+        window.extend(timestamps, prices)
+        updated = window.frame()
+        HISTORY_CACHE.set(key, updated)
+        refreshed_at = time.time() if full_refresh else _WINDOWS[key][2]
+        _WINDOWS[key] = (window, updated, refreshed_at)
+        return updated
+
+
+def _prune_windows():
+    # Drop the windows of histories evicted from the cache
+    live = set(HISTORY_CACHE.keys())
+    with _WINDOWS_LOCK:
+        for key in [k for k in _WINDOWS if k not in live]:
+            del _WINDOWS[key]
+
+
+@traced("data.refresh_intraday")
+def refresh_intraday(tickers, interval: str, max_age: float = LIVE_REFRESH_SECONDS) -> int:
+    """
+    Append the latest ``interval`` bars to the cached histories of ``tickers``.
+
+    Histories ingested (or loaded) less than ``max_age`` seconds ago are
+    skipped; the others are updated from one batched request covering
+    the current session (or the last days, after a night without
+    updates). Returns the number of histories updated.
+    """
+    if not is_intraday(interval):
+        return 0
+    _prune_windows()
+
+    now = time.time()
+    keys = {}
+    for t in tickers:
+        for key in cached_history_keys(t):
+            if key[2] != interval:
+                continue
+            df = HISTORY_CACHE.get(key)
+            if df is None or df.empty:
+                continue
+            with _WINDOWS_LOCK:
+                entry = _WINDOWS.get(key)
+                if entry is None or entry[1] is not df:
+                    # Just loaded: the history is current as of now
+                    _WINDOWS[key] = (RollingWindow.from_frame(df), df, now)
+                    continue
+            if now - entry[2] < max_age:
+                continue
+            keys.setdefault(t, []).append(key)
+    if not keys:
+        return 0
+
+    # Today's bars suffice when every history already reaches today
+    today = pd.Timestamp.now().normalize()
+    frames = [HISTORY_CACHE.get(k) for ks in keys.values() for k in ks]
+    oldest = min((df.index[-1] for df in frames if df is not None and len(df)), default=None)
+    period = "1d" if oldest is not None and oldest >= today else "5d"
+
+    bars = fetch_recent_bars(list(keys), interval, period=period)
+    updated = 0
+    for t, ks in keys.items():
+        series = bars.get(t)
+        if series is None or series.empty:
+            continue
+        for key in ks:
+            if ingest_bars(key, series.index, series.to_numpy(), full_refresh=True) is not None:
+                updated += 1
+    return updated
+
+
+@traced("data.refresh_quotes")
+def refresh_quotes(tickers) -> pd.DataFrame:
+    """
+    Update the cached histories of ``tickers`` with their latest quotes.
+
+    Only the last bar of each history is touched: no full history is
+    downloaded. Returns one row per ticker with the latest price and the
+    change (%) against the previous bar of its cached history.
+    """
+    quotes = fetch_latest_quotes(tickers)
+
+    rows = {}
+    for t, (ts, price) in quotes.items():
+        prev_price = None
+        for key in cached_history_keys(t):
+            df = HISTORY_CACHE.get(key)
+            if df is None:
+                continue
+            if is_intraday(key[2]):
+                # Bounded window: a new bar pushes out the oldest one
+                patched = ingest_bars(key, [ts.floor(bar_freq(key[2]))], [price])
+            else:
+                patched = patch_history(df, ts, price, interval=key[2])
+                if patched is not df:
+                    HISTORY_CACHE.set(key, patched)
+            if patched is None:
+                continue
+            if prev_price is None and len(patched) > 1:
+                prev_price = float(patched["price"].iloc[-2])
+
+        if prev_price:
+            pct_change = (price - prev_price) / prev_price * 100
+        else:
+            pct_change = 0.0
+        rows[t] = {"timestamp": ts, "price": price, "pct_change": pct_change}
+
+    return pd.DataFrame.from_dict(rows, orient="index")
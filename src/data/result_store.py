@@ -0,0 +1,397 @@
+"""
+Persistent, content-addressed store of analytics results.
+
+Backtests, strategy runs, portfolio returns and statistics and correlation
+matrices are pure functions of their inputs, so their results can be
+reused across reruns, sessions, worker processes and restarts. ``memoized`` keys each
+call on a fingerprint of its arguments (arrays hashed on their raw bytes,
+see ``cache.fingerprint``), the function's qualified name and the code
+version (a hash of the ``src`` sources and of the numpy / pandas
+versions), so a result is never served across a code change.
+
+Results are pickled into a SQLite file (WAL journal: readers never block,
+writers from several processes are serialized by the database lock) with
+a byte budget: the least recently accessed entries are evicted in the
+transaction that inserts a new one. A small in-process tier in front of
+the file holds the pickled bytes of the hottest entries, so repeated
+queries in one process cost a dictionary lookup and an unpickle; every
+hit returns a fresh copy, so callers may mutate what they get.
+
+Any database error falls back to computing the result: the store is a
+cache, never a dependency. It is off by default, so library callers (API,
+scripts) write nothing to disk unless asked to: enable it with
+``result_store: enabled: true`` in config.yaml or ``PGLFF_RESULT_STORE=1``
+(``PGLFF_RESULT_STORE=0`` overrides the config, as the benchmarks do).
+
+Functions that report job progress (``run_portfolio``) are not memoized:
+a hit would skip the progress reports. Pages that already cache a result
+in process (``DERIVED_CACHE``) call ``fn.uncached``, so that every entry
+point goes through one cache layer.
+"""
+import functools
+import hashlib
+import inspect
+import logging
+import os
+import pickle
+import threading
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from src.data.cache import CACHE_REGISTRY, CONFIG_PATH, LRUCache, fingerprint, load_cache_settings, read_config
+
+logger = logging.getLogger(__name__)
+
+ROOT = CONFIG_PATH.parent
+
+# Results larger than this share of the budget are not stored
+_MAX_ENTRY_SHARE = 0.25
+# A hit refreshes the access time of its entry at most once per second
+_TOUCH_INTERVAL = 1.0
+# Entries listed by ``keys`` / ``entries`` (most recently accessed first)
+_LISTED_ENTRIES = 1000
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS entries (
+    key TEXT PRIMARY KEY,
+    function TEXT NOT NULL,
+    value BLOB NOT NULL,
+    size INTEGER NOT NULL,
+    created REAL NOT NULL,
+    accessed REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS entries_accessed ON entries (accessed);
+"""
+
+
+def load_result_store_settings() -> dict:
+    """
+    Read the ``result_store`` section of config.yaml.
+
+    result_store:
+      enabled: false              # PGLFF_RESULT_STORE=1 / 0 overrides
+      path: data/results.sqlite   # relative to the project root
+      max_mb: 512                 # on disk, least recently used evicted first
+      memory_mb: 64               # in-process tier in front of the file
+    """
+    cfg = read_config().get("result_store", {}) or {}
+    enabled = bool(cfg.get("enabled", False))
+    env = os.environ.get("PGLFF_RESULT_STORE", "").lower()
+    if env in ("1", "true", "yes", "on"):
+        enabled = True
+    elif env in ("0", "false", "no", "off"):
+        enabled = False
+    path = Path(cfg.get("path", "data/results.sqlite"))
+    return {
+        "enabled": enabled,
+        "path": path if path.is_absolute() else ROOT / path,
+        "max_mb": float(cfg.get("max_mb", 512)),
+        "memory_mb": float(cfg.get("memory_mb", 64)),
+    }
+
+
+@functools.lru_cache(maxsize=1)
+def code_version() -> str:
+    """Hash of the ``src`` sources and of the numpy / pandas versions."""
+    h = hashlib.blake2b(digest_size=16)
+    h.update(f"numpy {np.__version__} pandas {pd.__version__}".encode())
+    src = ROOT / "src"
+    for path in sorted(src.rglob("*.py")):
+        h.update(str(path.relative_to(src)).encode())
+        h.update(path.read_bytes())
+    return h.hexdigest()
+
+
+class ResultStore:
+    """
+    SQLite-backed result store with a byte budget and LRU eviction.
+
+    Exposes the interface of ``LRUCache`` (get, set, invalidate, stats,
+    entries...) and registers in ``CACHE_REGISTRY``, so the Settings page
+    shows and tunes it like the in-process caches. Hit / miss counts are
+    per process; sizes and entries are those of the shared file.
+    """
+
+    def __init__(self, name, path, max_bytes, memory_bytes=64 * 1024 * 1024):
+        self.name = name
+        self.path = Path(path)
+        self.max_bytes = max_bytes
+        # Limit set on the Settings page (``cache`` section, as for LRUCache)
+        settings = load_cache_settings().get(name, {})
+        if "max_mb" in settings:
+            self.max_bytes = int(settings["max_mb"] * 1024 * 1024)
+        # Not a TTL cache: entries are invalidated by the code version
+        self.ttl = None
+        self.memory = LRUCache(f"{name}_memory", max_bytes=memory_bytes)
+        self.enabled = True
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        CACHE_REGISTRY[name] = self
+
+    def _connection(self):
+        # One connection per thread and process: sqlite3 connections must
+        # not be shared across threads, nor inherited across a fork
+        conn = getattr(self._local, "conn", None)
+        if conn is not None and self._local.pid == os.getpid():
+            return conn
+        import sqlite3
+
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        conn = sqlite3.connect(self.path, timeout=30.0, isolation_level=None)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.executescript(_SCHEMA)
+        self._local.conn, self._local.pid = conn, os.getpid()
+        return conn
+
+    def _run(self, operation, default=None):
+        """Run ``operation(connection)``; on a database error, log and return ``default``."""
+        if not self.enabled:
+            return default
+        import sqlite3
+
+        try:
+            return operation(self._connection())
+        except sqlite3.DatabaseError as e:
+            if not isinstance(e, sqlite3.OperationalError):
+                # Corrupt or foreign file: stop using it in this process
+                self.enabled = False
+                logger.warning("Result store %s disabled: %s", self.path, e)
+            else:
+                logger.warning("Result store %s unavailable: %s", self.path, e)
+            return default
+        except OSError as e:
+            self.enabled = False
+            logger.warning("Result store %s disabled: %s", self.path, e)
+            return default
+
+    def _count(self, hit):
+        with self._lock:
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+
+    def get_bytes(self, key):
+        """Pickled value of ``key``, or None."""
+        blob = self.memory.get(key)
+        if blob is None:
+            def read(conn):
+                row = conn.execute("SELECT value, accessed FROM entries WHERE key = ?", (key,)).fetchone()
+                if row is None:
+                    return None
+                now = time.time()
+                if now - row[1] > _TOUCH_INTERVAL:
+                    conn.execute("UPDATE entries SET accessed = ? WHERE key = ?", (now, key))
+                return row[0]
+
+            blob = self._run(read)
+            if blob is not None:
+                blob = bytes(blob)
+                self.memory.set(key, blob, size=len(blob))
+        self._count(blob is not None)
+        return blob
+
+    def get(self, key, default=None):
+        blob = self.get_bytes(key)
+        return default if blob is None else pickle.loads(blob)
+
+    def set_bytes(self, key, blob, function=""):
+        """Store the pickled value ``blob`` of ``key``, evicting old entries past the budget."""
+        size = len(blob)
+        if size > self.max_bytes * _MAX_ENTRY_SHARE:
+            return
+        self.memory.set(key, blob, size=size)
+
+        def write(conn):
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                # Stamped once the lock is held: no later entry is older
+                now = time.time()
+                conn.execute(
+                    "INSERT OR REPLACE INTO entries VALUES (?, ?, ?, ?, ?, ?)",
+                    (key, function, blob, size, now, now),
+                )
+                evicted = self._evict(conn, keep=key)
+                conn.execute("COMMIT")
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+            with self._lock:
+                self.evictions += evicted
+
+        self._run(write)
+
+    def set(self, key, value, size=None, function=""):
+        self.set_bytes(key, pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL), function)
+
+    def _evict(self, conn, keep=None):
+        # Inside the writer's transaction: the total cannot change under it
+        total = conn.execute("SELECT COALESCE(SUM(size), 0) FROM entries").fetchone()[0]
+        if total <= self.max_bytes:
+            return 0
+        evicted = 0
+        for key, size in conn.execute("SELECT key, size FROM entries ORDER BY accessed").fetchall():
+            if total <= self.max_bytes:
+                break
+            if key == keep:
+                continue
+            conn.execute("DELETE FROM entries WHERE key = ?", (key,))
+            self.memory.invalidate(key)
+            total -= size
+            evicted += 1
+        return evicted
+
+    def get_or_compute(self, key, compute, function=""):
+        """Return the stored value for ``key`` or compute and store it."""
+        blob = self.get_bytes(key)
+        if blob is not None:
+            return pickle.loads(blob)
+        value = compute()
+        try:
+            blob = pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+        except (pickle.PicklingError, TypeError, AttributeError) as e:
+            logger.warning("Result of %s not stored: %s", function or key, e)
+            return value
+        self.set_bytes(key, blob, function)
+        # The caller gets its own copy, as on a hit
+        return pickle.loads(blob)
+
+    def invalidate(self, key=None):
+        """Drop one key, or everything when ``key`` is None."""
+        self.memory.invalidate(key)
+
+        def delete(conn):
+            if key is None:
+                conn.execute("DELETE FROM entries")
+            else:
+                conn.execute("DELETE FROM entries WHERE key = ?", (key,))
+
+        self._run(delete)
+
+    def keys(self):
+        rows = self._run(
+            lambda conn: conn.execute(
+                "SELECT key FROM entries ORDER BY accessed DESC LIMIT ?", (_LISTED_ENTRIES,)
+            ).fetchall(),
+            [],
+        )
+        return [key for (key,) in rows]
+
+    def configure(self, max_bytes=None, ttl=None):
+        """Change the byte budget (``ttl`` is ignored: entries do not expire)."""
+        if max_bytes is None:
+            return
+        self.max_bytes = max_bytes
+
+        def shrink(conn):
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                evicted = self._evict(conn)
+                conn.execute("COMMIT")
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+            with self._lock:
+                self.evictions += evicted
+
+        self._run(shrink)
+
+    def _totals(self):
+        return self._run(
+            lambda conn: conn.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM entries").fetchone(),
+            (0, 0),
+        )
+
+    def stats(self) -> dict:
+        count, total = self._totals()
+        lookups = self.hits + self.misses
+        return {
+            "cache": self.name,
+            "entries": count,
+            "size_mb": total / 1024 / 1024,
+            "max_mb": self.max_bytes / 1024 / 1024,
+            "ttl_s": None,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate (%)": 100.0 * self.hits / lookups if lookups else 0.0,
+            "evictions": self.evictions,
+        }
+
+    def entries(self) -> list:
+        """Describe the most recently accessed entries: key, function, size and age (seconds)."""
+        now = time.time()
+        rows = self._run(
+            lambda conn: conn.execute(
+                "SELECT key, function, size, created FROM entries ORDER BY accessed DESC LIMIT ?",
+                (_LISTED_ENTRIES,),
+            ).fetchall(),
+            [],
+        )
+        return [
+            {"key": key, "function": function, "size_kb": size / 1024, "age_s": now - created}
+            for key, function, size, created in rows
+        ]
+
+    def __contains__(self, key):
+        if key in self.memory:
+            return True
+        row = self._run(lambda conn: conn.execute("SELECT 1 FROM entries WHERE key = ?", (key,)).fetchone())
+        return row is not None
+
+    def __len__(self):
+        return self._totals()[0]
+
+
+_STORE = None
+_STORE_LOCK = threading.Lock()
+
+
+def get_result_store():
+    """The process-wide store (None when disabled), created on first use."""
+    global _STORE
+    if _STORE is None:
+        with _STORE_LOCK:
+            if _STORE is None:
+                settings = load_result_store_settings()
+                if not settings["enabled"]:
+                    return None
+                _STORE = ResultStore(
+                    "result_store",
+                    settings["path"],
+                    int(settings["max_mb"] * 1024 * 1024),
+                    int(settings["memory_mb"] * 1024 * 1024),
+                )
+    return _STORE if _STORE.enabled else None
+
+
+def memoized(fn):
+    """
+    Serve the results of ``fn`` from the result store.
+
+    ``fn`` must be a pure function of its arguments. Calls are keyed on
+    the bound arguments with their defaults applied, so ``f(df)`` and
+    ``f(df, period=20)`` share an entry. The undecorated function stays
+    available as ``fn.uncached``.
+    """
+    signature = inspect.signature(fn)
+    name = f"{fn.__module__}.{fn.__qualname__}"
+
+    @functools.wraps(fn)
+    def wrapper(*args, **kwargs):
+        store = get_result_store()
+        if store is None:
+            return fn(*args, **kwargs)
+        bound = signature.bind(*args, **kwargs)
+        bound.apply_defaults()
+        key = fingerprint(name, code_version(), bound.arguments)
+        return store.get_or_compute(key, lambda: fn(*args, **kwargs), function=name)
+
+    wrapper.uncached = fn
+    return wrapper
@@ -0,0 +1,142 @@
+import math
+from collections import deque
+
+import numpy as np
+import pandas as pd
+
+
+class RollingWindow:
+    """
+    Fixed-capacity window over the latest bars of one price history.
+
+    New bars are written into preallocated arrays, so ingesting a bar is
+    O(1) and the memory of the window never grows: once full, each new
+    bar replaces the oldest one. Every value is stored twice (at ``i`` and
+    ``i + capacity``), so the bars in time order are always one contiguous
+    slice of the buffers, without any reordering.
+    """
+
+    def __init__(self, capacity: int, index_name="Date"):
+        if capacity < 1:
+            raise ValueError("capacity must be at least 1")
+        self.capacity = capacity
+        self.index_name = index_name
+        self._ts = np.zeros(2 * capacity, dtype=np.int64)
+        self._price = np.zeros(2 * capacity, dtype=np.float64)
+        self._head = 0  # next write position
+        self._size = 0
+
+    @classmethod
+    def from_frame(cls, df: pd.DataFrame, capacity: int | None = None) -> "RollingWindow":
+        """Seed a window with the ``price`` column of a history (capacity: its length)."""
+        window = cls(capacity or max(len(df), 1), index_name=df.index.name)
+        window.extend(df.index, df["price"].to_numpy())
+        return window
+
+    def __len__(self):
+        return self._size
+
+    @property
+    def last_timestamp(self):
+        if self._size == 0:
+            return None
+        return pd.Timestamp(self._ts[self._head - 1 + self.capacity])
+
+    def _write(self, positions, ts, prices):
+        self._ts[positions] = ts
+        self._ts[positions + self.capacity] = ts
+        self._price[positions] = prices
+        self._price[positions + self.capacity] = prices
+
+    def extend(self, timestamps, prices) -> int:
+        """
+        Ingest bars in time order.
+
+        A bar with the timestamp of the last bar updates it in place; bars
+        older than the last one are ignored. Returns the number of new bars.
+        """
+        ts = pd.DatetimeIndex(timestamps).as_unit("ns").asi8
+        prices = np.asarray(prices, dtype=np.float64)
+
+        if self._size:
+            last = self._ts[self._head - 1 + self.capacity]
+            keep = ts >= last
+            ts, prices = ts[keep], prices[keep]
+            if len(ts) and ts[0] == last:
+                self._write(np.array([(self._head - 1) % self.capacity]), ts[:1], prices[:1])
+                ts, prices = ts[1:], prices[1:]
+
+        n = len(ts)
+        if n == 0:
+            return 0
+        if n > self.capacity:
+            ts, prices = ts[-self.capacity:], prices[-self.capacity:]
+        positions = (self._head + np.arange(len(ts))) % self.capacity
+        self._write(positions, ts, prices)
+        self._head = (self._head + len(ts)) % self.capacity
+        self._size = min(self._size + n, self.capacity)
+        return n
+
+    def frame(self) -> pd.DataFrame:
+        """The bars of the window as a ``price`` frame (a copy: later bars do not alter it)."""
+        end = self._head + self.capacity
+        start = end - self._size
+        index = pd.DatetimeIndex(self._ts[start:end].view("datetime64[ns]"), name=self.index_name)
+        return pd.DataFrame({"price": self._price[start:end].copy()}, index=index.copy())
+
+
+class RollingMean:
+    """
+    Moving average of the last ``period`` values of a stream.
+
+    ``update(value)`` is O(1): the window sum is updated with the same
+    compensated (Kahan) additions and removals as pandas' rolling mean,
+    so the averages match ``Series.rolling(period).mean()``. Returns NaN
+    until ``period`` values have been seen. Values must not be NaN.
+    """
+
+    __slots__ = ("period", "window", "total", "comp_add", "comp_remove", "negatives", "same", "last")
+
+    def __init__(self, period: int):
+        if period < 1:
+            raise ValueError("period must be at least 1")
+        self.period = period
+        self.window = deque()
+        self.total = 0.0
+        # Separate compensations of the additions and removals (as pandas)
+        self.comp_add = 0.0
+        self.comp_remove = 0.0
+        self.negatives = 0
+        self.same = 0
+        self.last = math.nan
+
+    def update(self, value: float) -> float:
+        window = self.window
+        if len(window) == self.period:
+            old = window.popleft()
+            y = -old - self.comp_remove
+            t = self.total + y
+            self.comp_remove = t - self.total - y
+            self.total = t
+            if math.copysign(1.0, old) < 0:
+                self.negatives -= 1
+        window.append(value)
+        y = value - self.comp_add
+        t = self.total + y
+        self.comp_add = t - self.total - y
+        self.total = t
+        if math.copysign(1.0, value) < 0:
+            self.negatives += 1
+        self.same = self.same + 1 if value == self.last else 1
+        self.last = value
+
+        n = len(window)
+        if n < self.period:
+            return math.nan
+        if self.same >= n:
+            return value
+        mean = self.total / n
+        # No sign flip from rounding
+        if self.negatives == 0 and mean < 0 or self.negatives == n and mean > 0:
+            return 0.0
+        return mean
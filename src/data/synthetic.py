@@ -0,0 +1,148 @@
+import functools
+import time
+import zlib
+
+import numpy as np
+import pandas as pd
+
+from src.data import intervals
+from src.data.intervals import bar_minutes, bars_per_session
+
+# Opening time of the regular sessions used for synthetic intraday bars
+SESSION_START = "09:30"
+
+
+def trading_index(n_periods: int, interval="1d", start="2000-01-03") -> pd.DatetimeIndex:
+    """
+    Build a timestamp index of ``n_periods`` bars.
+
+    Daily / weekly / monthly intervals use business days / weeks / month
+    starts; minute intervals ("1m", "5m", ...) lay bars out over regular
+    09:30-16:00 sessions. Every ticker of a synthetic universe shares its
+    calendar, so indexes are built once per (length, interval, start).
+    """
+    return _trading_index(int(n_periods), interval, pd.Timestamp(start)).copy()
+
+
+@functools.lru_cache(maxsize=64)
+def _trading_index(n_periods, interval, start):
+    if interval == "1d":
+        return pd.bdate_range(start, periods=n_periods, name="Date")
+    if interval == "1wk":
+        return pd.date_range(start, periods=n_periods, freq="W-FRI", name="Date")
+    if interval == "1mo":
+        return pd.date_range(start, periods=n_periods, freq="MS", name="Date")
+    if intervals.is_intraday(interval):
+        step = bar_minutes(interval)
+        bars_per_day = bars_per_session(interval)
+        n_days = -(-n_periods // bars_per_day)
+        days = pd.bdate_range(start, periods=n_days)
+        offsets = pd.to_timedelta(np.arange(bars_per_day) * step, unit="min")
+        session_open = pd.Timedelta(f"{SESSION_START}:00")
+        stamps = (days.values[:, None] + (session_open + offsets).values[None, :]).ravel()
+        return pd.DatetimeIndex(stamps[:n_periods], name="Date")
+    raise ValueError(f"Unsupported interval: {interval}")
+
+
+def synthetic_prices(
+    n_assets: int = 1,
+    n_periods: int = 252,
+    interval="1d",
+    seed: int = 0,
+    start="2000-01-03",
+    annual_return: float = 0.07,
+    annual_vol: float = 0.20,
+    periods_per_year: int | None = None,
+) -> pd.DataFrame:
+    """
+    Seeded geometric Brownian motion prices, one column per asset.
+
+    Assets share a common market factor (correlation ~0.3), so the
+    correlation and portfolio code paths see realistic inputs. The same
+    arguments always give the same frame.
+    """
+    if periods_per_year is None:
+        periods_per_year = intervals.periods_per_year(interval)
+
+    rng = np.random.default_rng(seed)
+    dt = 1.0 / periods_per_year
+    vol = annual_vol * np.sqrt(dt)
+
+    market = rng.standard_normal((n_periods, 1))
+    idio = rng.standard_normal((n_periods, n_assets))
+    shocks = np.sqrt(0.3) * market + np.sqrt(0.7) * idio
+
+    log_rets = (annual_return - 0.5 * annual_vol ** 2) * dt + vol * shocks
+    prices = 100.0 * np.exp(np.cumsum(log_rets, axis=0))
+
+    columns = [f"SYN{i:04d}" for i in range(n_assets)]
+    return pd.DataFrame(prices, index=trading_index(n_periods, interval, start), columns=columns)
+
+
+# yfinance period -> number of trading days
+PERIOD_DAYS = {
+    "1d": 1,
+    "5d": 5,
+    "1mo": 21,
+    "3mo": 63,
+    "6mo": 126,
+    "1y": 252,
+    "2y": 2 * 252,
+    "5y": 5 * 252,
+    "10y": 10 * 252,
+    "max": 20 * 252,
+}
+
+
+def _ticker_seed(asset: str) -> int:
+    # crc32 is stable across processes (unlike hash())
+    return zlib.crc32(asset.encode())
+
+
+def _daily_path(asset: str) -> pd.Series:
+    # The longest daily history; shorter periods are its last bars
+    n_days = PERIOD_DAYS["max"]
+    start = pd.Timestamp.today().normalize() - pd.offsets.BDay(n_days)
+    prices = synthetic_prices(n_assets=1, n_periods=n_days, seed=_ticker_seed(asset), start=start)
+    return prices.iloc[:, 0]
+
+
+def synthetic_history(asset: str, period="1y", interval="1d") -> pd.DataFrame:
+    """
+    Offline stand-in for a provider download, shaped like ``get_history``.
+
+    Each ticker gets its own seeded path, ending on the last business day,
+    so repeated calls return the same data. Periods and intervals of a
+    ticker agree with each other: all end on the same last close.
+    """
+    if period == "ytd":
+        today = pd.Timestamp.today().normalize()
+        n_days = max(len(pd.bdate_range(today.replace(month=1, day=1), today)), 1)
+    else:
+        n_days = PERIOD_DAYS.get(period, 252)
+
+    daily = _daily_path(asset)
+    if interval in ("1d", "1wk", "1mo"):
+        step = {"1d": 1, "1wk": 5, "1mo": 21}[interval]
+        # Every step-th close, counted back from the last one
+        prices = daily.iloc[-n_days:].iloc[::-step].iloc[::-1]
+    else:
+        n_periods = n_days * bars_per_session(interval)
+        start = pd.Timestamp.today().normalize() - pd.offsets.BDay(n_days)
+        intraday = synthetic_prices(
+            n_assets=1,
+            n_periods=n_periods,
+            interval=interval,
+            seed=_ticker_seed(asset) + 1,
+            start=start,
+        ).iloc[:, 0]
+        prices = intraday * (daily.iloc[-1] / intraday.iloc[-1])
+
+    return prices.to_frame("price")
+
+
+def synthetic_quote(asset: str):
+    """Latest (timestamp, price) for ``asset``: a small move from its last close."""
+    last = _daily_path(asset).iloc[-1]
+    rng = np.random.default_rng([_ticker_seed(asset), int(time.time()) // 60])
+    return pd.Timestamp.now().floor("min"), float(last * (1 + rng.normal(0, 0.002)))
@@ -1,12 +1,16 @@
 import pandas as pd
 from .metrics import total_return, annualized_volatility, sharpe_ratio, max_drawdown
+from src.data.result_store import memoized
+from src.monitoring.tracing import traced
 
 
-def backtest(strategy_value: pd.Series) -> dict:
+@traced("evaluation.backtest")
+@memoized
+def backtest(strategy_value: pd.Series, periods_per_year: float = 252) -> dict:
     return {
         "total_return": float(total_return(strategy_value)),
-        "annual_vol": float(annualized_volatility(strategy_value)),
-        "sharpe": float(sharpe_ratio(strategy_value)),
+        "annual_vol": float(annualized_volatility(strategy_value, freq=periods_per_year)),
+        "sharpe": float(sharpe_ratio(strategy_value, freq=periods_per_year)),
         "max_drawdown": float(max_drawdown(strategy_value)),
         "final_value": float(strategy_value.iloc[-1]),
     }
@@ -10,12 +10,12 @@ def total_return(series: pd.Series) -> float:
     return series.iloc[-1] / series.iloc[0] - 1
 
 
-def annualized_volatility(series: pd.Series, freq: int = 252) -> float:
+def annualized_volatility(series: pd.Series, freq: float = 252) -> float:
     rets = daily_returns(series)
     return rets.std() * np.sqrt(freq)
 
 
-def sharpe_ratio(series: pd.Series, risk_free: float = 0.0, freq: int = 252) -> float:
+def sharpe_ratio(series: pd.Series, risk_free: float = 0.0, freq: float = 252) -> float:
     rets = daily_returns(series)
     if rets.std().item() == 0:
         return np.nan
@@ -29,3 +29,23 @@ def max_drawdown(series: pd.Series) -> float:
     cum_max = series.cummax()
     drawdown = (series - cum_max) / cum_max
     return drawdown.min()
+
+
+def drawdown_table(series: pd.Series, top: int = None) -> pd.DataFrame:
+    """Drawdown episodes (peak, trough, recovery, depth, length in bars), deepest first."""
+    from src.kernels.drawdowns import drawdown_episodes
+
+    values = series.to_numpy(dtype=np.float64)
+    peaks, troughs, ends, depths = drawdown_episodes(values)
+    index = series.index
+    recovered = ends >= 0
+    table = pd.DataFrame({
+        "peak": index[peaks],
+        "trough": index[troughs],
+        "recovery": index[np.where(recovered, ends, 0)].where(recovered),
+        "depth": depths,
+        "length": np.where(recovered, ends, len(values) - 1) - peaks,
+        "recovered": recovered,
+    })
+    table = table.sort_values("depth", kind="stable").reset_index(drop=True)
+    return table if top is None else table.head(top)
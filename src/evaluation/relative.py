@@ -0,0 +1,192 @@
+"""
+Benchmark-relative metrics: beta, alpha, correlation, tracking error,
+information ratio and up / down capture.
+
+Every column of a returns frame (assets, strategies, portfolios) is
+compared with one benchmark series in a single pass: the moments are
+column sums of masked arrays, so screening hundreds of tickers costs a few
+vectorized reductions rather than one regression per ticker. Rolling
+metrics use cumulative sums over the same arrays.
+
+A row counts for a column when both the column and the benchmark have a
+return on it.
+"""
+import numpy as np
+import pandas as pd
+
+from src.data.cache import DERIVED_CACHE, cached_call, fingerprint, read_config
+
+DEFAULT_BENCHMARK = "SPY"
+# Rows of the rolling metrics (about a quarter of daily bars)
+DEFAULT_ROLLING_WINDOW = 63
+
+RELATIVE_COLUMNS = [
+    "beta", "alpha", "correlation", "tracking_error", "information_ratio",
+    "up_capture", "down_capture", "observations",
+]
+
+
+def load_benchmark_settings() -> dict:
+    """
+    Read the ``benchmark`` section of config.yaml.
+
+    benchmark:
+      ticker: SPY
+      rolling_window: 63     # rows
+    """
+    cfg = read_config().get("benchmark", {}) or {}
+    return {
+        "ticker": str(cfg.get("ticker", DEFAULT_BENCHMARK)).upper(),
+        "rolling_window": int(cfg.get("rolling_window", DEFAULT_ROLLING_WINDOW)),
+    }
+
+
+def _benchmark_on(index, prices):
+    # Benchmark price at or before each row of ``index``, then its returns
+    aligned = prices.sort_index().reindex(index, method="ffill")
+    return aligned.pct_change(fill_method=None).rename("benchmark")
+
+
+def get_benchmark_returns(index, ticker=None, period="1y", interval="1d"):
+    """
+    Returns of the benchmark on the rows of ``index`` (NaN where unknown).
+
+    The benchmark history comes from ``get_history`` (fetched and cached
+    once per process). Its last price at or before each row is used, so
+    the returns cover the same intervals as returns computed on ``index``.
+    The aligned series is cached per calendar.
+    """
+    from src.data.fetch_yf import get_history
+
+    ticker = (ticker or load_benchmark_settings()["ticker"]).upper()
+    df = get_history(ticker, period=period, interval=interval)
+    if df is None or df.empty:
+        return pd.Series(np.nan, index=index, name="benchmark")
+    prices = df["price"]
+    key = (ticker, period, interval, len(prices), prices.index[-1], float(prices.iloc[-1]), fingerprint(index))
+    return cached_call(DERIVED_CACHE, _benchmark_on, index, prices, key=key)
+
+
+def _masked(returns, benchmark):
+    # (rows, columns) returns and benchmark, zero where either is missing
+    if isinstance(returns, pd.Series):
+        returns = returns.to_frame()
+    b = benchmark.reindex(returns.index).to_numpy(dtype=np.float64)
+    X = returns.to_numpy(dtype=np.float64)
+    mask = ~np.isnan(X) & ~np.isnan(b)[:, None]
+    X = np.where(mask, X, 0.0)
+    B = np.where(mask, b[:, None], 0.0)
+    return returns, X, B, mask
+
+
+def _ratio(a, b):
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return np.where(b != 0, a / np.where(b != 0, b, 1.0), np.nan)
+
+
+def relative_metrics(returns, benchmark, periods_per_year=252) -> pd.DataFrame:
+    """
+    Full-sample benchmark-relative metrics of every column.
+
+    Parameters
+    ----------
+    returns : pd.DataFrame or pd.Series
+        Periodic returns, one column per asset / strategy / portfolio.
+    benchmark : pd.Series
+        Benchmark returns (aligned on the index of ``returns``).
+    periods_per_year : float
+        Used to annualize alpha and tracking error.
+
+    Returns
+    -------
+    pd.DataFrame
+        One row per column: beta, alpha (annualized, decimal), correlation,
+        tracking_error (annualized), information_ratio (annualized active
+        return / tracking error), up_capture / down_capture (mean return
+        when the benchmark is up / down, over the benchmark's) and the
+        number of observations.
+    """
+    returns, X, B, mask = _masked(returns, benchmark)
+    n = mask.sum(axis=0).astype(float)
+    dof = np.where(n > 1, n - 1, np.nan)
+
+    mean_x = _ratio(X.sum(axis=0), n)
+    mean_b = _ratio(B.sum(axis=0), n)
+    Xc = np.where(mask, X - mean_x, 0.0)
+    Bc = np.where(mask, B - mean_b, 0.0)
+    var_x = (Xc * Xc).sum(axis=0) / dof
+    var_b = (Bc * Bc).sum(axis=0) / dof
+    cov = (Xc * Bc).sum(axis=0) / dof
+
+    beta = _ratio(cov, var_b)
+    active_var = np.clip(var_x + var_b - 2.0 * cov, 0.0, None)
+    tracking_error = np.sqrt(active_var * periods_per_year)
+
+    def capture(rows):
+        # Mean return of the column over the benchmark's, on the selected rows
+        return _ratio((X * rows).sum(axis=0), (B * rows).sum(axis=0))
+
+    out = pd.DataFrame(
+        {
+            "beta": beta,
+            "alpha": (mean_x - beta * mean_b) * periods_per_year,
+            "correlation": _ratio(cov, np.sqrt(var_x * var_b)),
+            "tracking_error": tracking_error,
+            "information_ratio": _ratio((mean_x - mean_b) * periods_per_year, tracking_error),
+            "up_capture": capture(mask & (B > 0)),
+            "down_capture": capture(mask & (B < 0)),
+            "observations": n.astype(int),
+        },
+        index=returns.columns,
+    )
+    return out[RELATIVE_COLUMNS]
+
+
+def rolling_relative(returns, benchmark, window=DEFAULT_ROLLING_WINDOW, periods_per_year=252) -> dict:
+    """
+    Rolling beta, alpha, correlation and tracking error of every column.
+
+    Windows are ``window`` rows long and need a return of the column and
+    of the benchmark on every row (NaN otherwise). Window sums come from
+    cumulative sums of the centred arrays, so the cost does not depend on
+    the window length.
+
+    Returns
+    -------
+    dict
+        "beta", "alpha", "correlation", "tracking_error": DataFrames
+        shaped like ``returns`` (annualized alpha and tracking error).
+    """
+    returns, X, B, mask = _masked(returns, benchmark)
+    # Centred on the full-sample means: keeps the window sums well conditioned
+    n = mask.sum(axis=0)
+    mean_x, mean_b = _ratio(X.sum(axis=0), n), _ratio(B.sum(axis=0), n)
+    X = np.where(mask, X - mean_x, 0.0)
+    B = np.where(mask, B - mean_b, 0.0)
+
+    def window_sums(a):
+        c = np.cumsum(np.vstack([np.zeros((1, a.shape[1])), a]), axis=0)
+        out = np.full(a.shape, np.nan)
+        if len(a) >= window:
+            out[window - 1:] = c[window:] - c[:-window]
+        return out
+
+    count = window_sums(mask.astype(float))
+    full = count == window
+    sx, sb = window_sums(X), window_sums(B)
+    sxx, sbb, sxb = window_sums(X * X), window_sums(B * B), window_sums(X * B)
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        mx, mb = sx / window, sb / window
+        dof = window - 1
+        var_x = (sxx - window * mx * mx) / dof
+        var_b = (sbb - window * mb * mb) / dof
+        cov = (sxb - window * mx * mb) / dof
+        beta = np.where(var_b > 0, cov / var_b, np.nan)
+        corr = np.where((var_x > 0) & (var_b > 0), cov / np.sqrt(np.abs(var_x * var_b)), np.nan)
+        te = np.sqrt(np.clip(var_x + var_b - 2.0 * cov, 0.0, None) * periods_per_year)
+        # Alpha on the raw means: add the centring back
+        alpha = ((mx + mean_x) - beta * (mb + mean_b)) * periods_per_year
+
+    frame = lambda a: pd.DataFrame(np.where(full, a, np.nan), index=returns.index, columns=returns.columns)  # noqa: E731
+    return {"beta": frame(beta), "alpha": frame(alpha), "correlation": frame(corr), "tracking_error": frame(te)}
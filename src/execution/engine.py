@@ -0,0 +1,426 @@
+"""
+Event-driven execution of single-asset strategy signals.
+
+The vectorized strategies hold full 0/1 positions filled at the close at
+no cost. ``execute`` replays a strategy as a stream of events instead and
+trades it as an account would: positions are sized (``Sizing``), filled
+with slippage and charged commissions (``Costs``), closed by stop-loss /
+take-profit levels, and every fill is logged.
+
+The pipeline is a chain of generators, each holding a bounded state:
+
+    frame_events(df) / csv_events(path)     -> (timestamp, price)
+    momentum_stream(events, ...) etc.       -> (timestamp, price, target)
+    execute(signals, ...)                   -> ExecutionResult
+
+so bars or ticks are processed in constant memory, whatever their number
+(the fill log grows with the trades only; ``keep_values=False`` also
+drops the equity curve). Timestamps travel as int64 nanoseconds (UTC).
+The metrics are accumulated on the fly, in the format of ``backtest``,
+on the equity of every event or, for ticks, of every ``sample`` bar.
+
+Targets are positions: True / 1 long, False / 0 flat, -1 short (a
+fractional target scales the size of the position it opens). Orders are
+sent when the target changes: with ``fill="next"`` they fill at the next
+event's price, with ``fill="close"`` at the price of the signal's own
+event (the vectorized strategies' assumption). Stop-loss and take-profit
+levels are checked on every event price and filled at that price; after
+a stop, the position stays flat until the target changes.
+"""
+import math
+import time
+from array import array
+from typing import NamedTuple
+
+import numpy as np
+import pandas as pd
+
+from src.data.intervals import bar_minutes, is_intraday, periods_per_year
+from src.execution.models import (
+    FILL_MODES,
+    check_models,
+    commission,
+    fill_price,
+    load_execution_settings,
+    order_quantity,
+)
+from src.monitoring.tracing import traced
+
+# Rows read from a frame or a CSV file at a time
+CHUNK_ROWS = 65536
+
+FILL_COLUMNS = ["side", "quantity", "price", "fill_price", "commission", "slippage", "reason", "position"]
+TRADE_COLUMNS = [
+    "exit_time", "side", "quantity", "entry_price", "exit_price",
+    "pnl", "return", "costs", "bars", "exit_reason",
+]
+
+
+class ExecutionResult(NamedTuple):
+    # Equity / initial capital at every event (or sample bar); None with keep_values=False
+    value: object
+    # Same keys as backtest(): total_return, annual_vol, sharpe, max_drawdown, final_value
+    metrics: dict
+    # One row per fill, indexed by time (see FILL_COLUMNS)
+    fills: pd.DataFrame
+    # One row per round trip, indexed by entry time (see TRADE_COLUMNS);
+    # an open position has no exit yet
+    trades: pd.DataFrame
+    # events, marks, fills, trades, commission, slippage, turnover,
+    # final_equity, position, elapsed_s, events_per_s
+    stats: dict
+
+
+# ---- Event sources ----
+
+def frame_events(df: pd.DataFrame, column: str = "price", chunk_rows: int = CHUNK_ROWS):
+    """(timestamp, price) events of a history, read in chunks of rows (missing prices skipped)."""
+    values = df[column]
+    for start in range(0, len(df), chunk_rows):
+        stop = start + chunk_rows
+        stamps = df.index[start:stop].as_unit("ns").asi8
+        prices = values.iloc[start:stop].to_numpy(dtype=np.float64)
+        ok = ~np.isnan(prices)
+        if not ok.all():
+            stamps, prices = stamps[ok], prices[ok]
+        yield from zip(stamps.tolist(), prices.tolist())
+
+
+def csv_events(path, time_column: str = "timestamp", price_column: str = "price", chunk_rows: int = CHUNK_ROWS):
+    """
+    (timestamp, price) events of a CSV file of bars or ticks, read in chunks.
+
+    Naive timestamps are taken as UTC. Rows must be in time order.
+    """
+    for chunk in pd.read_csv(path, usecols=[time_column, price_column], chunksize=chunk_rows):
+        chunk = chunk.dropna()
+        stamps = pd.DatetimeIndex(pd.to_datetime(chunk[time_column], utc=True)).as_unit("ns").asi8
+        yield from zip(stamps.tolist(), chunk[price_column].to_numpy(dtype=np.float64).tolist())
+
+
+# ---- Engine ----
+
+class _RunningMetrics:
+    """``backtest`` metrics of a value series, accumulated one value at a time."""
+
+    __slots__ = ("first", "prev", "n", "mean", "m2", "peak", "max_dd")
+
+    def __init__(self):
+        self.first = None
+        self.prev = None
+        self.n = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+        self.peak = -math.inf
+        self.max_dd = 0.0
+
+    def add(self, value):
+        if self.first is None:
+            self.first = value
+        else:
+            # Welford's update of the mean and variance of the returns
+            r = value / self.prev - 1.0
+            self.n += 1
+            delta = r - self.mean
+            self.mean += delta / self.n
+            self.m2 += delta * (r - self.mean)
+        self.prev = value
+        if value > self.peak:
+            self.peak = value
+        dd = (value - self.peak) / self.peak
+        if dd < self.max_dd:
+            self.max_dd = dd
+
+    def result(self, periods_per_year) -> dict:
+        std = math.sqrt(self.m2 / (self.n - 1)) if self.n > 1 else math.nan
+        return {
+            "total_return": self.prev / self.first - 1.0,
+            "annual_vol": std * math.sqrt(periods_per_year),
+            "sharpe": math.nan if std == 0 else self.mean * periods_per_year / (std * math.sqrt(periods_per_year)),
+            "max_drawdown": self.max_dd,
+            "final_value": self.prev,
+        }
+
+
+class _Book:
+    """Cash, position, open trade and logs of an execution."""
+
+    def __init__(self, capital, sizing, costs, ppy):
+        self.cash = capital
+        self.position = 0.0
+        self.sizing = sizing
+        self.costs = costs
+        self.ppy = ppy
+        self.fills = []
+        self.trades = []
+        self.entry = None
+        self.commission = 0.0
+        self.slippage = 0.0
+        self.traded = 0.0
+
+    def fill(self, ts, quantity, price, volatility, reason, bar):
+        side = 1 if quantity > 0 else -1
+        executed = fill_price(self.costs, side, price, volatility)
+        fee = commission(self.costs, abs(quantity), executed)
+        slip = abs(quantity) * abs(executed - price)
+        self.cash -= quantity * executed + fee
+        self.position += quantity
+        self.commission += fee
+        self.slippage += slip
+        self.traded += abs(quantity) * executed
+        self.fills.append((ts, "buy" if side > 0 else "sell", abs(quantity), price, executed, fee, slip, reason, self.position))
+
+        if self.entry is None:
+            self.entry = (ts, quantity, executed, fee, slip, bar)
+        else:
+            self.trades.append(self._trade(ts, executed, fee + slip, fee, bar, reason))
+            self.entry = None
+
+    def _trade(self, ts, exit_price, exit_costs, exit_fee, bar, reason):
+        # Round trip of the open position (slippage is in the fill prices)
+        entry_ts, qty, entry_price, entry_fee, entry_slip, entry_bar = self.entry
+        pnl = qty * (exit_price - entry_price) - entry_fee - exit_fee
+        return (
+            entry_ts, ts, "long" if qty > 0 else "short", abs(qty), entry_price, exit_price,
+            pnl, pnl / (abs(qty) * entry_price), entry_fee + entry_slip + exit_costs, bar - entry_bar, reason,
+        )
+
+    def trade_to(self, ts, target, price, volatility, reason, bar):
+        """
+        Close the position unless it is on the target's side, then open the
+        target's. Returns True when a position was opened.
+        """
+        side = (target > 0) - (target < 0)
+        if self.position and (not side or (self.position > 0) != (side > 0)):
+            self.fill(ts, -self.position, price, volatility, reason, bar)
+        if side and not self.position:
+            executed = fill_price(self.costs, side, price, volatility)
+            quantity = abs(target) * order_quantity(
+                self.sizing, self.costs, self.cash + self.position * price, self.cash,
+                executed, volatility, self.ppy, long=side > 0,
+            )
+            if quantity > 0:
+                self.fill(ts, side * quantity, price, volatility, reason, bar)
+                return True
+        return False
+
+
+def _bucket_ns(interval):
+    # Length of a sampling bar in nanoseconds
+    if is_intraday(interval):
+        return bar_minutes(interval) * 60_000_000_000
+    if interval == "1d":
+        return 86_400_000_000_000
+    raise ValueError(f"Unsupported sampling interval: {interval}")
+
+
+def _index(stamps, tz):
+    index = pd.DatetimeIndex(np.frombuffer(stamps, dtype=np.int64).view("datetime64[ns]"), name="Date")
+    return index.tz_localize("UTC").tz_convert(tz) if tz is not None else index
+
+
+@traced("execution.execute")
+def execute(
+    signals,
+    sizing=None,
+    costs=None,
+    stop_loss: float = None,
+    take_profit: float = None,
+    trailing: bool = False,
+    initial_capital: float = None,
+    fill: str = None,
+    interval: str = "1d",
+    sample: str = None,
+    tz=None,
+    keep_values: bool = True,
+    asset_type: str = "equity",
+) -> ExecutionResult:
+    """
+    Trade a stream of (timestamp, price, target) events.
+
+    Parameters
+    ----------
+    signals : iterable of (int, float, target)
+        Events in time order, timestamps in int64 nanoseconds (UTC), e.g.
+        ``momentum_stream(frame_events(df))``.
+    sizing, costs : Sizing, Costs
+        Default to the ``execution`` section of config.yaml.
+    stop_loss, take_profit : float
+        Exit when the price moves this fraction against / in favour of
+        the position, from its entry price (or from its best price since
+        the entry with ``trailing``).
+    initial_capital : float
+    fill : str
+        "next" (next event's price) or "close" (the signal event's price).
+    interval : str
+        Bar interval of the events, to annualize the metrics.
+    sample : str
+        For tick streams: value the account at the last event of every
+        ``sample`` bar (e.g. "1m") and annualize on that bar.
+    tz : timezone of the output timestamps (e.g. ``df.index.tz``).
+    keep_values : bool
+        Keep the value series; without it memory stays constant.
+    asset_type : str
+        "equity" or "crypto": the trading calendar the metrics are
+        annualized on (see ``intervals.CALENDARS``).
+
+    Returns
+    -------
+    ExecutionResult
+    """
+    settings = load_execution_settings()
+    sizing = settings["sizing"] if sizing is None else sizing
+    costs = settings["costs"] if costs is None else costs
+    capital = settings["initial_capital"] if initial_capital is None else float(initial_capital)
+    fill = fill or settings["fill"]
+    check_models(sizing, costs)
+    if fill not in FILL_MODES:
+        raise ValueError(f"Unknown fill mode: {fill} (expected {', '.join(FILL_MODES)}).")
+    if capital <= 0:
+        raise ValueError("The initial capital must be positive.")
+    for name, level in (("stop_loss", stop_loss), ("take_profit", take_profit)):
+        if level is not None and not level > 0:
+            raise ValueError(f"{name} must be positive.")
+    ppy = periods_per_year(sample or interval, asset_type)
+    bucket = _bucket_ns(sample) if sample else 0
+    # EWMA of the squared returns: per-bar volatility for slippage and sizing
+    alpha = 1.0 - 0.5 ** (1.0 / settings["volatility_halflife"])
+
+    book = _Book(capital, sizing, costs, ppy)
+    metrics = _RunningMetrics()
+    stamps, values = array("q"), array("d")
+    start = time.perf_counter()
+
+    n = 0
+    prev = None
+    var = None
+    vol = 0.0
+    pending = None
+    last_target = 0
+    entry_price = best = 0.0
+    current = None
+    mark_ts = mark = None
+
+    for ts, price, target in signals:
+        n += 1
+        if prev is not None:
+            r = price / prev - 1.0
+            var = r * r if var is None else var + alpha * (r * r - var)
+            vol = math.sqrt(var)
+        prev = price
+
+        if pending is not None:
+            if book.trade_to(ts, pending, price, vol, "signal", n):
+                entry_price = best = price
+            pending = None
+
+        position = book.position
+        if position and (stop_loss or take_profit):
+            if position > 0:
+                if trailing and price > best:
+                    best = price
+                hit_stop = stop_loss and price <= (best if trailing else entry_price) * (1.0 - stop_loss)
+                hit_take = take_profit and price >= entry_price * (1.0 + take_profit)
+            else:
+                if trailing and price < best:
+                    best = price
+                hit_stop = stop_loss and price >= (best if trailing else entry_price) * (1.0 + stop_loss)
+                hit_take = take_profit and price <= entry_price * (1.0 - take_profit)
+            if hit_stop or hit_take:
+                # Flat until the target changes
+                book.fill(ts, -position, price, vol, "stop_loss" if hit_stop else "take_profit", n)
+
+        if target != last_target:
+            last_target = target
+            if fill == "close":
+                if book.trade_to(ts, float(target), price, vol, "signal", n):
+                    entry_price = best = price
+            else:
+                pending = float(target)
+
+        value = (book.cash + book.position * price) / capital
+        if bucket:
+            b = ts // bucket
+            if b != current:
+                if mark is not None:
+                    metrics.add(mark)
+                    if keep_values:
+                        stamps.append(mark_ts)
+                        values.append(mark)
+                current = b
+            mark_ts, mark = ts, value
+        else:
+            metrics.add(value)
+            if keep_values:
+                stamps.append(ts)
+                values.append(value)
+
+    if n == 0:
+        raise ValueError("The event stream is empty.")
+    if bucket:
+        metrics.add(mark)
+        if keep_values:
+            stamps.append(mark_ts)
+            values.append(mark)
+    elapsed = time.perf_counter() - start
+
+    fills = pd.DataFrame(
+        [f[1:] for f in book.fills], columns=FILL_COLUMNS,
+        index=_index(array("q", [f[0] for f in book.fills]), tz),
+    )
+    trades = book.trades
+    if book.entry is not None:
+        # Open position: no exit yet
+        trades = trades + [book._trade(-1, math.nan, math.nan, math.nan, n, "open")]
+    trades = pd.DataFrame(
+        [t[1:] for t in trades], columns=TRADE_COLUMNS,
+        index=_index(array("q", [t[0] for t in trades]), tz).rename("entry_time"),
+    )
+    exits = array("q", trades["exit_time"].tolist())
+    trades["exit_time"] = _index(exits, tz).where(np.frombuffer(exits, dtype=np.int64) >= 0)
+
+    final_equity = book.cash + book.position * prev
+    return ExecutionResult(
+        value=pd.Series(values, index=_index(stamps, tz), name="Execution") if keep_values else None,
+        metrics=metrics.result(ppy),
+        fills=fills,
+        trades=trades,
+        stats={
+            "events": n,
+            "marks": metrics.n + 1,
+            "fills": len(book.fills),
+            "trades": len(book.trades),
+            "commission": book.commission,
+            "slippage": book.slippage,
+            "turnover": book.traded / capital,
+            "final_equity": final_equity,
+            "position": book.position,
+            "elapsed_s": elapsed,
+            "events_per_s": n / elapsed if elapsed > 0 else 0.0,
+        },
+    )
+
+
+def strategy_stream(events, strategy: str, **params):
+    """Target stream of a strategy ("buy_and_hold", "momentum" or "mean_reversion")."""
+    if strategy == "buy_and_hold":
+        from src.strategies.buy_and_hold import buy_and_hold_stream
+        return buy_and_hold_stream(events)
+    if strategy == "momentum":
+        from src.strategies.momentum import momentum_stream
+        return momentum_stream(events, **params)
+    if strategy == "mean_reversion":
+        from src.strategies.mean_reversion import mean_reversion_stream
+        return mean_reversion_stream(events, **params)
+    raise ValueError(f"Unknown strategy: {strategy}")
+
+
+def run_execution(df: pd.DataFrame, strategy: str = "momentum", params=None, interval: str = "1d", **options):
+    """
+    Execute a strategy on a price history (``get_history`` frame).
+
+    ``params`` are the strategy's (period, threshold, exit_threshold,
+    stop_loss); ``options`` those of ``execute``.
+    """
+    signals = strategy_stream(frame_events(df), strategy, **(params or {}))
+    return execute(signals, interval=interval, tz=df.index.tz, **options)
@@ -0,0 +1,138 @@
+"""
+Position sizing and transaction cost models of the execution engine.
+
+Both are small immutable specs (``Sizing``, ``Costs``) read from the
+``execution`` section of config.yaml and applied by ``engine.execute``
+at every fill:
+
+- sizing sets the quantity of a new position from the equity, the price
+  and the current volatility estimate, rounded down to whole lots and
+  capped by the cash available for a long position;
+- slippage moves the fill price against the trade by a fixed number of
+  basis points plus a multiple of the per-bar volatility;
+- commission is a share of the traded notional plus a charge per unit,
+  with a minimum per fill.
+"""
+import math
+from typing import NamedTuple
+
+from src.data.cache import read_config
+
+SIZING_METHODS = ("fraction", "cash", "units", "volatility")
+FILL_MODES = ("next", "close")
+
+
+class Sizing(NamedTuple):
+    # fraction: share of equity; cash: amount per position; units: quantity;
+    # volatility: annualized volatility target (share of equity = value / vol, at most 1)
+    method: str = "fraction"
+    value: float = 1.0
+    # Quantities are rounded down to multiples of lot_size (0: fractional)
+    lot_size: float = 1.0
+
+
+class Costs(NamedTuple):
+    # Against the trade, on every fill
+    slippage_bps: float = 0.0
+    # Extra slippage in multiples of the per-bar volatility estimate
+    volatility_slippage: float = 0.0
+    # Share of the traded notional, charge per unit, minimum per fill
+    commission_bps: float = 0.0
+    commission_per_unit: float = 0.0
+    commission_min: float = 0.0
+
+
+def load_execution_settings() -> dict:
+    """
+    Read the ``execution`` section of config.yaml.
+
+    execution:
+      initial_capital: 100000
+      fill: next                 # next: at the next event's price; close: at the signal's
+      sizing: fraction           # fraction, cash, units or volatility
+      size: 1.0
+      lot_size: 1                # 0: fractional quantities
+      slippage_bps: 1.0
+      volatility_slippage: 0.0
+      commission_bps: 0.0
+      commission_per_unit: 0.005
+      commission_min: 1.0
+      volatility_halflife: 20    # bars, of the volatility estimate
+    """
+    cfg = read_config().get("execution", {}) or {}
+    return {
+        "initial_capital": float(cfg.get("initial_capital", 100_000)),
+        "fill": str(cfg.get("fill", "next")),
+        "sizing": Sizing(
+            str(cfg.get("sizing", "fraction")), float(cfg.get("size", 1.0)), float(cfg.get("lot_size", 1))
+        ),
+        "costs": Costs(
+            float(cfg.get("slippage_bps", 1.0)),
+            float(cfg.get("volatility_slippage", 0.0)),
+            float(cfg.get("commission_bps", 0.0)),
+            float(cfg.get("commission_per_unit", 0.005)),
+            float(cfg.get("commission_min", 1.0)),
+        ),
+        "volatility_halflife": float(cfg.get("volatility_halflife", 20)),
+    }
+
+
+def check_models(sizing: Sizing, costs: Costs):
+    """Raise ValueError on an invalid sizing or cost spec."""
+    if sizing.method not in SIZING_METHODS:
+        raise ValueError(f"Unknown sizing method: {sizing.method} (expected {', '.join(SIZING_METHODS)}).")
+    if sizing.value <= 0:
+        raise ValueError("The position size must be positive.")
+    if sizing.lot_size < 0:
+        raise ValueError("The lot size cannot be negative.")
+    if any(c < 0 for c in costs):
+        raise ValueError("Costs cannot be negative.")
+
+
+def fill_price(costs: Costs, side: int, price: float, volatility: float) -> float:
+    """Price of a fill of ``side`` (+1 buy, -1 sell) at market ``price``."""
+    return price * (1.0 + side * (costs.slippage_bps * 1e-4 + costs.volatility_slippage * volatility))
+
+
+def commission(costs: Costs, quantity: float, price: float) -> float:
+    """Commission of a fill of ``quantity`` units (unsigned) at ``price``."""
+    if quantity == 0:
+        return 0.0
+    fee = quantity * (price * costs.commission_bps * 1e-4 + costs.commission_per_unit)
+    return max(fee, costs.commission_min)
+
+
+def order_quantity(
+    sizing: Sizing,
+    costs: Costs,
+    equity: float,
+    cash: float,
+    price: float,
+    volatility: float,
+    periods_per_year: float,
+    long: bool = True,
+) -> float:
+    """
+    Unsigned quantity of a new position at ``price`` (its fill price).
+
+    ``volatility`` is the per-bar volatility estimate (0 when unknown: a
+    volatility target then invests the full equity). A long position is
+    capped by the cash, commission included.
+    """
+    if sizing.method == "units":
+        quantity = sizing.value
+    else:
+        if sizing.method == "fraction":
+            notional = sizing.value * equity
+        elif sizing.method == "cash":
+            notional = sizing.value
+        else:
+            annual = volatility * math.sqrt(periods_per_year)
+            notional = equity * (min(1.0, sizing.value / annual) if annual > 0 else 1.0)
+        quantity = notional / price
+    if long:
+        per_unit = price * (1.0 + costs.commission_bps * 1e-4) + costs.commission_per_unit
+        quantity = min(quantity, max(cash - costs.commission_min, 0.0) / per_unit)
+    if sizing.lot_size > 0:
+        quantity = math.floor(quantity / sizing.lot_size) * sizing.lot_size
+    return max(quantity, 0.0)
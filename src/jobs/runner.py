@@ -0,0 +1,353 @@
+"""
+Background jobs for heavy analyses.
+
+Pages submit work (engine runs, sweeps, simulations) instead of running
+it on the Streamlit script thread; the script keeps rendering and polls
+the job on the next reruns. Jobs run in a pool of worker processes
+shared by every session of the server process.
+
+A job is identified by its key: a content hash of the function and its
+arguments (or a key given by the caller). Submitting a job whose key is
+already queued, running or finished returns the existing job, so many
+sessions asking for the same computation share one run, and a finished
+result is served from the ``jobs`` cache until it expires. A failed job
+keeps its record and error: the same inputs are not retried on every
+rerun (``retry_job`` runs them again explicitly).
+
+Job functions can call ``report_progress(done, total)``: it publishes
+the progress of the job and raises ``JobCancelled`` once the job has been
+cancelled. Outside a job it does nothing, so library code can call it
+unconditionally.
+"""
+import multiprocessing
+import queue
+import threading
+import time
+from concurrent.futures import CancelledError, ProcessPoolExecutor, ThreadPoolExecutor
+
+from src.data.cache import LRUCache, fingerprint, read_config
+
+# "expired": finished, but its result has left the cache
+JOB_STATES = ("queued", "running", "done", "failed", "cancelled", "expired")
+# Finished job records kept for polling (results live in JOB_RESULTS)
+MAX_JOB_RECORDS = 500
+# Shortest time between two progress updates sent by a worker
+PROGRESS_INTERVAL = 0.2
+# Cancellation flags shared with the workers, one per run (modulo)
+CANCEL_SLOTS = 4096
+
+# Results of finished jobs, keyed on the job key
+JOB_RESULTS = LRUCache("jobs", max_bytes=256 * 1024 * 1024, ttl=3600)
+
+
+class JobCancelled(Exception):
+    """Raised inside a job (by ``report_progress``) once it has been cancelled."""
+
+
+def load_job_settings() -> dict:
+    """
+    Read the ``jobs`` section of config.yaml.
+
+    jobs:
+      workers: 2      # worker processes (0: one background thread)
+    """
+    cfg = read_config().get("jobs", {}) or {}
+    return {"workers": int(cfg.get("workers", 2))}
+
+
+# ---- Worker side ----
+
+# Set in each worker by the pool initializer: progress updates go back to
+# the server through a queue, cancellations come in through shared flags
+_PROGRESS_QUEUE = None
+_CANCEL_FLAGS = None
+
+
+def _init_worker(progress_queue, cancel_flags):
+    global _PROGRESS_QUEUE, _CANCEL_FLAGS
+    _PROGRESS_QUEUE, _CANCEL_FLAGS = progress_queue, cancel_flags
+
+
+class _Context:
+    def __init__(self, run_id, slot):
+        self.run_id = run_id
+        self.slot = slot
+        self.last_report = 0.0
+
+
+_local = threading.local()
+
+
+def report_progress(done, total=None, message: str = ""):
+    """
+    Publish the progress of the running job (``done`` out of ``total``,
+    or a fraction when ``total`` is None).
+
+    Raises JobCancelled when the job has been cancelled. Updates are sent
+    at most every PROGRESS_INTERVAL seconds.
+    """
+    ctx = getattr(_local, "ctx", None)
+    if ctx is None:
+        return
+    now = time.monotonic()
+    finished = total is not None and done >= total
+    if now - ctx.last_report < PROGRESS_INTERVAL and not finished:
+        return
+    ctx.last_report = now
+    fraction = done / total if total else float(done)
+    _PROGRESS_QUEUE.put((ctx.run_id, min(max(fraction, 0.0), 1.0), message))
+    if _CANCEL_FLAGS[ctx.slot]:
+        raise JobCancelled(ctx.run_id)
+
+
+def _run_job(run_id, slot, fn, args, kwargs):
+    if _CANCEL_FLAGS[slot]:
+        raise JobCancelled(run_id)
+    _local.ctx = _Context(run_id, slot)
+    try:
+        return fn(*args, **kwargs)
+    finally:
+        _local.ctx = None
+
+
+# ---- Server side ----
+
+class Job:
+    """State of one submitted job, as seen by the pages."""
+
+    def __init__(self, key, label, run_id, slot=None):
+        self.key = key
+        self.label = label
+        self.run_id = run_id
+        self.slot = slot
+        self.status = "queued"
+        self.error = None
+        self.submitted_at = time.time()
+        self.finished_at = None
+        self.future = None
+
+    def info(self, progress=None) -> dict:
+        fraction, message = progress or (1.0 if self.status == "done" else 0.0, "")
+        end = self.finished_at or time.time()
+        return {
+            "key": self.key,
+            "label": self.label,
+            "status": self.status,
+            "progress": fraction,
+            "message": message,
+            "error": self.error,
+            "elapsed_s": end - self.submitted_at,
+        }
+
+
+class JobManager:
+    """
+    Deduplicating job queue over a process pool.
+
+    The pool starts on the first submission. With ``workers=0`` jobs run
+    on one background thread of the server process instead.
+    """
+
+    def __init__(self, workers: int | None = None):
+        self.workers = load_job_settings()["workers"] if workers is None else workers
+        self._jobs = {}  # key -> latest Job
+        self._runs = 0
+        self._lock = threading.RLock()
+        self._pool = None
+        self._progress_queue = None
+        self._cancel_flags = None
+        self._progress = {}  # run_id -> (fraction, message)
+
+    def _start(self):
+        if self._pool is not None:
+            return
+        if self.workers > 0:
+            # "spawn": Streamlit runs sessions on threads, forking it is unsafe
+            ctx = multiprocessing.get_context("spawn")
+            self._progress_queue = ctx.Queue()
+            self._cancel_flags = ctx.Array("b", CANCEL_SLOTS, lock=False)
+            self._pool = ProcessPoolExecutor(
+                self.workers,
+                mp_context=ctx,
+                initializer=_init_worker,
+                initargs=(self._progress_queue, self._cancel_flags),
+            )
+        else:
+            self._progress_queue = queue.SimpleQueue()
+            self._cancel_flags = bytearray(CANCEL_SLOTS)
+            _init_worker(self._progress_queue, self._cancel_flags)
+            self._pool = ThreadPoolExecutor(1, thread_name_prefix="job")
+
+    def shutdown(self):
+        with self._lock:
+            if self._pool is not None:
+                self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
+
+    def submit(self, fn, *args, key=None, label=None, **kwargs) -> str:
+        """
+        Queue ``fn(*args, **kwargs)`` and return its job key.
+
+        ``fn`` and the arguments must be picklable (module-level function).
+        When a job with the same key is queued, running, has failed or has
+        a cached result, it is returned instead of starting a new run.
+        """
+        if key is None:
+            key = fingerprint(fn.__module__, fn.__qualname__, args, sorted(kwargs.items()))
+        with self._lock:
+            job = self._jobs.get(key)
+            if job is not None and job.status in ("queued", "running", "failed"):
+                return key
+            if key in JOB_RESULTS:
+                if job is None or job.status != "done":
+                    job = self._jobs[key] = Job(key, label or fn.__qualname__, None)
+                    job.status, job.finished_at = "done", job.submitted_at
+                return key
+
+            self._start()
+            self._runs += 1
+            job = Job(key, label or fn.__qualname__, f"{key}#{self._runs}", self._runs % CANCEL_SLOTS)
+            self._cancel_flags[job.slot] = 0
+            self._jobs[key] = job
+            self._prune()
+            future = job.future = self._pool.submit(_run_job, job.run_id, job.slot, fn, args, kwargs)
+        future.add_done_callback(lambda f: self._finished(job, f))
+        return key
+
+    def _finished(self, job, future):
+        try:
+            result = future.result()
+        except (JobCancelled, CancelledError):
+            job.status = "cancelled"
+        except Exception as e:
+            job.status, job.error = "failed", f"{type(e).__name__}: {e}"
+        else:
+            if job.status != "cancelled":
+                JOB_RESULTS.set(job.key, result)
+                job.status = "done"
+        job.finished_at = time.time()
+        job.future = None
+        self._progress.pop(job.run_id, None)
+
+    def _drain_progress(self):
+        # Latest progress update of each run, as sent by the workers
+        if self._progress_queue is None:
+            return
+        while True:
+            try:
+                run_id, fraction, message = self._progress_queue.get_nowait()
+            except (queue.Empty, OSError, EOFError):
+                return
+            self._progress[run_id] = (fraction, message)
+        if len(self._progress) > MAX_JOB_RECORDS:
+            # Updates that arrived after their run finished
+            active = {j.run_id for j in self._jobs.values() if j.status in ("queued", "running")}
+            self._progress = {r: p for r, p in self._progress.items() if r in active}
+
+    def _prune(self):
+        if len(self._jobs) <= MAX_JOB_RECORDS:
+            return
+        finished = sorted(
+            (j for j in self._jobs.values() if j.status not in ("queued", "running")),
+            key=lambda j: j.finished_at or 0,
+        )
+        for job in finished[: len(self._jobs) - MAX_JOB_RECORDS]:
+            del self._jobs[job.key]
+
+    def _refresh(self, job):
+        # Queued -> running once a worker has picked the job up
+        if job.status == "queued" and job.future is not None and job.future.running():
+            job.status = "running"
+        elif job.status == "done" and job.key not in JOB_RESULTS:
+            # The result expired or was evicted: the job must run again
+            job.status = "expired"
+
+    def status(self, key) -> dict | None:
+        """Status, progress (0 to 1), message, error and elapsed time of a job."""
+        with self._lock:
+            job = self._jobs.get(key)
+        if job is None:
+            return None
+        self._refresh(job)
+        progress = None
+        if job.status in ("queued", "running"):
+            with self._lock:
+                self._drain_progress()
+            progress = self._progress.get(job.run_id)
+        return job.info(progress)
+
+    def result(self, key, default=None):
+        """Result of a finished job (``default`` if not finished or expired)."""
+        return JOB_RESULTS.get(key, default)
+
+    def wait(self, key, timeout=None) -> bool:
+        """Block up to ``timeout`` seconds for a job to finish. True if it did."""
+        with self._lock:
+            job = self._jobs.get(key)
+        future = job.future if job is not None else None
+        if future is not None:
+            try:
+                future.exception(timeout=timeout)
+            except TimeoutError:
+                return False
+            except CancelledError:
+                pass
+            # The done callback may still be running in the pool's thread
+            deadline = time.monotonic() + 1.0
+            while job.status in ("queued", "running") and time.monotonic() < deadline:
+                time.sleep(0.001)
+        return job is not None and job.status not in ("queued", "running")
+
+    def forget_failure(self, key) -> bool:
+        """Drop the record of a failed job, so that its next submission runs again."""
+        with self._lock:
+            job = self._jobs.get(key)
+            if job is None or job.status != "failed":
+                return False
+            del self._jobs[key]
+        return True
+
+    def cancel(self, key) -> bool:
+        """Cancel a queued or running job. Returns False if it had already finished."""
+        with self._lock:
+            job = self._jobs.get(key)
+            if job is None or job.status not in ("queued", "running"):
+                return False
+            job.status = "cancelled"
+            job.finished_at = time.time()
+            future = job.future
+        # Picked up by report_progress in the worker
+        self._cancel_flags[job.slot] = 1
+        if future is not None:
+            future.cancel()
+        return True
+
+    def jobs(self) -> list:
+        """Status of every known job, most recent first."""
+        with self._lock:
+            keys = sorted(self._jobs, key=lambda k: self._jobs[k].submitted_at, reverse=True)
+        return [self.status(k) for k in keys]
+
+
+# Shared by every session of the server process
+JOB_MANAGER = JobManager()
+
+
+def submit_job(fn, *args, key=None, label=None, **kwargs) -> str:
+    return JOB_MANAGER.submit(fn, *args, key=key, label=label, **kwargs)
+
+
+def job_status(key) -> dict | None:
+    return JOB_MANAGER.status(key)
+
+
+def job_result(key, default=None):
+    return JOB_MANAGER.result(key, default)
+
+
+def cancel_job(key) -> bool:
+    return JOB_MANAGER.cancel(key)
+
+
+def retry_job(key) -> bool:
+    return JOB_MANAGER.forget_failure(key)
@@ -0,0 +1,47 @@
+"""
+Drawdown episodes of a value series.
+"""
+import numpy as np
+
+from src.kernels.jit import kernel
+
+
+@kernel
+def drawdown_episodes(values):
+    """
+    Every drawdown of ``values``: from a peak to the next close at or above it.
+
+    Returns
+    -------
+    tuple of arrays (one entry per episode, in time order)
+        peak rows, trough rows, recovery rows (-1 while not recovered)
+        and depths (trough / peak - 1). Missing values are skipped.
+    """
+    n = len(values)
+    peaks = np.empty(n, dtype=np.int64)
+    troughs = np.empty(n, dtype=np.int64)
+    ends = np.empty(n, dtype=np.int64)
+    depths = np.empty(n, dtype=np.float64)
+    count = 0
+    peak = -1
+    trough = -1
+    falling = False
+    for t in range(n):
+        v = values[t]
+        if v != v:
+            continue
+        if peak < 0 or v >= values[peak]:
+            if falling:
+                peaks[count], troughs[count], ends[count] = peak, trough, t
+                depths[count] = values[trough] / values[peak] - 1.0
+                count += 1
+                falling = False
+            peak = t
+        elif not falling or v < values[trough]:
+            trough = t
+            falling = True
+    if falling:
+        peaks[count], troughs[count], ends[count] = peak, trough, -1
+        depths[count] = values[trough] / values[peak] - 1.0
+        count += 1
+    return peaks[:count], troughs[:count], ends[:count], depths[:count]
@@ -0,0 +1,132 @@
+"""
+Optional JIT compilation of the path-dependent kernels.
+
+A kernel is a loop over rows that cannot be written as a few vectorized
+NumPy operations (band rebalancing, trailing stops, latched signals,
+drawdown episodes). It is written once, on NumPy arrays and scalars only,
+and decorated with ``@kernel``:
+
+- "numba": compiled with ``numba.njit`` on first use (per argument types,
+  cached on disk), when Numba is installed. Numba itself is imported on
+  the first kernel call, so importing a kernel module stays cheap;
+- "python": the same function run by the interpreter, with NumPy
+  operations on the asset axis.
+
+Both backends give the same results up to the rounding of sums. The
+backend comes from ``kernels: backend`` in config.yaml (auto, numba or
+python; auto picks numba when it is importable), the PGLFF_KERNELS
+environment variable, or ``using_backend(...)`` for a block of code.
+"""
+import contextlib
+import contextvars
+import functools
+import logging
+import os
+import threading
+
+from src.data.cache import read_config
+
+logger = logging.getLogger("pglff.kernels")
+
+BACKENDS = ("numba", "python")
+
+_override = contextvars.ContextVar("pglff_kernel_backend", default=None)
+_DEFAULT = None
+_UNSET = object()
+_NUMBA = _UNSET
+
+
+def _numba():
+    """The numba module, imported on first use (None when not installed)."""
+    global _NUMBA
+    if _NUMBA is _UNSET:
+        try:
+            import numba  # optional: kernels then run as Python / NumPy
+        except ImportError:
+            numba = None
+        _NUMBA = numba
+    return _NUMBA
+
+
+def load_kernel_settings() -> dict:
+    """
+    Read the ``kernels`` section of config.yaml.
+
+    kernels:
+      backend: auto     # auto, numba or python
+    """
+    cfg = read_config().get("kernels", {}) or {}
+    return {"backend": str(os.environ.get("PGLFF_KERNELS") or cfg.get("backend", "auto")).lower()}
+
+
+def available_backends() -> list:
+    """Backends usable in this process ("python" always is)."""
+    return (["numba"] if _numba() is not None else []) + ["python"]
+
+
+def _resolve(name):
+    if name == "auto":
+        return "numba" if _numba() is not None else "python"
+    if name not in BACKENDS:
+        raise ValueError(f"Unknown kernel backend: {name} (expected auto, {', '.join(BACKENDS)}).")
+    if name == "numba" and _numba() is None:
+        raise ValueError("The numba kernel backend needs Numba (pip install numba).")
+    return name
+
+
+def active_backend() -> str:
+    """Backend used by kernel calls in this context."""
+    global _DEFAULT
+    override = _override.get()
+    if override is not None:
+        return override
+    if _DEFAULT is None:
+        try:
+            _DEFAULT = _resolve(load_kernel_settings()["backend"])
+        except ValueError as e:
+            logger.warning(f"{e} Using the python backend.")
+            _DEFAULT = "python"
+    return _DEFAULT
+
+
+@contextlib.contextmanager
+def using_backend(name):
+    """Run the kernels of a block with ``name`` ("numba", "python" or "auto")."""
+    token = _override.set(_resolve(name))
+    try:
+        yield
+    finally:
+        _override.reset(token)
+
+
+class Kernel:
+    """A kernel function, dispatched to the active backend on every call."""
+
+    def __init__(self, fn):
+        functools.update_wrapper(self, fn)
+        self.py_func = fn
+        self._compiled = None
+        self._lock = threading.Lock()
+
+    def compiled(self):
+        """The Numba dispatcher (compiles lazily, per argument types)."""
+        if self._compiled is None:
+            with self._lock:
+                if self._compiled is None:
+                    njit = _numba().njit
+                    try:
+                        self._compiled = njit(cache=True, nogil=True)(self.py_func)
+                    except RuntimeError:
+                        # No writable cache directory: compile in memory only
+                        self._compiled = njit(nogil=True)(self.py_func)
+        return self._compiled
+
+    def __call__(self, *args):
+        if active_backend() == "numba":
+            return self.compiled()(*args)
+        return self.py_func(*args)
+
+
+def kernel(fn):
+    """Decorator: ``fn`` becomes a kernel run by the active backend."""
+    return Kernel(fn)
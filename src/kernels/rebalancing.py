@@ -0,0 +1,47 @@
+"""
+Threshold (band) rebalancing: rebalance only when a weight drifts too far.
+"""
+import numpy as np
+
+from src.kernels.jit import kernel
+
+
+@kernel
+def band_rebalance(R, targets, band, scheduled):
+    """
+    Rows at whose close a band-rebalanced portfolio trades.
+
+    Parameters
+    ----------
+    R : (rows, assets) array
+        Asset returns (missing returns count as 0).
+    targets : (rows, assets) array
+        Target weights in force for the return of each row.
+    band : float
+        Largest allowed absolute drift of a weight from its target.
+    scheduled : (rows,) bool array
+        Rows that rebalance regardless of the drift (e.g. schedule changes).
+
+    Returns
+    -------
+    (rows,) bool array
+        True at the rows whose close brings the positions back to the
+        targets of the next row (never the last row).
+    """
+    n_rows = R.shape[0]
+    out = np.zeros(n_rows, dtype=np.bool_)
+    if n_rows == 0:
+        return out
+    pos = targets[0].astype(np.float64)
+    for t in range(n_rows - 1):
+        growth = R[t].astype(np.float64) + 1.0
+        growth[np.isnan(growth)] = 1.0
+        pos *= growth
+        value = pos.sum()
+        rebalance = scheduled[t]
+        if not rebalance and value != 0.0:
+            rebalance = np.abs(pos / value - targets[t + 1]).max() > band
+        if rebalance:
+            out[t] = True
+            pos = targets[t + 1] * value
+    return out
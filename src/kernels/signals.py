@@ -0,0 +1,91 @@
+"""
+Stateful trading signals: positions that depend on their own history.
+"""
+import numpy as np
+
+from src.kernels.jit import kernel
+
+
+@kernel
+def latch(entry, exit):
+    """
+    Position that switches on at ``entry`` rows and off at ``exit`` rows.
+
+    Between the two it keeps its previous state (hysteresis). On a row
+    with both, the exit applies first, then the entry.
+    """
+    n = len(entry)
+    held = np.zeros(n, dtype=np.bool_)
+    on = False
+    for t in range(n):
+        if on and exit[t]:
+            on = False
+        if not on and entry[t]:
+            on = True
+        held[t] = on
+    return held
+
+
+@kernel
+def trailing_stop(price, signal, stop):
+    """
+    Apply a trailing stop-loss to a long signal.
+
+    The position follows ``signal`` until the price closes ``stop``
+    (a fraction) or more below its highest close since the entry. It then
+    stays out until the signal has switched off and on again. Missing
+    prices leave the state unchanged.
+    """
+    n = len(price)
+    held = np.zeros(n, dtype=np.bool_)
+    inside = False
+    stopped = False
+    peak = 0.0
+    for t in range(n):
+        p = price[t]
+        if not signal[t]:
+            inside = False
+            stopped = False
+        elif inside:
+            if p > peak:
+                peak = p
+            if p <= peak * (1.0 - stop):
+                inside = False
+                stopped = True
+        elif not stopped and p == p:
+            inside = True
+            peak = p
+        held[t] = inside
+    return held
+
+
+class TrailingStop:
+    """
+    Event-by-event ``trailing_stop``, for signals computed on a stream.
+
+    ``update(price, signal)`` returns the position after each event, with
+    the same rules (and results) as the array kernel.
+    """
+
+    __slots__ = ("stop", "inside", "stopped", "peak")
+
+    def __init__(self, stop):
+        self.stop = float(stop)
+        self.inside = False
+        self.stopped = False
+        self.peak = 0.0
+
+    def update(self, price, signal) -> bool:
+        if not signal:
+            self.inside = False
+            self.stopped = False
+        elif self.inside:
+            if price > self.peak:
+                self.peak = price
+            if price <= self.peak * (1.0 - self.stop):
+                self.inside = False
+                self.stopped = True
+        elif not self.stopped and price == price:
+            self.inside = True
+            self.peak = price
+        return self.inside
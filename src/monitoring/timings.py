@@ -0,0 +1,44 @@
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+from src.monitoring.tracing import span
+
+# Most recent stage timings of this process (fetch, compute, render)
+_TIMINGS = deque(maxlen=500)
+_LOCK = threading.Lock()
+
+
+@contextmanager
+def timed(stage: str, label: str = ""):
+    """
+    Record how long the wrapped block takes.
+
+    ``stage`` is the coarse step (e.g. "fetch", "compute", "render") and
+    ``label`` says what was run (e.g. the ticker or the function).
+    """
+    start = time.perf_counter()
+    try:
+        with span(f"stage.{stage}", label=label):
+            yield
+    finally:
+        record_timing(stage, label, time.perf_counter() - start)
+
+
+def record_timing(stage: str, label: str, seconds: float):
+    with _LOCK:
+        _TIMINGS.append({
+            "time": time.time(),
+            "stage": stage,
+            "label": label,
+            "ms": seconds * 1000.0,
+        })
+
+
+def recent_timings(limit: int | None = None) -> list:
+    """Return the recorded timings, most recent first."""
+    with _LOCK:
+        items = list(_TIMINGS)
+    items.reverse()
+    return items[:limit] if limit else items
@@ -0,0 +1,279 @@
+"""
+Lightweight spans and timers for the hot paths (data, strategies, engine,
+metrics, charts).
+
+Tracing is off by default. When disabled, ``span`` returns a shared no-op
+context manager and ``traced`` functions call straight through, so the
+instrumentation costs one flag check per call. When enabled, every span is
+emitted as a structured (JSON) log line on the ``pglff.trace`` logger and
+aggregated for p50 / p95 / p99 latencies, which can also be scraped in
+Prometheus text format. The all-session aggregate has a fixed size per
+span name; per-session data is kept for the most recently active
+sessions only, and dropped once a session has been idle for a while.
+"""
+import contextvars
+import functools
+import json
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict, defaultdict, deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import numpy as np
+
+from src.data.cache import read_config
+
+logger = logging.getLogger("pglff.trace")
+
+_ENABLED = os.environ.get("PGLFF_TRACING", "").lower() in ("1", "true", "yes")
+
+# Durations kept per span name (and per session and span name), for the percentiles
+_RESERVOIR_SIZE = 1000
+# Sessions with their own durations: the most recently active ones, idle
+# for less than _SESSION_IDLE_S
+_MAX_SESSIONS = 100
+_SESSION_IDLE_S = 30 * 60.0
+
+_session_id = contextvars.ContextVar("pglff_session_id", default="-")
+_parent_span = contextvars.ContextVar("pglff_parent_span", default=None)
+
+_LOCK = threading.Lock()
+_DURATIONS = defaultdict(lambda: deque(maxlen=_RESERVOIR_SIZE))  # name -> seconds, all sessions
+_TOTALS = defaultdict(lambda: [0, 0.0])  # name -> [count, sum of seconds]
+# session -> (last activity, {name -> seconds}), least recently active first
+_SESSIONS = OrderedDict()
+
+_SERVER = None
+
+
+def is_enabled() -> bool:
+    return _ENABLED
+
+
+def enable(flag: bool = True):
+    global _ENABLED
+    _ENABLED = flag
+
+
+def disable():
+    enable(False)
+
+
+def set_session(session_id: str):
+    """Attach the following spans (in this thread / context) to a session."""
+    _session_id.set(str(session_id))
+
+
+class _NoopSpan:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NOOP = _NoopSpan()
+
+
+class _Span:
+    __slots__ = ("name", "attrs", "start", "token")
+
+    def __init__(self, name, attrs):
+        self.name = name
+        self.attrs = attrs
+
+    def __enter__(self):
+        self.token = _parent_span.set(self.name)
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        duration = time.perf_counter() - self.start
+        _parent_span.reset(self.token)
+        _record(self.name, duration, self.attrs, error=exc_type is not None)
+        return False
+
+
+def span(name: str, **attrs):
+    """Time the wrapped block as a span called ``name``."""
+    if not _ENABLED:
+        return _NOOP
+    return _Span(name, attrs)
+
+
+def traced(name: str | None = None):
+    """Decorator: run every call of the function inside a span."""
+    def decorator(fn):
+        span_name = name or f"{fn.__module__}.{fn.__qualname__}"
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            if not _ENABLED:
+                return fn(*args, **kwargs)
+            with _Span(span_name, {}):
+                return fn(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
+
+
+def _session_durations(session, now):
+    """Durations of ``session`` (created if needed); drops idle and surplus sessions. Under _LOCK."""
+    entry = _SESSIONS.pop(session, None)
+    durations = entry[1] if entry is not None else defaultdict(lambda: deque(maxlen=_RESERVOIR_SIZE))
+    _SESSIONS[session] = (now, durations)
+    while len(_SESSIONS) > _MAX_SESSIONS:
+        _SESSIONS.popitem(last=False)
+    while _SESSIONS:
+        oldest, (last, _) = next(iter(_SESSIONS.items()))
+        if now - last <= _SESSION_IDLE_S:
+            break
+        del _SESSIONS[oldest]
+    return durations
+
+
+def _record(name, duration, attrs, error=False):
+    session = _session_id.get()
+    with _LOCK:
+        _session_durations(session, time.monotonic())[name].append(duration)
+        _DURATIONS[name].append(duration)
+        totals = _TOTALS[name]
+        totals[0] += 1
+        totals[1] += duration
+
+    if logger.isEnabledFor(logging.INFO):
+        logger.info(json.dumps({
+            "ts": time.time(),
+            "span": name,
+            "parent": _parent_span.get(),
+            "session": session,
+            "ms": round(duration * 1000.0, 3),
+            "error": error,
+            **{k: str(v) for k, v in attrs.items()},
+        }))
+
+
+def latency_summary(session: str | None = None) -> list:
+    """
+    p50 / p95 / p99 latency (ms) per span name.
+
+    Aggregates the given session only (empty once it has been dropped),
+    or all sessions when ``session`` is None.
+    """
+    with _LOCK:
+        if session is None:
+            source = _DURATIONS
+        else:
+            source = _SESSIONS[session][1] if session in _SESSIONS else {}
+        by_name = {name: list(values) for name, values in source.items() if values}
+
+    rows = []
+    for name, values in sorted(by_name.items()):
+        arr = np.asarray(values) * 1000.0
+        p50, p95, p99 = np.percentile(arr, [50, 95, 99])
+        rows.append({
+            "span": name,
+            "count": len(arr),
+            "p50_ms": float(p50),
+            "p95_ms": float(p95),
+            "p99_ms": float(p99),
+        })
+    return rows
+
+
+def sessions() -> list:
+    """Sessions whose own latencies are still kept."""
+    with _LOCK:
+        return sorted(_SESSIONS)
+
+
+def reset():
+    with _LOCK:
+        _DURATIONS.clear()
+        _TOTALS.clear()
+        _SESSIONS.clear()
+
+
+def prometheus_text() -> str:
+    """Export the spans as a Prometheus summary (text exposition format)."""
+    lines = [
+        "# HELP pglff_span_seconds Latency of instrumented code paths.",
+        "# TYPE pglff_span_seconds summary",
+    ]
+    with _LOCK:
+        totals = {name: tuple(v) for name, v in _TOTALS.items()}
+    summary = {row["span"]: row for row in latency_summary()}
+    for name, (count, total) in sorted(totals.items()):
+        row = summary.get(name)
+        if row is not None:
+            for q, col in (("0.5", "p50_ms"), ("0.95", "p95_ms"), ("0.99", "p99_ms")):
+                lines.append(
+                    f'pglff_span_seconds{{span="{name}",quantile="{q}"}} {row[col] / 1000.0:.6f}'
+                )
+        lines.append(f'pglff_span_seconds_sum{{span="{name}"}} {total:.6f}')
+        lines.append(f'pglff_span_seconds_count{{span="{name}"}} {count}')
+    return "\n".join(lines) + "\n"
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.rstrip("/") not in ("", "/metrics"):
+            self.send_error(404)
+            return
+        body = prometheus_text().encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def start_metrics_server(port: int = 9464, host: str = "127.0.0.1"):
+    """Serve ``/metrics`` on a background thread (once per process)."""
+    global _SERVER
+    with _LOCK:
+        if _SERVER is not None:
+            return _SERVER
+        _SERVER = ThreadingHTTPServer((host, port), _MetricsHandler)
+    threading.Thread(target=_SERVER.serve_forever, name="pglff-metrics", daemon=True).start()
+    return _SERVER
+
+
+_INITIALISED = False
+
+
+def init_tracing():
+    """
+    Apply the ``tracing`` section of config.yaml (once per process).
+
+    tracing:
+      enabled: true
+      metrics_port: 9464   # optional, serves /metrics
+    """
+    global _INITIALISED
+    if _INITIALISED:
+        return
+    _INITIALISED = True
+
+    cfg = read_config().get("tracing", {}) or {}
+
+    if cfg.get("enabled"):
+        enable()
+        if not logger.handlers:
+            handler = logging.StreamHandler()
+            handler.setFormatter(logging.Formatter("%(message)s"))
+            logger.addHandler(handler)
+            logger.setLevel(logging.INFO)
+    if _ENABLED and cfg.get("metrics_port"):
+        try:
+            start_metrics_server(int(cfg["metrics_port"]))
+        except OSError as e:
+            logger.warning(f"Could not start metrics server: {e}")
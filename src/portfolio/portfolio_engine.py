@@ -1,8 +1,239 @@
 import numpy as np
 import pandas as pd
 
+from src.data.precision import float_dtype
+from src.data.result_store import memoized
+from src.jobs.runner import report_progress
+from src.kernels.rebalancing import band_rebalance
+from src.monitoring.tracing import traced
 
-def compute_portfolio_returns(returns_df, weights, rebalancing="daily"):
+
+# Rebalancing mode -> pandas period of the rebalancing calendar
+_REBALANCING_PERIODS = {"monthly": "M", "quarterly": "Q"}
+# Sums and compounding run on float64 row blocks of about this many
+# elements, so temporaries stay bounded and float32 inputs (compact mode)
+# still accumulate in float64
+_BLOCK_ELEMENTS = 1 << 20
+# "band" mode: largest absolute drift of a weight before rebalancing
+DEFAULT_BAND = 0.05
+
+
+def _normalize(w, n):
+    """Rows of ``w`` scaled to sum to 1 (rows summing to 0 -> equal weights)."""
+    total = w.sum(axis=-1, keepdims=True)
+    return np.where(total == 0, 1.0 / n, w / np.where(total == 0, 1.0, total))
+
+
+def _target_weights(returns_df, weights):
+    """
+    Target weights in force for the return of each row, as a (rows, assets) array.
+
+    A static vector applies to every row. For a dated schedule (DataFrame,
+    dates x assets), the return of row t uses the last schedule row dated
+    on or before row t-1: a decision taken on day d is implemented at the
+    close of d. Rows before the first schedule date use its first row.
+    """
+    columns = returns_df.columns
+    n_rows, n_assets = returns_df.shape
+
+    if isinstance(weights, pd.DataFrame):
+        schedule = weights.reindex(columns=columns).astype(float).fillna(0.0).sort_index()
+        if schedule.empty:
+            raise ValueError("Weight schedule is empty.")
+        targets = _normalize(schedule.to_numpy(), n_assets)
+        dates = pd.DatetimeIndex(schedule.index).as_unit("ns").asi8
+        stamps = pd.DatetimeIndex(returns_df.index).as_unit("ns").asi8
+        prev = np.concatenate(([np.iinfo(np.int64).min], stamps[:-1]))
+        in_force = np.clip(np.searchsorted(dates, prev, side="right") - 1, 0, None)
+        return targets[in_force], in_force
+
+    if isinstance(weights, pd.Series):
+        w = weights.reindex(columns).astype(float)
+    else:
+        w = pd.Series(weights, index=columns, dtype=float)
+    w = _normalize(w.fillna(0.0).to_numpy()[None, :], n_assets)
+    return np.broadcast_to(w, (n_rows, n_assets)), np.zeros(n_rows, dtype=np.int64)
+
+
+def _returns_array(returns_df, copy=False):
+    """Returns as a float32 (compact frames) or float64 array; ``copy``: NaN -> 0."""
+    R = returns_df.to_numpy(dtype=float_dtype(returns_df), copy=copy)
+    if copy:
+        np.nan_to_num(R, copy=False, nan=0.0)
+    return R
+
+
+def _row_blocks(n_rows, n_assets):
+    step = max(1, _BLOCK_ELEMENTS // max(n_assets, 1))
+    return [(lo, min(lo + step, n_rows)) for lo in range(0, n_rows, step)]
+
+
+def _float64_block(R, lo, hi):
+    # float64 copy of rows lo:hi with missing returns counted as 0
+    block = R[lo:hi].astype(np.float64)
+    np.nan_to_num(block, copy=False, nan=0.0)
+    return block
+
+
+def _weighted_sum(R, targets):
+    """Row sums of ``targets * R`` (missing returns as 0), in float64."""
+    out = np.empty(len(R))
+    static = targets.strides[0] == 0  # one vector broadcast over the rows
+    for lo, hi in _row_blocks(*R.shape):
+        block = _float64_block(R, lo, hi)
+        out[lo:hi] = block @ targets[0] if static else np.einsum("ij,ij->i", block, targets[lo:hi])
+    return out
+
+
+def _rebalance_rows(index, mode, in_force):
+    """
+    Rows at whose close the portfolio is rebalanced.
+
+    Rule-based rebalancing happens on the first row of each new month /
+    quarter; a schedule rebalances as well when a new schedule row comes
+    into force for the next row.
+    """
+    rows = np.zeros(len(index), dtype=bool)
+    freq = _REBALANCING_PERIODS.get(mode)
+    if freq is not None and len(index) > 1:
+        codes = pd.DatetimeIndex(index).to_period(freq).asi8
+        rows[1:] |= codes[1:] != codes[:-1]
+    rows[:-1] |= in_force[1:] != in_force[:-1]
+    rows[-1] = False
+    return np.flatnonzero(rows)
+
+
+def _band_rows(R, targets, band, scheduled_rows):
+    """
+    Rows at whose close a weight has drifted more than ``band`` from its
+    target, plus the scheduled ones (path-dependent: see src/kernels).
+    """
+    scheduled = np.zeros(len(R), dtype=bool)
+    scheduled[scheduled_rows] = True
+    return np.flatnonzero(band_rebalance(R, targets, float(band), scheduled))
+
+
+def _simulate_segments(R, targets, rebalance_rows, details=False):
+    """
+    Buy-and-hold between rebalancing rows, vectorized per segment.
+
+    Within a segment the positions are the value at its start times the
+    target weights times the cumulated asset growth; at the close of the
+    segment's last row everything is rebalanced to the next targets.
+    Growth is compounded in float64 over row blocks (missing returns as 0).
+    Returns the portfolio value of each row (starting capital 1) and, with
+    ``details``, the pre-trade positions (in the dtype of ``R``).
+    """
+    n_rows, n_assets = R.shape
+    values = np.empty(n_rows)
+    positions = np.empty((n_rows, n_assets), dtype=R.dtype) if details else None
+    step = _row_blocks(n_rows, n_assets)[0][1] if n_rows else 1
+
+    ends = np.append(rebalance_rows, n_rows - 1)
+    start, capital = 0, 1.0
+    for i, end in enumerate(ends):
+        if i % 256 == 0:
+            report_progress(i, len(ends), "simulating")
+        held = capital * targets[start]
+        for lo in range(start, end + 1, step):
+            hi = min(lo + step, end + 1)
+            pos = _float64_block(R, lo, hi)
+            pos += 1.0
+            np.cumprod(pos, axis=0, out=pos)
+            pos *= held
+            values[lo:hi] = pos.sum(axis=1)
+            if details:
+                positions[lo:hi] = pos
+            held = pos[-1]
+        capital = values[end]
+        start = end + 1
+    return values, positions
+
+
+def _details(index, columns, values, pre_weights, post_weights, targets):
+    """Holdings (post-trade values), drift from target and turnover per asset."""
+    # Same dtype as the weights (float32 in compact mode)
+    dtype = pre_weights.dtype
+    turnover = np.subtract(post_weights, pre_weights, dtype=dtype)
+    np.abs(turnover, out=turnover)
+    frame = lambda a: pd.DataFrame(a, index=index, columns=columns, copy=False)  # noqa: E731
+    return {
+        "holdings": frame(np.multiply(post_weights, values[:, None], dtype=dtype)),
+        "weights": frame(post_weights),
+        "drift": frame(np.subtract(pre_weights, targets, dtype=dtype)),
+        "turnover": frame(turnover),
+        "total_turnover": pd.Series(
+            0.5 * turnover.sum(axis=1, dtype=np.float64), index=index, name="turnover"
+        ),
+    }
+
+
+@traced("engine.run_portfolio")
+def run_portfolio(returns_df, weights, rebalancing="daily", band=DEFAULT_BAND):
+    """
+    Simulate a portfolio and return its returns with holdings, drift and turnover.
+
+    Parameters
+    ----------
+    returns_df : pd.DataFrame
+        Asset returns, one column per asset, index = dates.
+    weights : list / array / pd.Series / pd.DataFrame
+        Static target weights, or a dated weight schedule (DataFrame with
+        one row per decision date and one column per asset). Each row is
+        normalised to sum to 1.
+    rebalancing : str
+        "daily", "monthly", "quarterly", "band" or "none" (see
+        ``compute_portfolio_returns``). With a schedule, every new
+        schedule row also triggers a rebalancing.
+    band : float
+        Drift threshold of the "band" mode.
+
+    Returns
+    -------
+    dict
+        "returns" (pd.Series, as ``compute_portfolio_returns``), "value"
+        (portfolio value, starting capital 1) and, as DataFrames (rows x
+        assets): "holdings" (post-trade position values), "weights"
+        (post-trade weights), "drift" (pre-trade weights minus the
+        target) and "turnover" (absolute weight traded); plus
+        "total_turnover" (one-way turnover per row).
+    """
+    mode = (rebalancing or "daily").lower()
+    index, columns = returns_df.index, returns_df.columns
+    # Working copy (NaN -> 0), float32 for compact frames: the per-asset
+    # outputs are computed into it or into arrays of its dtype
+    R = _returns_array(returns_df, copy=True)
+    targets, in_force = _target_weights(returns_df, weights)
+
+    if mode == "daily":
+        # Constant mix: back to the target at every close
+        port = _weighted_sum(R, targets)
+        values = np.cumprod(1.0 + port)
+        pre = R
+        pre += 1.0
+        pre *= targets
+        pre /= np.where(port == -1.0, 1.0, 1.0 + port)[:, None]
+        post = np.vstack([targets[1:], pre[-1:]], dtype=R.dtype)
+        returns = pd.Series(port, index=index)
+    else:
+        rebalance_rows = _rebalance_rows(index, mode, in_force)
+        if mode == "band":
+            rebalance_rows = _band_rows(R, targets, band, rebalance_rows)
+        values, pre = _simulate_segments(R, targets, rebalance_rows, details=True)
+        del R
+        pre /= np.where(values == 0, 1.0, values)[:, None]
+        post = pre.copy()
+        post[rebalance_rows] = targets[rebalance_rows + 1]
+        returns = pd.Series(values, index=index).pct_change().dropna()
+
+    result = {"returns": returns, "value": pd.Series(values, index=index, name="portfolio_value")}
+    result.update(_details(index, columns, values, pre, post, targets))
+    return result
+
+
+@traced("engine.compute_portfolio_returns")
+@memoized
+def compute_portfolio_returns(returns_df, weights, rebalancing="daily", band=DEFAULT_BAND):
     """
     Compute portfolio returns with different rebalancing rules.
 
@@ -10,84 +241,48 @@ def compute_portfolio_returns(returns_df, weights, rebalancing="daily"):
     ----------
     returns_df : pd.DataFrame
         Asset returns, one column per asset, index = dates.
-    weights : list / array / pd.Series
-        Target weights for each asset (will be normalised to sum to 1).
+    weights : list / array / pd.Series / pd.DataFrame
+        Target weights for each asset (will be normalised to sum to 1), or
+        a dated weight schedule (dates x assets, see ``run_portfolio``).
     rebalancing : str
         "daily"     -> rebalance every day (constant weights, classical formula)
         "none"      -> buy and hold, no rebalancing
         "monthly"   -> rebalance at the beginning of each new month
         "quarterly" -> rebalance at the beginning of each new quarter
+        "band"      -> rebalance when a weight drifts more than ``band``
+                       (absolute) from its target
+    band : float
+        Drift threshold of the "band" mode (e.g. 0.05 = 5 points).
 
     Returns
     -------
     pd.Series
         Portfolio returns time series.
     """
-
-    # Align weights with returns_df columns
-    if isinstance(weights, pd.Series):
-        w = weights.reindex(returns_df.columns).astype(float)
-    else:
-        w = pd.Series(weights, index=returns_df.columns, dtype=float)
-
-    # Normalise weights
-    w = w.fillna(0.0)
-    if w.sum() == 0:
-        # Fallback equal weights if everything is zero
-        w = pd.Series(1.0 / len(returns_df.columns), index=returns_df.columns)
-    else:
-        w = w / w.sum()
-
     mode = (rebalancing or "daily").lower()
+    targets, in_force = _target_weights(returns_df, weights)
+
+    # No full-size copy of the returns: both paths read float64 row blocks
+    R = _returns_array(returns_df)
 
     # Case 1: daily rebalancing (original behaviour)
     if mode == "daily":
-        # Each day: r_p(t) = sum_i w_i * r_i(t)
-        portfolio_returns = (returns_df * w).sum(axis=1)
-        return portfolio_returns
-
-    # Other modes: simulate asset values and rebalance on given dates
-    # Start from initial capital = 1
-    asset_values = w.copy()  # allocation of 1 unit of capital
-    portfolio_values = pd.Series(index=returns_df.index, dtype=float)
-
-    # Configure rebalancing frequency
-    if mode == "none":
-        freq = None
-    elif mode == "monthly":
-        freq = "M"
-    elif mode == "quarterly":
-        freq = "Q"
-    else:
-        # Unknown mode -> fallback to no rebalancing
-        freq = None
-
-    last_period = None
+        # Each day: r_p(t) = sum_i w_i(t) * r_i(t)
+        return pd.Series(_weighted_sum(R, targets), index=returns_df.index)
 
-    for date, row in returns_df.iterrows():
-        # Apply asset returns for this day (ignore NaN returns)
-        asset_values = asset_values * (1.0 + row.fillna(0.0))
-        total_value = asset_values.sum()
-        portfolio_values.at[date] = total_value
-
-        # No rebalancing: continue
-        if freq is None:
-            continue
-
-        # Determine the current period (month or quarter)
-        period = date.to_period(freq)
-
-        if last_period is None:
-            last_period = period
-        elif period != last_period:
-            # New period -> rebalance asset_values back to target weights
-            asset_values = total_value * w
-            last_period = period
+    # Other modes: hold the positions between rebalancing dates, one
+    # vectorized segment at a time (unknown modes -> no rebalancing)
+    rebalance_rows = _rebalance_rows(returns_df.index, mode, in_force)
+    if mode == "band":
+        rebalance_rows = _band_rows(R, targets, band, rebalance_rows)
+    values, _ = _simulate_segments(R, targets, rebalance_rows)
 
     # Convert portfolio values into returns
-    portfolio_returns = portfolio_values.pct_change().dropna()
+    portfolio_returns = pd.Series(values, index=returns_df.index).pct_change().dropna()
     return portfolio_returns
 
+
+@traced("engine.compute_cumulative_value")
 def compute_cumulative_value(portfolio_returns, initial_value=100.0):
     """Compute cumulative portfolio value starting from initial_value."""
     cum_value = (1 + portfolio_returns).cumprod() * initial_value
@@ -95,6 +290,8 @@ def compute_cumulative_value(portfolio_returns, initial_value=100.0):
     return cum_value
 
 
+@traced("engine.portfolio_stats")
+@memoized
 def portfolio_stats(portfolio_returns, periods_per_year=252):
     """Compute annual return, annual volatility and approximate Sharpe ratio."""
     mean_daily = portfolio_returns.mean()
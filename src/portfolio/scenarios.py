@@ -0,0 +1,276 @@
+"""
+Historical stress tests and hypothetical factor shocks.
+
+A scenario is a window of asset returns: the returns of the universe over
+a past crisis, or a one-step shock built from the statistical factors of
+``factors.py`` (e.g. the first factor moving 3 standard deviations over a
+month). The scenarios of a universe are stacked once into a zero-padded
+(scenarios, rows, assets) tensor and cached, so applying them to any set
+of portfolios is a few array operations:
+
+    within a segment between rebalancing rows, a portfolio grows by
+    w . (G_t / G_start), G = cumulated asset growth,
+
+with the segments given by the same rules as ``compute_portfolio_returns``
+(daily, monthly, quarterly or none). Every scenario and every candidate
+portfolio is evaluated in one batched matrix product. Band rebalancing
+depends on each portfolio's path: its rows come from the band kernel, one
+portfolio at a time.
+
+Assets without data over a window (listed later) earn a zero return in
+it; ``coverage`` reports how much of each portfolio that concerns.
+"""
+from typing import NamedTuple
+
+import numpy as np
+import pandas as pd
+
+from src.data.cache import LRUCache
+from src.monitoring.tracing import traced
+from src.portfolio.factors import pca_factors
+from src.kernels.rebalancing import band_rebalance
+from src.portfolio.portfolio_engine import DEFAULT_BAND, _normalize, _rebalance_rows
+
+# name -> (first close, last close) of the window
+HISTORICAL_SCENARIOS = {
+    "Global financial crisis (Sep 2008 - Mar 2009)": ("2008-09-01", "2009-03-09"),
+    "Euro debt crisis (Jul - Oct 2011)": ("2011-07-22", "2011-10-03"),
+    "China devaluation (Aug 2015)": ("2015-08-10", "2015-08-25"),
+    "Q4 2018 selloff": ("2018-10-01", "2018-12-24"),
+    "COVID crash (Feb - Mar 2020)": ("2020-02-19", "2020-03-23"),
+    "2022 rate shock (Jan - Oct 2022)": ("2022-01-03", "2022-10-12"),
+}
+
+# name -> ({factor: move in standard deviations}, horizon in rows)
+HYPOTHETICAL_SHOCKS = {
+    "First factor -3 sd (1 month)": ({"PC1": -3.0}, 21),
+    "First factor -5 sd (1 month)": ({"PC1": -5.0}, 21),
+    "Second factor -3 sd (1 month)": ({"PC2": -3.0}, 21),
+    "Second factor +3 sd (1 month)": ({"PC2": 3.0}, 21),
+}
+
+# Rows of recent returns the factor shocks are estimated on
+FACTOR_LOOKBACK = 3 * 252
+
+# Scenario tensors per universe, keyed on (tickers, period, interval)
+SCENARIO_CACHE = LRUCache("scenarios", max_bytes=128 * 1024 * 1024, ttl=12 * 3600)
+
+
+class ScenarioSet(NamedTuple):
+    names: list
+    kinds: list  # "historical" or "hypothetical"
+    tickers: list
+    # (scenarios, rows, assets): returns, zero after each scenario's last row
+    returns: np.ndarray
+    # Dates of the rows of each scenario (the shock date for hypothetical ones)
+    dates: list
+    # (scenarios, assets): the asset has returns over the whole window
+    coverage: np.ndarray
+
+
+def _universe_returns(histories: dict) -> pd.DataFrame:
+    """
+    Returns of every asset on the union of their calendars.
+
+    Prices are carried forward over closures (a closed asset earns 0) and
+    are missing before an asset's first observation.
+    """
+    from src.data.alignment import _price_arrays, get_alignment
+
+    tickers = list(histories)
+    arrays = [_price_arrays(histories[t]) for t in tickers]
+    al = get_alignment(tickers, [index for index, _ in arrays])
+    prices = np.full(al.positions.shape, np.nan)
+    for j, (_, values) in enumerate(arrays):
+        observed = al.positions[:, j] >= 0
+        prices[observed, j] = values[al.positions[observed, j]]
+    returns = prices[1:] / prices[:-1] - 1.0
+    return pd.DataFrame(returns, index=al.calendar[1:], columns=tickers)
+
+
+def factor_shock(model, shocks: dict, horizon: int) -> np.ndarray:
+    """
+    Asset returns implied by moving factors by ``shocks`` standard deviations
+    over ``horizon`` rows (specific returns and drift set to zero).
+    """
+    z = np.array([shocks.get(f, 0.0) for f in model.loadings.columns])
+    moves = z * np.sqrt(model.factor_variance.to_numpy() * horizon)
+    return np.clip(model.loadings.to_numpy() @ moves, -1.0, None)
+
+
+def scenarios_from_returns(returns_df, historical=None, hypothetical=None, n_factors=3) -> ScenarioSet:
+    """
+    Stack the scenario windows of a universe.
+
+    Parameters
+    ----------
+    returns_df : pd.DataFrame
+        Asset returns (NaN where an asset has no data), index = dates.
+    historical : dict
+        name -> (start, end): the returns dated after ``start`` up to
+        ``end`` (close to close). Defaults to HISTORICAL_SCENARIOS;
+        windows with no data are skipped.
+    hypothetical : dict
+        name -> ({factor: sd}, horizon), applied to a PCA model of the last
+        FACTOR_LOOKBACK rows. Defaults to HYPOTHETICAL_SHOCKS.
+    """
+    historical = HISTORICAL_SCENARIOS if historical is None else historical
+    hypothetical = HYPOTHETICAL_SHOCKS if hypothetical is None else hypothetical
+    tickers = list(returns_df.columns)
+    index = pd.DatetimeIndex(returns_df.index)
+    values = returns_df.to_numpy(dtype=np.float64)
+
+    names, kinds, windows, dates, coverage = [], [], [], [], []
+    for name, (start, end) in historical.items():
+        start, end = pd.Timestamp(start), pd.Timestamp(end)
+        if index.tz is not None:
+            start, end = start.tz_localize(index.tz), end.tz_localize(index.tz)
+        lo, hi = index.searchsorted(start, side="right"), index.searchsorted(end, side="right")
+        window = values[lo:hi]
+        covered = ~np.isnan(window).any(axis=0) if len(window) else np.zeros(len(tickers), dtype=bool)
+        if not covered.any():
+            continue
+        names.append(name)
+        kinds.append("historical")
+        windows.append(np.nan_to_num(window, nan=0.0))
+        dates.append(index[lo:hi])
+        coverage.append(covered)
+
+    recent = returns_df.iloc[-FACTOR_LOOKBACK:].dropna(axis=1, how="all")
+    if hypothetical and len(recent) > 2 and recent.shape[1] > 0:
+        model = pca_factors(recent, k=n_factors)
+        for name, (shocks, horizon) in hypothetical.items():
+            if not set(shocks) <= set(model.loadings.columns):
+                continue  # fewer factors than the shock needs
+            shock = pd.Series(factor_shock(model, shocks, horizon), index=recent.columns)
+            names.append(name)
+            kinds.append("hypothetical")
+            windows.append(shock.reindex(tickers).fillna(0.0).to_numpy()[None, :])
+            dates.append(index[-1:])
+            coverage.append(np.isin(tickers, recent.columns))
+
+    n_rows = max((len(w) for w in windows), default=0)
+    tensor = np.zeros((len(windows), n_rows, len(tickers)))
+    for s, window in enumerate(windows):
+        tensor[s, : len(window)] = window
+    return ScenarioSet(names, kinds, tickers, tensor, dates, np.array(coverage, dtype=bool).reshape(len(windows), -1))
+
+
+def build_scenarios(tickers, period="max", interval="1d") -> ScenarioSet:
+    """
+    Scenario set of a universe from its longest histories (cached per universe).
+    """
+    from src.data.fetch_yf import get_history
+
+    def compute():
+        histories = {}
+        for t in tickers:
+            df = get_history(t, period=period, interval=interval)
+            if df is not None and not df.empty:
+                histories[t] = df
+        if not histories:
+            return ScenarioSet([], [], list(tickers), np.zeros((0, 0, len(tickers))), [], np.zeros((0, len(tickers)), bool))
+        returns_df = _universe_returns(histories).reindex(columns=list(tickers))
+        return scenarios_from_returns(returns_df)
+
+    return SCENARIO_CACHE.get_or_compute((tuple(tickers), period, interval), compute)
+
+
+def _portfolio_matrix(portfolios, tickers):
+    # (portfolios, assets) normalized weights and their names
+    if isinstance(portfolios, pd.DataFrame):
+        frame = portfolios
+    elif isinstance(portfolios, dict):
+        frame = pd.DataFrame({name: pd.Series(w, index=tickers) if not isinstance(w, pd.Series) else w
+                              for name, w in portfolios.items()}).T
+    else:
+        w = portfolios if isinstance(portfolios, pd.Series) else pd.Series(portfolios, index=tickers)
+        frame = w.rename("Portfolio").to_frame().T
+    W = frame.reindex(columns=tickers).astype(float).fillna(0.0).to_numpy()
+    return _normalize(W, len(tickers)), [str(n) for n in frame.index]
+
+
+def _rebalance_mask(scenarios: ScenarioSet, mode):
+    # (scenarios, rows): rebalance at the close of the row
+    S, T, _ = scenarios.returns.shape
+    if mode == "daily":
+        return np.ones((S, T), dtype=bool)
+    mask = np.zeros((S, T), dtype=bool)
+    if mode in ("monthly", "quarterly"):
+        for s, dates in enumerate(scenarios.dates):
+            rows = _rebalance_rows(dates, mode, np.zeros(len(dates), dtype=np.int64))
+            mask[s, rows] = True
+    return mask
+
+
+def _band_mask(scenarios: ScenarioSet, w, band):
+    # (scenarios, rows): rows at whose close portfolio ``w`` leaves its band
+    S, T, N = scenarios.returns.shape
+    targets = np.broadcast_to(w, (T, N))
+    scheduled = np.zeros(T, dtype=bool)
+    return np.array([band_rebalance(scenarios.returns[s], targets, float(band), scheduled) for s in range(S)])
+
+
+def _values(R, rebalance, W):
+    # (scenarios, rows, portfolios) value of each portfolio, starting at 1
+    S, T, _ = R.shape
+    # Growth of each asset since the start of its segment
+    G = np.cumprod(1.0 + R, axis=1)
+    starts = np.ones((S, T), dtype=bool)
+    starts[:, 1:] = rebalance[:, :-1]
+    first = np.maximum.accumulate(np.where(starts, np.arange(T), 0), axis=1)
+    base = np.take_along_axis(np.concatenate([np.ones((S, 1, R.shape[2])), G], axis=1), first[:, :, None], axis=1)
+    growth = G / np.where(base == 0.0, 1.0, base)
+
+    # Value relative to the segment start
+    segment = growth @ W.T
+    closes = np.where(rebalance[:, :, None], segment, 1.0)
+    carried = np.cumprod(np.concatenate([np.ones((S, 1, len(W))), closes[:, :-1]], axis=1), axis=1)
+    return carried * segment
+
+
+@traced("portfolio.stress_test")
+def stress_test(scenarios: ScenarioSet, portfolios, rebalancing="none", band=DEFAULT_BAND) -> dict:
+    """
+    Apply every scenario to every portfolio.
+
+    Parameters
+    ----------
+    scenarios : ScenarioSet
+        From ``build_scenarios`` or ``scenarios_from_returns``.
+    portfolios : pd.Series / array / dict / pd.DataFrame
+        One weight vector, a dict name -> weights, or a DataFrame with one
+        row per portfolio and one column per asset. Weights are normalised.
+    rebalancing : str
+        "daily", "monthly", "quarterly", "band" or "none", as in
+        ``compute_portfolio_returns``.
+    band : float
+        Drift threshold of the "band" mode.
+
+    Returns
+    -------
+    dict
+        DataFrames (scenarios x portfolios): "total_return" and
+        "max_drawdown" over the window (decimals), and "coverage" (share
+        of the weight on assets with data over the window).
+    """
+    W, names = _portfolio_matrix(portfolios, scenarios.tickers)
+    R = scenarios.returns
+    S, T, _ = R.shape
+    frame = lambda a: pd.DataFrame(a, index=scenarios.names, columns=names)  # noqa: E731
+    if S == 0 or T == 0:
+        empty = np.zeros((S, len(names)))
+        return {"total_return": frame(empty), "max_drawdown": frame(empty), "coverage": frame(empty)}
+
+    mode = (rebalancing or "daily").lower()
+    if mode == "band":
+        value = np.concatenate([_values(R, _band_mask(scenarios, w, band), w[None, :]) for w in W], axis=2)
+    else:
+        value = _values(R, _rebalance_mask(scenarios, mode), W)
+
+    peak = np.maximum(np.maximum.accumulate(value, axis=1), 1.0)
+    return {
+        "total_return": frame(value[:, -1] - 1.0),
+        "max_drawdown": frame((value / peak - 1.0).min(axis=1)),
+        "coverage": frame(scenarios.coverage @ W.T),
+    }
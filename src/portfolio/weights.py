@@ -38,3 +38,200 @@ def clip_and_normalize(raw_weights, tickers, min_weight=0.0, max_weight=1.0):
         raise ValueError("Sum of weights after clipping is zero, cannot normalize.")
 
     return s_clipped / total
+
+
+def load_weight_schedule(source, tickers=None):
+    """
+    Read a dated weight schedule (CSV: a date column, then one column per ticker).
+
+    Each row gives the target weights decided on that date. Rows are
+    sorted by date and normalized to sum to 1; tickers missing from the
+    file get a weight of 0.
+    """
+    df = pd.read_csv(source)
+    if df.shape[1] < 2:
+        raise ValueError("Weight schedule needs a date column and at least one ticker column.")
+
+    dates = pd.to_datetime(df.iloc[:, 0], errors="coerce")
+    if dates.isna().any():
+        raise ValueError("Weight schedule has invalid dates in its first column.")
+    schedule = df.iloc[:, 1:].apply(pd.to_numeric, errors="coerce").fillna(0.0)
+    schedule.index = pd.DatetimeIndex(dates, name="Date")
+    schedule = schedule[~schedule.index.duplicated(keep="last")].sort_index()
+
+    if tickers is not None:
+        schedule = schedule.reindex(columns=list(tickers), fill_value=0.0)
+    if (schedule < 0).to_numpy().any():
+        raise ValueError("Weight schedule has negative weights.")
+
+    total = schedule.sum(axis=1)
+    if (total == 0).any():
+        raise ValueError("Weight schedule has rows whose weights sum to zero.")
+    return schedule.div(total, axis=0)
+
+
+# ---- Risk-based allocations ----
+
+# Last risk-parity solution per universe, to warm-start the next solve
+_ERC_LAST = {}
+_ERC_LAST_MAX = 64
+
+
+def _covariance(data):
+    """Covariance matrix (DataFrame) from a returns frame or a covariance frame."""
+    if not isinstance(data, pd.DataFrame):
+        raise TypeError("Expected a returns DataFrame or a covariance DataFrame.")
+    if data.shape[0] == data.shape[1] and data.index.equals(data.columns):
+        cov = data
+    else:
+        cov = data.cov()
+    if cov.shape[0] == 0:
+        raise ValueError("Cannot build weights from an empty frame.")
+    values = cov.to_numpy(dtype=float)
+    if np.isnan(values).any():
+        raise ValueError("Covariance has missing values (too little overlapping history).")
+    return pd.DataFrame(values, index=cov.index, columns=cov.columns)
+
+
+def _bounded(w, min_weight=0.0, max_weight=1.0):
+    """
+    Weights summing to 1 within [min_weight, max_weight], as close as
+    possible to the proportions of ``w``.
+
+    Unlike a single clip-then-normalize, the weight removed from (or
+    added to) the assets at a bound is redistributed over the others
+    until every bound holds.
+    """
+    w = np.asarray(w, dtype=float)
+    n = len(w)
+    if n * min_weight > 1 + 1e-12 or n * max_weight < 1 - 1e-12:
+        raise ValueError(f"Weight bounds [{min_weight}, {max_weight}] are infeasible for {n} assets.")
+    w = np.clip(w / w.sum(), min_weight, max_weight)
+    for _ in range(n):
+        excess = 1.0 - w.sum()
+        if abs(excess) < 1e-12:
+            break
+        # Assets that can still move in the needed direction
+        movable = w < max_weight if excess > 0 else w > min_weight
+        base = w[movable]
+        share = base / base.sum() if base.sum() > 0 else np.full(len(base), 1.0 / len(base))
+        w[movable] = np.clip(base + excess * share, min_weight, max_weight)
+    return w
+
+
+def inverse_volatility_weights(data, min_weight=0.0, max_weight=1.0):
+    """
+    Weights proportional to 1 / volatility of each asset.
+
+    ``data`` is a returns frame or a covariance frame; the weights are
+    kept within [min_weight, max_weight].
+    """
+    cov = _covariance(data)
+    vol = np.sqrt(np.diag(cov.to_numpy()))
+    inv = np.where(vol > 0, 1.0 / np.where(vol > 0, vol, 1.0), 0.0)
+    if inv.sum() == 0:
+        inv = np.ones_like(inv)
+    return pd.Series(_bounded(inv, min_weight, max_weight), index=cov.columns)
+
+
+def _erc_newton(cov, x0, tol=1e-10, max_iter=100):
+    """
+    Equal risk contributions: minimize 0.5 y'Σy - sum(log y), whose
+    minimizer satisfies y_i (Σy)_i = 1 for every asset.
+
+    Damped Newton steps (the objective is self-concordant, so the damped
+    step keeps y > 0); a warm start close to the solution needs one or
+    two full steps.
+    """
+    n = len(x0)
+    # Best scaling of the starting point along its ray
+    y = x0 * np.sqrt(n / max(x0 @ cov @ x0, 1e-300))
+    for _ in range(max_iter):
+        sigma_y = cov @ y
+        if np.max(np.abs(y * sigma_y - 1.0)) < tol:
+            break
+        grad = sigma_y - 1.0 / y
+        hessian = cov + np.diag(1.0 / y**2)
+        step = np.linalg.solve(hessian, grad)
+        decrement = np.sqrt(max(grad @ step, 0.0))
+        y = y - (step / (1.0 + decrement) if decrement > 0.25 else step)
+    return y / y.sum()
+
+
+def risk_parity_weights(data, min_weight=0.0, max_weight=1.0, initial_weights=None):
+    """
+    Equal-risk-contribution (risk parity) weights.
+
+    Each asset contributes the same share of the portfolio variance.
+    The solver starts from ``initial_weights`` when given, otherwise from
+    the previous solution for the same assets (so re-solving after a
+    refresh or along a rolling schedule takes a step or two), otherwise
+    from inverse-volatility weights. Bounds are applied to the solution.
+    """
+    cov = _covariance(data)
+    tickers = tuple(cov.columns)
+    sigma = cov.to_numpy()
+    if np.any(np.diag(sigma) <= 0):
+        raise ValueError("Risk parity needs a positive variance for every asset.")
+
+    if initial_weights is not None:
+        x0 = pd.Series(initial_weights, index=cov.columns, dtype=float).reindex(cov.columns).to_numpy()
+    else:
+        x0 = _ERC_LAST.get(tickers)
+    if x0 is None or not np.all(np.isfinite(x0)) or np.any(x0 <= 0):
+        x0 = 1.0 / np.sqrt(np.diag(sigma))
+
+    w = _erc_newton(sigma, np.asarray(x0, dtype=float))
+    _ERC_LAST.pop(tickers, None)
+    if len(_ERC_LAST) >= _ERC_LAST_MAX:
+        _ERC_LAST.pop(next(iter(_ERC_LAST)))
+    _ERC_LAST[tickers] = w
+    return pd.Series(_bounded(w, min_weight, max_weight), index=cov.columns)
+
+
+def hrp_weights(data, min_weight=0.0, max_weight=1.0):
+    """
+    Hierarchical risk parity (Lopez de Prado).
+
+    Assets are ordered by single-linkage clustering of their correlations,
+    then the weight is split recursively between the two halves of each
+    cluster in inverse proportion to their variance. Cluster variances
+    use inverse-variance weights within the cluster, so no matrix is ever
+    inverted: the cost is O(N² log N) and 1000+ assets stay cheap.
+    """
+    from src.portfolio.correlations import cluster_order
+
+    cov = _covariance(data)
+    sigma = cov.to_numpy()
+    var = np.diag(sigma)
+    if np.any(var <= 0):
+        raise ValueError("HRP needs a positive variance for every asset.")
+    std = np.sqrt(var)
+    corr = pd.DataFrame(sigma / np.outer(std, std), index=cov.index, columns=cov.columns)
+
+    order = cluster_order(corr, method="single")
+    sigma, var = sigma[np.ix_(order, order)], var[order]
+
+    def cluster_var(start, end):
+        ivp = 1.0 / var[start:end]
+        ivp /= ivp.sum()
+        return ivp @ sigma[start:end, start:end] @ ivp
+
+    w = np.ones(len(order))
+    segments = [(0, len(order))]
+    while segments:
+        next_segments = []
+        for start, end in segments:
+            if end - start < 2:
+                continue
+            mid = (start + end) // 2
+            var_left, var_right = cluster_var(start, mid), cluster_var(mid, end)
+            alpha = 1.0 - var_left / (var_left + var_right)
+            w[start:mid] *= alpha
+            w[mid:end] *= 1.0 - alpha
+            next_segments += [(start, mid), (mid, end)]
+        segments = next_segments
+
+    weights = np.empty_like(w)
+    weights[order] = w
+    return pd.Series(_bounded(weights, min_weight, max_weight), index=cov.columns)
@@ -0,0 +1,351 @@
+"""
+Sharded execution of a screen on local worker processes and remote workers.
+
+``run_screen`` cuts the universe into shards and keeps every worker slot
+busy: each slot takes the next shard from a shared queue, so fast workers
+take more shards and throughput grows with the number of slots. A shard
+whose run fails (worker crash, timeout, lost connection) is put back in
+the queue and retried, up to ``retries`` times, by whichever slot is free
+first. The failing slot backs off before taking more work, so the retry
+usually lands on another worker. A slot that fails MAX_SLOT_FAILURES
+times in a row is retired.
+
+Slots are either local worker processes (a process pool) or connections
+to remote workers (``python -m src.screening.worker``, one per host; it
+announces how many shards it runs at once). Several local worker servers
+on different ports stand in for hosts when testing.
+
+Protocol: one TCP connection per shard. Every message is a 4-byte
+big-endian length followed by a UTF-8 JSON object:
+
+    -> {"op": "hello"}
+    <- {"ok": true, "version": 1, "slots": 4}
+    -> {"op": "screen", "tickers": [...], "params": {...}}
+    <- {"ok": true, "rows": [{...}, ...]}   or   {"ok": false, "error": "..."}
+
+Only JSON travels over the wire: a worker runs ``screen_shard`` and
+nothing else.
+"""
+import json
+import logging
+import multiprocessing
+import queue
+import socket
+import struct
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import NamedTuple
+
+from src.data.cache import read_config
+from src.jobs.runner import report_progress
+from src.screening.screen import DEFAULT_PARAMS, SCREEN_COLUMNS, make_shards, merge_results, screen_shard
+
+logger = logging.getLogger(__name__)
+
+PROTOCOL_VERSION = 1
+DEFAULT_WORKER_PORT = 9500
+# Largest message accepted (a shard of rows is a few hundred kB)
+MAX_MESSAGE_BYTES = 256 * 1024 * 1024
+# A slot is retired after this many consecutive failures
+MAX_SLOT_FAILURES = 3
+# Pause of a slot after a failure (times its consecutive failures)
+RETRY_BACKOFF_S = 0.5
+CONNECT_TIMEOUT_S = 5.0
+
+
+class ShardFailed(RuntimeError):
+    """A worker could not screen a shard."""
+
+
+def load_screening_settings() -> dict:
+    """
+    Read the ``screening`` section of config.yaml.
+
+    screening:
+      shard_size: 100        # tickers per shard
+      workers: 2             # local worker processes (0: none)
+      remotes: []            # host:port of remote workers
+      retries: 2             # extra attempts of a failed shard
+      timeout: 600           # seconds per shard attempt
+      rank_by: sharpe
+    """
+    cfg = read_config().get("screening", {}) or {}
+    return {
+        "shard_size": int(cfg.get("shard_size", 100)),
+        "workers": int(cfg.get("workers", 2)),
+        "remotes": list(cfg.get("remotes") or []),
+        "retries": int(cfg.get("retries", 2)),
+        "timeout": float(cfg.get("timeout", 600)),
+        "rank_by": str(cfg.get("rank_by", "sharpe")),
+    }
+
+
+# ---- Wire format ----
+
+def _recv_exact(sock, n):
+    chunks = []
+    while n:
+        chunk = sock.recv(min(n, 1 << 20))
+        if not chunk:
+            raise ConnectionError("Connection closed by the peer.")
+        chunks.append(chunk)
+        n -= len(chunk)
+    return b"".join(chunks)
+
+
+def send_message(sock, message: dict):
+    data = json.dumps(message).encode()
+    sock.sendall(struct.pack("!I", len(data)) + data)
+
+
+def recv_message(sock) -> dict:
+    (size,) = struct.unpack("!I", _recv_exact(sock, 4))
+    if size > MAX_MESSAGE_BYTES:
+        raise ConnectionError(f"Message of {size} bytes exceeds the limit.")
+    return json.loads(_recv_exact(sock, size))
+
+
+def parse_address(address: str):
+    """'host:port' (or 'host', on DEFAULT_WORKER_PORT) -> (host, port)."""
+    host, _, port = str(address).strip().rpartition(":")
+    if not host:
+        return port, DEFAULT_WORKER_PORT
+    return host, int(port)
+
+
+# ---- Workers ----
+
+class LocalWorkers:
+    """Slots backed by a pool of local worker processes."""
+
+    def __init__(self, workers: int):
+        self.slots = workers
+        self._pool = None
+        self._lock = threading.Lock()
+
+    def _executor(self):
+        with self._lock:
+            if self._pool is None:
+                # "spawn": the caller may be a multi-threaded server process
+                ctx = multiprocessing.get_context("spawn")
+                self._pool = ProcessPoolExecutor(self.slots, mp_context=ctx)
+            return self._pool
+
+    def run(self, tickers, params, timeout):
+        pool = self._executor()
+        try:
+            return pool.submit(screen_shard, tickers, params).result(timeout=timeout)
+        except BrokenProcessPool as e:
+            # A worker died: the next attempt gets a fresh pool
+            with self._lock:
+                if self._pool is pool:
+                    self._pool = None
+            pool.shutdown(wait=False, cancel_futures=True)
+            raise ShardFailed(f"worker process died: {e}") from None
+
+    def close(self):
+        with self._lock:
+            if self._pool is not None:
+                self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
+
+
+class RemoteWorker:
+    """A remote worker, reached with one connection per shard."""
+
+    def __init__(self, address: str):
+        self.address = address
+        self.host, self.port = parse_address(address)
+        self.slots = 0
+
+    def _request(self, message, timeout):
+        with socket.create_connection((self.host, self.port), timeout=CONNECT_TIMEOUT_S) as sock:
+            sock.settimeout(timeout)
+            send_message(sock, message)
+            reply = recv_message(sock)
+        if not reply.get("ok"):
+            raise ShardFailed(reply.get("error", "unknown error"))
+        return reply
+
+    def hello(self, timeout=CONNECT_TIMEOUT_S) -> int:
+        """Number of shards the worker runs at once (raises if unreachable)."""
+        reply = self._request({"op": "hello"}, timeout)
+        if reply.get("version") != PROTOCOL_VERSION:
+            raise ShardFailed(f"protocol version {reply.get('version')} (expected {PROTOCOL_VERSION})")
+        self.slots = max(1, int(reply.get("slots", 1)))
+        return self.slots
+
+    def run(self, tickers, params, timeout):
+        return self._request({"op": "screen", "tickers": list(tickers), "params": params}, timeout)["rows"]
+
+    def close(self):
+        pass
+
+
+# ---- Coordinator ----
+
+class ScreenResult(NamedTuple):
+    # Ranked table, one row per ticker (see merge_results)
+    table: object
+    # Tickers of the shards that failed every attempt
+    failed: list
+    # shards, retries, failed_shards, errors, tickers, elapsed_s,
+    # tickers_per_s, workers ({slot name: shards done})
+    stats: dict
+
+
+def _slots(workers, remotes):
+    # (name, runner) for every slot, and the runners to close at the end
+    slots, runners = [], []
+    if workers > 0:
+        local = LocalWorkers(workers)
+        runners.append(local)
+        slots += [(f"local#{i}", local) for i in range(workers)]
+    for address in remotes:
+        remote = RemoteWorker(address)
+        try:
+            remote.hello()
+        except (OSError, ShardFailed, ValueError) as e:
+            logger.warning(f"Screening worker {address} unavailable: {e}")
+            continue
+        runners.append(remote)
+        slots += [(f"{address}#{i}", remote) for i in range(remote.slots)]
+    return slots, runners
+
+
+def run_screen(
+    tickers,
+    params=None,
+    workers=None,
+    remotes=None,
+    shard_size=None,
+    retries=None,
+    timeout=None,
+    rank_by=None,
+    ascending=False,
+) -> ScreenResult:
+    """
+    Screen a universe on local worker processes and / or remote workers.
+
+    Parameters
+    ----------
+    tickers : list of str
+        The universe.
+    params : dict
+        Screen parameters (period, interval, window, threshold), see
+        ``DEFAULT_PARAMS``.
+    workers, remotes, shard_size, retries, timeout, rank_by
+        Default to the ``screening`` section of config.yaml.
+
+    Returns
+    -------
+    ScreenResult
+        The ranked table, the tickers of the shards that failed every
+        attempt, and run statistics. Progress is published with
+        ``report_progress``, so a screen can run as a background job.
+    """
+    settings = load_screening_settings()
+    params = {**DEFAULT_PARAMS, **(params or {})}
+    workers = settings["workers"] if workers is None else workers
+    remotes = settings["remotes"] if remotes is None else remotes
+    retries = settings["retries"] if retries is None else retries
+    timeout = settings["timeout"] if timeout is None else timeout
+    rank_by = rank_by or settings["rank_by"]
+    if rank_by not in SCREEN_COLUMNS:
+        raise ValueError(f"Unknown ranking column: {rank_by}")
+    shards = make_shards(tickers, shard_size or settings["shard_size"])
+
+    start = time.perf_counter()
+    slots, runners = _slots(workers, remotes)
+    if not slots and shards:
+        raise RuntimeError("No screening worker available (no local workers and no reachable remote).")
+
+    todo = queue.Queue()
+    for i in range(len(shards)):
+        todo.put((i, 0))
+    results, failures = {}, {}
+    counts = {name: 0 for name, _ in slots}
+    state = {"retries": 0, "live": len(slots)}
+    lock = threading.Lock()
+    finished = threading.Event()
+
+    def settle():
+        # Caller holds the lock
+        if len(results) + len(failures) == len(shards):
+            finished.set()
+
+    def slot_loop(name, runner):
+        consecutive = 0
+        while not finished.is_set():
+            try:
+                i, attempt = todo.get(timeout=0.1)
+            except queue.Empty:
+                continue
+            try:
+                rows = runner.run(shards[i], params, timeout)
+            except Exception as e:
+                consecutive += 1
+                with lock:
+                    if attempt < retries:
+                        state["retries"] += 1
+                        todo.put((i, attempt + 1))
+                    else:
+                        failures[i] = f"{name}: {type(e).__name__}: {e}"
+                        settle()
+                logger.warning(f"Shard {i} failed on {name} (attempt {attempt + 1}): {e}")
+                if consecutive >= MAX_SLOT_FAILURES:
+                    logger.warning(f"Slot {name} retired after {consecutive} failures in a row.")
+                    break
+                time.sleep(RETRY_BACKOFF_S * consecutive)
+                continue
+            consecutive = 0
+            with lock:
+                results[i] = rows
+                counts[name] += 1
+                settle()
+
+        with lock:
+            state["live"] -= 1
+            if state["live"] == 0 and not finished.is_set():
+                # Every slot retired: the remaining shards cannot run
+                while True:
+                    try:
+                        i, _ = todo.get_nowait()
+                    except queue.Empty:
+                        break
+                    failures[i] = "no screening worker left"
+                finished.set()
+
+    threads = [threading.Thread(target=slot_loop, args=slot, name=f"screen-{slot[0]}", daemon=True) for slot in slots]
+    for t in threads:
+        t.start()
+    completed = False
+    try:
+        while shards and not finished.wait(0.2):
+            report_progress(len(results) + len(failures), len(shards), "screening")
+        completed = True
+    finally:
+        finished.set()
+        # Cancelled: do not wait for the shards in flight
+        for t in threads:
+            t.join(None if completed else 0)
+        for runner in runners:
+            runner.close()
+
+    rows = [row for i in sorted(results) for row in results[i]]
+    elapsed = time.perf_counter() - start
+    n_screened = sum(len(shards[i]) for i in results)
+    stats = {
+        "shards": len(shards),
+        "retries": state["retries"],
+        "failed_shards": len(failures),
+        "errors": [failures[i] for i in sorted(failures)],
+        "tickers": n_screened,
+        "elapsed_s": elapsed,
+        "tickers_per_s": n_screened / elapsed if elapsed > 0 else 0.0,
+        "workers": counts,
+    }
+    failed = [t for i in sorted(failures) for t in shards[i]]
+    return ScreenResult(merge_results(rows, rank_by, ascending), failed, stats)
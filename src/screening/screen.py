@@ -0,0 +1,110 @@
+"""
+Universe screening: backtest metrics and current signals of many tickers.
+
+For every ticker of a universe a screen computes the buy-and-hold metrics
+of ``backtest``, and the current position, total return and Sharpe ratio
+of the momentum and mean-reversion strategies. The universe is cut into
+shards (``make_shards``). Each shard is screened on its own by
+``screen_shard``, in a local worker process or on a remote worker (see
+``dispatch.py``), and ``merge_results`` merges the shard rows into one
+ranked table.
+
+Rows are plain dicts of JSON values, so that shards can travel over the
+worker protocol. A ticker without data, or whose computation fails, gets
+a row with its status; it never fails its shard.
+"""
+import numpy as np
+import pandas as pd
+
+# Parameters of a screen (strategies as on the Single Asset page)
+DEFAULT_PARAMS = {"period": "1y", "interval": "1d", "window": 20, "threshold": 0.02}
+
+SCREEN_COLUMNS = [
+    "status", "observations", "last_date", "last_price",
+    "total_return", "annual_vol", "sharpe", "max_drawdown",
+    "momentum_signal", "momentum_return", "momentum_sharpe",
+    "mean_reversion_signal", "mean_reversion_return", "mean_reversion_sharpe",
+]
+
+
+def make_shards(tickers, shard_size) -> list:
+    """Consecutive lists of at most ``shard_size`` tickers (duplicates dropped)."""
+    tickers = list(dict.fromkeys(t.strip().upper() for t in tickers if t and t.strip()))
+    size = max(1, int(shard_size))
+    return [tickers[i: i + size] for i in range(0, len(tickers), size)]
+
+
+def _number(x):
+    x = float(x)
+    return x if np.isfinite(x) else None
+
+
+def screen_ticker(ticker, params=None) -> dict:
+    """Screen row of one ticker."""
+    from src.data.fetch_yf import get_history
+    from src.data.intervals import asset_type, periods_per_year
+    from src.evaluation.backtesting import backtest
+    from src.strategies.buy_and_hold import run_buy_and_hold
+    from src.strategies.mean_reversion import mean_reversion_signal, run_mean_reversion
+    from src.strategies.momentum import momentum_signal, run_momentum
+
+    p = {**DEFAULT_PARAMS, **(params or {})}
+    row = {"ticker": ticker}
+    try:
+        df = get_history(ticker, period=p["period"], interval=p["interval"])
+        if df is None or len(df) < 2:
+            return {**row, "status": "no data"}
+        ppy = periods_per_year(p["interval"], asset_type(ticker))
+        window, threshold = int(p["window"]), float(p["threshold"])
+
+        metrics = backtest(run_buy_and_hold(df), periods_per_year=ppy)
+        row.update(
+            status="ok",
+            observations=len(df),
+            last_date=df.index[-1].isoformat(),
+            last_price=_number(df["price"].iloc[-1]),
+            **{k: _number(metrics[k]) for k in ("total_return", "annual_vol", "sharpe", "max_drawdown")},
+        )
+        strategies = {
+            "momentum": (run_momentum(df, period=window), momentum_signal(df, period=window)),
+            "mean_reversion": (
+                run_mean_reversion(df, period=window, threshold=threshold),
+                mean_reversion_signal(df, period=window, threshold=threshold),
+            ),
+        }
+        for name, (value, signal) in strategies.items():
+            if len(value) < 2:
+                continue
+            metrics = backtest(value, periods_per_year=ppy)
+            row[f"{name}_signal"] = int(signal.iloc[-1])
+            row[f"{name}_return"] = _number(metrics["total_return"])
+            row[f"{name}_sharpe"] = _number(metrics["sharpe"])
+    except Exception as e:
+        return {"ticker": ticker, "status": f"error: {type(e).__name__}: {e}"}
+    return row
+
+
+def screen_shard(tickers, params=None) -> list:
+    """Screen rows of a shard (the unit of work of a worker)."""
+    return [screen_ticker(t, params) for t in tickers]
+
+
+def merge_results(rows, rank_by="sharpe", ascending=False) -> pd.DataFrame:
+    """
+    One table of every shard's rows, indexed by ticker and ranked.
+
+    ``rank`` is 1 for the best ``rank_by`` value (largest, or smallest
+    with ``ascending``). Tickers without a value come last, unranked.
+    """
+    table = pd.DataFrame(list(rows))
+    if table.empty:
+        return pd.DataFrame(columns=["rank"] + SCREEN_COLUMNS, index=pd.Index([], name="ticker"))
+    table = table.drop_duplicates("ticker").set_index("ticker").reindex(columns=SCREEN_COLUMNS)
+    if rank_by not in table.columns:
+        raise ValueError(f"Unknown ranking column: {rank_by}")
+    table[rank_by] = pd.to_numeric(table[rank_by])
+    table = table.sort_values(rank_by, ascending=ascending, na_position="last", kind="stable")
+    ranked = table[rank_by].notna().to_numpy()
+    table.insert(0, "rank", pd.array(np.where(ranked, np.cumsum(ranked), 0), dtype="Int64"))
+    table.loc[~ranked, "rank"] = pd.NA
+    return table
@@ -0,0 +1,97 @@
+"""
+Remote screening worker.
+
+Serves the shard protocol of ``dispatch.py`` on a TCP port: each
+connection carries one request, and shards run in a pool of ``--workers``
+processes (one per core is a good default). If a pool process dies (out
+of memory, crash), the pool is replaced and the shard is answered as
+failed, so the coordinator retries it. Histories come from the worker's
+own cache and price archive.
+
+Run one per host with:
+    python -m src.screening.worker [--host 0.0.0.0] [--port 9500] [--workers 4]
+
+then list the hosts under ``screening: remotes`` in config.yaml (or
+``--remote`` of scripts/run_screen.py). The protocol has no
+authentication: bind to a private network only.
+"""
+import argparse
+import logging
+import os
+import socketserver
+
+from src.screening.dispatch import (
+    DEFAULT_WORKER_PORT,
+    PROTOCOL_VERSION,
+    LocalWorkers,
+    recv_message,
+    send_message,
+)
+
+logger = logging.getLogger(__name__)
+
+
+class ShardHandler(socketserver.BaseRequestHandler):
+    workers: LocalWorkers = None
+
+    def handle(self):
+        try:
+            request = recv_message(self.request)
+        except (OSError, ValueError) as e:
+            logger.warning("Bad request from %s: %s", self.client_address[0], e)
+            return
+        op = request.get("op")
+        if op == "hello":
+            reply = {"ok": True, "version": PROTOCOL_VERSION, "slots": self.workers.slots}
+        elif op == "screen":
+            try:
+                tickers = [str(t) for t in request["tickers"]]
+                # A dead pool process raises ShardFailed and the next shard gets a new pool
+                rows = self.workers.run(tickers, dict(request.get("params") or {}), timeout=None)
+                reply = {"ok": True, "rows": rows}
+            except Exception as e:
+                logger.exception("Shard of %d tickers failed", len(request.get("tickers") or []))
+                reply = {"ok": False, "error": f"{type(e).__name__}: {e}"}
+        else:
+            reply = {"ok": False, "error": f"Unknown op: {op}"}
+        try:
+            send_message(self.request, reply)
+        except OSError as e:
+            logger.warning("Could not reply to %s: %s", self.client_address[0], e)
+
+
+class WorkerServer(socketserver.ThreadingTCPServer):
+    allow_reuse_address = True
+    daemon_threads = True
+
+
+def make_worker(host="127.0.0.1", port=DEFAULT_WORKER_PORT, workers=2):
+    """Build the worker server (call ``serve_forever`` to run it)."""
+    pool = LocalWorkers(max(1, workers))
+    handler = type("Handler", (ShardHandler,), {"workers": pool})
+    server = WorkerServer((host, port), handler)
+    server.workers = pool
+    return server
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Remote screening worker")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=DEFAULT_WORKER_PORT)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
+    server = make_worker(args.host, args.port, args.workers)
+    logger.info("Screening worker on %s:%d (%d processes)", args.host, args.port, args.workers)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        server.workers.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,6 +1,11 @@
 import pandas as pd
 
+from src.data.result_store import memoized
+from src.monitoring.tracing import traced
 
+
+@traced("strategy.buy_and_hold")
+@memoized
 def run_buy_and_hold(df: pd.DataFrame) -> pd.Series:
     if "price" not in df.columns:
         raise ValueError("The DataFrame must contain a 'price' column.")
@@ -9,4 +14,10 @@ def run_buy_and_hold(df: pd.DataFrame) -> pd.Series:
     strategy_value = df["price"] / initial_price
     strategy_value.name = "Buy & Hold"
 
-    return strategy_value
\ No newline at end of file
+    return strategy_value
+
+
+def buy_and_hold_stream(events):
+    """Streaming buy and hold: (timestamp, price, True) per event."""
+    for ts, price in events:
+        yield ts, price, True
@@ -1,18 +1,93 @@
+import numpy as np
 import pandas as pd
 
-def run_mean_reversion(df: pd.DataFrame, period: int = 20, threshold: float = 0.02) -> pd.Series:
-    df = df.copy()
+from src.data.result_store import memoized
+from src.data.rolling import RollingMean
+from src.kernels.signals import TrailingStop, latch, trailing_stop
+from src.monitoring.tracing import traced
 
-    df["ma"] = df["price"].rolling(period).mean()
-    df["diff"] = (df["price"] - df["ma"]) / df["ma"]
 
-    df["signal"] = (df["diff"] < -threshold).astype(int)
+def _signal(df, period, threshold, exit_threshold, stop_loss):
+    price = df["price"].to_numpy(dtype=np.float64)
+    ma = df["price"].rolling(period).mean().to_numpy(dtype=np.float64)
 
-    df["returns"] = df["price"].pct_change().fillna(0)
-    df["strategy_ret"] = df["signal"].shift(1).fillna(0) * df["returns"]
+    # Long when the price is more than ``threshold`` below its moving average
+    with np.errstate(invalid="ignore"):
+        gap = (price - ma) / ma
+        signal = gap < -threshold
+        if exit_threshold is not None:
+            # Held until the price is back within ``exit_threshold`` of the average
+            signal = latch(signal, gap >= -exit_threshold)
+    if stop_loss:
+        signal = trailing_stop(price, signal, float(stop_loss))
+    return price, signal
 
-    df["strategy_value"] = (1 + df["strategy_ret"]).cumprod()
-    df["strategy_value"].fillna(1.0, inplace=True)
-    df["strategy_value"].name = f"MeanReversion_{period}"
 
-    return df["strategy_value"]
+def mean_reversion_signal(
+    df: pd.DataFrame,
+    period: int = 20,
+    threshold: float = 0.02,
+    exit_threshold: float = None,
+    stop_loss: float = None,
+) -> pd.Series:
+    """Position after each close (True: long over the next bar)."""
+    _, signal = _signal(df, period, threshold, exit_threshold, stop_loss)
+    return pd.Series(signal, index=df.index, name=f"MeanReversion_{period}")
+
+
+def mean_reversion_stream(
+    events,
+    period: int = 20,
+    threshold: float = 0.02,
+    exit_threshold: float = None,
+    stop_loss: float = None,
+):
+    """
+    Streaming ``mean_reversion_signal``: (timestamp, price, position) per event.
+
+    Consumes (timestamp, price) events and keeps only the last ``period``
+    prices, so it runs in constant memory over any number of bars or
+    ticks. The position is flat until a full window has been seen.
+    """
+    average = RollingMean(period)
+    stop = TrailingStop(stop_loss) if stop_loss else None
+    held = False
+    for ts, price in events:
+        ma = average.update(price)
+        signal = False
+        if ma == ma:
+            gap = (price - ma) / ma
+            signal = gap < -threshold
+            if exit_threshold is not None:
+                if held and gap >= -exit_threshold:
+                    held = False
+                if not held and signal:
+                    held = True
+                signal = held
+        if stop is not None:
+            signal = stop.update(price, signal)
+        yield ts, price, signal
+
+
+@traced("strategy.mean_reversion")
+@memoized
+def run_mean_reversion(
+    df: pd.DataFrame,
+    period: int = 20,
+    threshold: float = 0.02,
+    exit_threshold: float = None,
+    stop_loss: float = None,
+) -> pd.Series:
+    price, signal = _signal(df, period, threshold, exit_threshold, stop_loss)
+
+    # Strategy growth 1 + signal(t-1) * r(t), compounded in place
+    growth = np.zeros(len(price))
+    if len(price) > 1:
+        np.divide(price[1:], price[:-1], out=growth[1:])
+        growth[1:] -= 1.0
+        growth[np.isnan(growth)] = 0.0
+        growth[1:] *= signal[:-1]
+    growth += 1.0
+    np.cumprod(growth, out=growth)
+
+    return pd.Series(growth, index=df.index, name=f"MeanReversion_{period}")
@@ -1,19 +1,68 @@
+import numpy as np
 import pandas as pd
 
-def run_momentum(df: pd.DataFrame, period: int = 20) -> pd.Series:
+from src.data.result_store import memoized
+from src.data.rolling import RollingMean
+from src.kernels.signals import TrailingStop, trailing_stop
+from src.monitoring.tracing import traced
+
+
+def _signal(df, period, stop_loss):
     if "price" not in df.columns:
         raise ValueError("The DataFrame must contain a 'price' column.")
-    df = df.copy()
-
-    df["ma"] = df["price"].rolling(period).mean().shift(1)
-    df = df.dropna(subset=["ma"])
-    price = df["price"]
-    ma = df["ma"]
-    df["signal"] = (price > ma).astype(int)
-    df["returns"] = df["price"].pct_change().fillna(0)
-    df["strategy_ret"] = df["signal"].shift(1).fillna(0) * df["returns"]
-    df["strategy_value"] = (1 + df["strategy_ret"]).cumprod()
-    df["strategy_value"].fillna(1.0, inplace=True)
-    df["strategy_value"].name = f"Momentum_{period}"
-
-    return df["strategy_value"]
+
+    # Long when the price is above its moving average of the previous bars
+    ma = df["price"].rolling(period).mean().shift(1)
+    valid = ma.notna().to_numpy()
+    price = df["price"].to_numpy(dtype=np.float64)[valid]
+    ma = ma.to_numpy()[valid]
+    signal = price > ma
+    if stop_loss:
+        # Out after a close ``stop_loss`` below the peak since entry
+        signal = trailing_stop(price, signal, float(stop_loss))
+    return valid, price, signal
+
+
+def momentum_signal(df: pd.DataFrame, period: int = 20, stop_loss: float = None) -> pd.Series:
+    """Position after each close (True: long over the next bar)."""
+    valid, _, signal = _signal(df, period, stop_loss)
+    return pd.Series(signal, index=df.index[valid], name=f"Momentum_{period}")
+
+
+def momentum_stream(events, period: int = 20, stop_loss: float = None):
+    """
+    Streaming ``momentum_signal``: (timestamp, price, position) per event.
+
+    Consumes (timestamp, price) events and keeps only the last ``period``
+    prices, so it runs in constant memory over any number of bars or
+    ticks. Events before a full window are dropped, as in ``run_momentum``.
+    """
+    average = RollingMean(period)
+    ma = float("nan")
+    stop = TrailingStop(stop_loss) if stop_loss else None
+    for ts, price in events:
+        # Average of the previous bars
+        if ma == ma:
+            signal = price > ma
+            if stop is not None:
+                signal = stop.update(price, signal)
+            yield ts, price, signal
+        ma = average.update(price)
+
+
+@traced("strategy.momentum")
+@memoized
+def run_momentum(df: pd.DataFrame, period: int = 20, stop_loss: float = None) -> pd.Series:
+    valid, price, signal = _signal(df, period, stop_loss)
+
+    # Strategy growth 1 + signal(t-1) * r(t), compounded in place
+    growth = np.zeros(len(price))
+    if len(price) > 1:
+        np.divide(price[1:], price[:-1], out=growth[1:])
+        growth[1:] -= 1.0
+        growth[np.isnan(growth)] = 0.0
+        growth[1:] *= signal[:-1]
+    growth += 1.0
+    np.cumprod(growth, out=growth)
+
+    return pd.Series(growth, index=df.index[valid], name=f"Momentum_{period}")